@@ -0,0 +1,103 @@
+"""
+Throughput of creating many items at once against the in-process stub api (twikey.stub), which
+answers every call after a fixed latency to stand in for the round trip to the real api.
+
+    python benchmarks/bench_bulk.py [--count 500] [--latency 0.02] [--concurrency 1 --concurrency 8 ...]
+
+Reported per concurrency: the items created per second by transaction.create_many (followed by one
+batch_send) and invoice.create_many.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import twikey  # noqa: E402
+from twikey.model.invoice_request import InvoiceRequest  # noqa: E402
+from twikey.model.transaction_request import NewTransactionRequest  # noqa: E402
+from twikey.stub import StubTwikey  # noqa: E402
+
+
+def transactions(count):
+    for i in range(count):
+        yield NewTransactionRequest(
+            mandate_number="MNDT%d" % i,
+            message="Invoice %d" % i,
+            amount=10 + i % 90,
+            ref="REF%d" % i,
+        )
+
+
+def invoices(count):
+    for i in range(count):
+        yield InvoiceRequest(
+            number="INV%d" % i,
+            title="Invoice %d" % i,
+            amount=10 + i % 90,
+            ct=1,
+            date="2024-05-01",
+            duedate="2024-05-31",
+        )
+
+
+def bench_transactions(client, count, concurrency):
+    start = time.perf_counter()
+    summary = client.transaction.create_all(
+        transactions(count), ct=1, concurrency=concurrency
+    )
+    assert summary.ok and summary.batch, summary
+    return time.perf_counter() - start
+
+
+def bench_invoices(client, count, concurrency):
+    start = time.perf_counter()
+    failed = sum(
+        1
+        for result in client.invoice.create_many(invoices(count), concurrency)
+        if not result.ok
+    )
+    assert not failed, "%d invoices failed" % failed
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per call of the stub api"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        action="append",
+        help="pool size to run (default 1, 4, 16)",
+    )
+    args = parser.parse_args()
+
+    concurrencies = args.concurrency or [1, 4, 16]
+    print("%d items per run, %.0fms per call" % (args.count, args.latency * 1000))
+    print("%-12s %16s %16s" % ("concurrency", "transactions/s", "invoices/s"))
+    with StubTwikey(latency=args.latency) as stub:
+        with twikey.TwikeyClient(
+            "key", stub.base_url, pool_maxsize=max(concurrencies)
+        ) as client:
+            client.refresh_token_if_required()
+            for concurrency in concurrencies:
+                transactions_elapsed = bench_transactions(
+                    client, args.count, concurrency
+                )
+                invoices_elapsed = bench_invoices(client, args.count, concurrency)
+                print(
+                    "%-12d %16.0f %16.0f"
+                    % (
+                        concurrency,
+                        args.count / transactions_elapsed,
+                        args.count / invoices_elapsed,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark of the json codecs on feed pages and bulk invoice payloads.
+
+Decodes an invoice and a transaction feed page of PAGE_SIZE items and encodes a bulk invoice
+request of the same size with every available codec (orjson and ujson only when installed).
+
+    python benchmarks/bench_codec.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twikey.codec import JsonCodec, OrjsonCodec, UjsonCodec, orjson, ujson  # noqa: E402
+from payloads import invoice_page, transaction_page  # noqa: E402
+
+PAGE_SIZE = 500
+ROUNDS = 50
+
+
+def main():
+    codecs = [JsonCodec()]
+    if ujson is not None:
+        codecs.append(UjsonCodec())
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+
+    invoices = json.dumps(invoice_page(PAGE_SIZE)).encode()
+    transactions = json.dumps(transaction_page(PAGE_SIZE)).encode()
+    bulk = {"invoices": invoice_page(PAGE_SIZE)["Invoices"]}
+    print(
+        "invoice page %d kB, transaction page %d kB, %d items each"
+        % (len(invoices) / 1024, len(transactions) / 1024, PAGE_SIZE)
+    )
+    print(
+        "%-8s %18s %22s %18s"
+        % ("codec", "decode invoices", "decode transactions", "encode bulk")
+    )
+    for codec in codecs:
+        timings = [
+            timeit.timeit(lambda: codec.loads(invoices), number=ROUNDS),
+            timeit.timeit(lambda: codec.loads(transactions), number=ROUNDS),
+            timeit.timeit(lambda: codec.dumps(bulk), number=ROUNDS),
+        ]
+        print(
+            "%-8s %15.2f ms %19.2f ms %15.2f ms"
+            % ((codec.name,) + tuple(t / ROUNDS * 1000 for t in timings))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Throughput of the feeds: fetching, parsing and dispatching synthetic pages of every feed
+(mandates with amendments and cancellations, invoices with lines and payments, transactions,
+refunds and paylinks) served by the in-process stub api (twikey.stub) to the default (no-op) feed handlers.
+
+    python benchmarks/bench_feeds.py [--pages 20] [--page-size 100] [--rounds 3] [--feed invoice ...]
+
+The best of the rounds is reported per feed, next to the time spent on parsing and dispatching
+alone (without http), which is what changes in the models and feed loops show up in.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import twikey  # noqa: E402
+from payloads import FEEDS  # noqa: E402
+from twikey.stub import StubTwikey  # noqa: E402
+
+HANDLERS = {
+    "document": twikey.DocumentFeed,
+    "invoice": twikey.InvoiceFeed,
+    "transaction": twikey.TransactionFeed,
+    "refund": twikey.RefundFeed,
+    "paylink": twikey.PaylinkFeed,
+}
+
+
+class _Pages:
+    """Stands in for the http part of a feed, handing out already decoded pages"""
+
+    def __init__(self, page, count):
+        self.page = page
+        self.count = count
+
+    def __call__(self, *args, **kwargs):
+        return iter([(str(self.count - n), self.page) for n in range(self.count)])
+
+
+def bench_http(client, stub, name, rounds):
+    best = None
+    for _ in range(rounds):
+        stub.rewind(name)
+        start = time.perf_counter()
+        stats = getattr(client, name).feed(HANDLERS[name]())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return stats, best
+
+
+def bench_dispatch(client, name, pages, page_size, rounds):
+    key, items = next(iter(FEEDS[name](page_size).items()))
+    service = getattr(client, name)
+    service._pages = _Pages(json.loads(json.dumps(items)), pages)
+    try:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            service.feed(HANDLERS[name]())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    finally:
+        del service._pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument(
+        "--feed",
+        action="append",
+        choices=sorted(FEEDS),
+        help="feed to run (default all)",
+    )
+    args = parser.parse_args()
+
+    names = args.feed or list(FEEDS)
+    stub = StubTwikey(page_size=args.page_size).start()
+    for name in names:
+        for page in range(args.pages):
+            stub.add(
+                name,
+                next(iter(FEEDS[name](args.page_size, page * args.page_size).values())),
+            )
+    print(
+        "%d pages of %d items per feed, best of %d rounds"
+        % (args.pages, args.page_size, args.rounds)
+    )
+    print(
+        "%-12s %8s %10s %12s %16s"
+        % ("feed", "items", "seconds", "items/s", "dispatch items/s")
+    )
+    try:
+        with twikey.TwikeyClient("key", stub.base_url) as client:
+            for name in names:
+                stats, elapsed = bench_http(client, stub, name, args.rounds)
+                dispatch = bench_dispatch(
+                    client, name, args.pages, args.page_size, args.rounds
+                )
+                print(
+                    "%-12s %8d %10.3f %12.0f %16.0f"
+                    % (
+                        name,
+                        stats.items,
+                        elapsed,
+                        stats.items / elapsed,
+                        stats.items / dispatch,
+                    )
+                )
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
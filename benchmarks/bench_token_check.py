@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the per-call token check done before every api call.
+
+Compares TwikeyClient.refresh_token_if_required with a still valid token against the
+implementation it replaced (kept below as legacy_refresh_token_if_required).
+
+    python benchmarks/bench_token_check.py
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import twikey  # noqa: E402
+from twikey.client import TwikeyError  # noqa: E402
+from twikey.token import Token  # noqa: E402
+
+ITERATIONS = 200_000
+
+
+def legacy_refresh_token_if_required(self):
+    """The token check as it was before the fast path, for comparison"""
+    if self.lastLogin:
+        self.logger.debug(
+            "Last authenticated with {} with {}".format(self.lastLogin, self.api_token)
+        )
+    if not self.api_base:
+        raise TwikeyError(
+            ctx="Config",
+            error_code="Api-Url",
+            error="No base url defined - %s" % self.api_base,
+        )
+    if not self.api_key:
+        raise TwikeyError(
+            ctx="Config",
+            error_code="Api-Key",
+            error="No key defined - %s" % self.api_base,
+        )
+    now = datetime.datetime.now()
+    if self.lastLogin is None or (now - self.lastLogin).seconds > 23 * 3600:
+        raise AssertionError("benchmark expects a valid token")
+    else:
+        self.logger.debug(
+            "Reusing token {} valid till {}".format(self.api_token, self.lastLogin)
+        )
+
+
+def main():
+    client = twikey.TwikeyClient("key", "http://localhost")
+    client._use_token(Token("token", "1"))
+
+    results = {
+        "before (legacy)": timeit.timeit(
+            lambda: legacy_refresh_token_if_required(client), number=ITERATIONS
+        ),
+        "after (fast path)": timeit.timeit(
+            client.refresh_token_if_required, number=ITERATIONS
+        ),
+    }
+    client.close()
+    for name, elapsed in results.items():
+        print("%-20s %8.0f ns/call" % (name, elapsed / ITERATIONS * 1e9))
+
+
+if __name__ == "__main__":
+    main()
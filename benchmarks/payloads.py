@@ -0,0 +1,201 @@
+"""
+Synthetic but realistically shaped bodies of the Twikey api, shared by the benchmarks.
+"""
+import uuid
+
+
+def invoice(i):
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "number": "INV-2024-%06d" % i,
+        "title": "Invoice %d for the subscription of May" % i,
+        "remittance": "+++%03d/%04d/%05d+++" % (i % 1000, i % 10000, i % 100000),
+        "ref": "ORDER-%d" % i,
+        "ct": 1988,
+        "amount": round(10 + i * 0.37, 2),
+        "date": "2024-05-01",
+        "duedate": "2024-05-31",
+        "state": ["BOOKED", "PENDING", "PAID", "EXPIRED"][i % 4],
+        "url": "https://yourpage.beta.twikey.com/invoice.html?%s" % uuid.UUID(int=i),
+        "customer": {
+            "customerNumber": "C%06d" % (i % 5000),
+            "email": "customer%d@example.com" % i,
+            "firstname": "Jéan",
+            "lastname": "Müller-%d" % i,
+            "companyName": "Example BV",
+            "address": "Derbystraat %d" % (i % 300),
+            "city": "Gent",
+            "zip": "9051",
+            "country": "BE",
+            "language": "nl",
+        },
+        "lines": [
+            {
+                "code": "SUB-%d" % n,
+                "description": "Monthly subscription",
+                "quantity": 1,
+                "uom": "pcs",
+                "unitprice": 12.4,
+                "vatcode": "21",
+                "vatsum": 2.6,
+                "vatpercentage": 21.0,
+            }
+            for n in range(2)
+        ],
+        "lastpayment": [
+            {
+                "action": "payment",
+                "at": "2024-05-03T10:12:00Z",
+                "link": 1000 + i,
+                "method": "sdd",
+            }
+        ],
+        "meta": {"lastError": None, "reminder": i % 3, "active": True},
+    }
+
+
+def transaction(i):
+    return {
+        "id": 100000 + i,
+        "contractId": 2000 + i % 700,
+        "mndtId": "CORERECURRENTNL%05d" % (i % 700),
+        "contract": "Subscription",
+        "amount": round(5 + i * 0.13, 2),
+        "msg": "Monthly fee %d" % i,
+        "place": None,
+        "ref": "REF-%d" % i,
+        "final": False,
+        "state": ["OPEN", "PAID", "ERROR"][i % 3],
+        "bkdate": "2024-05-03T10:12:00Z",
+        "reqcolldt": "2024-05-05T00:00:00Z",
+        "lastupdate": "2024-05-06T08:00:00Z",
+    }
+
+
+def mandate_message(i):
+    """:return: a message of the mandate feed, new mandates with every 5th an amendment and every 7th a cancellation"""
+    evt_time = "2024-05-03T10:%02d:%02dZ" % (i // 60 % 60, i % 60)
+    origin = {"CtctDtls": {"EmailAdr": "support@example.com"}}
+    if i % 7 == 6:
+        return {
+            "OrgnlMndtId": "MNDT%06d" % i,
+            "CxlRsn": {"Orgtr": origin, "Rsn": "MD16"},
+            "EvtTime": evt_time,
+        }
+    mandate = {
+        "MndtId": "MNDT%06d" % i,
+        "LclInstrm": "CORE",
+        "Ocrncs": {"SeqTp": "RCUR", "Frqcy": "ADHO", "Drtn": {"FrDt": "2024-05-01"}},
+        "CdtrSchmeId": "BE51ZZZ0123456789",
+        "Cdtr": {
+            "Nm": "Example BV",
+            "PstlAdr": {
+                "AdrLine": "Derbystraat 43",
+                "PstCd": "9051",
+                "TwnNm": "Gent",
+                "Ctry": "BE",
+            },
+        },
+        "Dbtr": {
+            "Nm": "Jéan Müller %d" % i,
+            "PstlAdr": {
+                "AdrLine": "Kerkstraat %d" % (i % 200),
+                "PstCd": "9000",
+                "TwnNm": "Gent",
+                "Ctry": "BE",
+            },
+            "Id": "BE0%09d" % i,
+            "CtryOfRes": "BE",
+            "CtctDtls": {"EmailAdr": "debtor%d@example.com" % i, "Othr": "C%06d" % i},
+        },
+        "DbtrAcct": "BE68539007547034",
+        "DbtrAgt": {"FinInstnId": {"BICFI": "GKCCBEBB", "Nm": "BELFIUS BANK"}},
+        "RfrdDoc": "CONTRACT-%d" % i,
+        "SplmtryData": [
+            {"Key": "SignerPlace#0", "Value": "Gent"},
+            {"Key": "Language", "Value": "nl"},
+        ],
+    }
+    if i % 5 == 4:
+        return {
+            "OrgnlMndtId": "MNDT%06d" % i,
+            "AmdmntRsn": {"Orgtr": origin, "Rsn": "_T50"},
+            "Mndt": mandate,
+            "EvtTime": evt_time,
+        }
+    return {"Mndt": mandate, "EvtTime": evt_time}
+
+
+def refund(i):
+    return {
+        "id": "REFUND-%d" % i,
+        "iban": "BE68539007547034",
+        "bic": "GKCCBEBB",
+        "amount": round(2 + i * 0.11, 2),
+        "msg": "Refund of order %d" % i,
+        "place": None,
+        "ref": "R-%d" % i,
+        "date": "2024-05-03",
+        "state": ["PREPARED", "PAID"][i % 2],
+        "bkdate": "2024-05-04T10:12:00Z",
+    }
+
+
+def paylink(i):
+    return {
+        "id": 5000 + i,
+        "ct": 1988,
+        "amount": round(15 + i * 0.21, 2),
+        "msg": "Payment of order %d" % i,
+        "ref": "ORDER-%d" % i,
+        "state": ["created", "paid", "expired"][i % 3],
+        "customer": {
+            "id": i,
+            "email": "customer%d@example.com" % i,
+            "firstname": "Jéan",
+            "lastname": "Müller",
+            "customerNumber": "C%06d" % i,
+            "l": "nl",
+        },
+        "meta": {"active": True, "sdd": None, "tx": 100000 + i, "method": "bancontact"},
+        "time": {
+            "creation": "2024-05-03T10:00:00Z",
+            "expiration": "2024-06-03T10:00:00Z",
+            "lastupdate": "2024-05-03T10:12:00Z",
+        },
+    }
+
+
+def mandate_page(size=100, start=0):
+    """:return: a mandate feed page holding size messages"""
+    return {"Messages": [mandate_message(start + i) for i in range(size)]}
+
+
+def invoice_page(size=100, start=0):
+    """:return: an invoice feed page holding size invoices"""
+    return {"Invoices": [invoice(start + i) for i in range(size)]}
+
+
+def transaction_page(size=100, start=0):
+    """:return: a transaction feed page holding size transactions"""
+    return {"Entries": [transaction(start + i) for i in range(size)]}
+
+
+def refund_page(size=100, start=0):
+    """:return: a refund (credit transfer) feed page holding size refunds"""
+    return {"Entries": [refund(start + i) for i in range(size)]}
+
+
+def paylink_page(size=100, start=0):
+    """:return: a paylink feed page holding size links"""
+    return {"Links": [paylink(start + i) for i in range(size)]}
+
+
+# feed name -> page factory
+FEEDS = {
+    "document": mandate_page,
+    "invoice": invoice_page,
+    "transaction": transaction_page,
+    "refund": refund_page,
+    "paylink": paylink_page,
+}
@@ -25,6 +25,10 @@ setup(
         'requests >= 2.32; python_version >= "3.0"',
         'requests[security] >= 2.32; python_version < "3.0"',
     ],
+    extras_require={
+        "async": ["httpx >= 0.23"],
+        "speedups": ["orjson >= 3.6"],
+    },
     python_requires=">=3.6",
     project_urls={
         "Bug Tracker": "https://github.com/twikey/twikey-api-python/issues",
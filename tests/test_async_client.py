@@ -0,0 +1,239 @@
+import asyncio
+import unittest
+
+import twikey
+
+try:
+    import httpx
+    from twikey.aio import AsyncTwikeyClient, AsyncFeedRunner, AsyncFeedDaemon
+    from twikey.aio.session import AsyncTwikeySession
+    from twikey.ratelimit import RateLimiter
+    from twikey.checkpoint import MemoryCheckpointStore
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from twikey.model.transaction_response import TransactionFeed
+
+
+@unittest.skipIf(httpx is None, "httpx not installed")
+class TestAsyncClient(unittest.TestCase):
+    def setUp(self):
+        self.logins = 0
+        self.pages = [
+            [{"id": 1, "state": "PAID"}, {"id": 2, "state": "ERROR"}],
+            [{"id": 3, "state": "PAID"}],
+            [],
+        ]
+
+    def handler(self, request):
+        if request.url.path == "/creditor" and request.method == "POST":
+            self.logins += 1
+            return httpx.Response(
+                200,
+                headers={
+                    "Authorization": "token-%d" % self.logins,
+                    "X-MERCHANT-ID": "1",
+                },
+            )
+        if request.url.path == "/creditor/transaction":
+            if request.headers["Authorization"] != "token-%d" % self.logins:
+                return httpx.Response(401, headers={"ApiErrorCode": "err_no_login"})
+            page = self.pages.pop(0)
+            return httpx.Response(
+                200, json={"Entries": page}, headers={"X-LAST": str(len(self.pages))}
+            )
+        return httpx.Response(404)
+
+    def _client(self, rate_limiter=None):
+        client = AsyncTwikeyClient("key", "https://api.twikey.test/creditor")
+        client.session = AsyncTwikeySession(
+            relogin=client._relogin,
+            rate_limiter=rate_limiter,
+            transport=httpx.MockTransport(self.handler),
+        )
+        return client
+
+    def test_iter_feed(self):
+        async def run():
+            async with self._client() as client:
+                return [
+                    (position, tx.id)
+                    async for position, tx in client.transaction.iter_feed()
+                ]
+
+        self.assertEqual([("2", 1), ("2", 2), ("1", 3)], asyncio.run(run()))
+
+    def test_iter_feed_streamed(self):
+        async def run():
+            async with self._client() as client:
+                return [
+                    (position, tx.id)
+                    async for position, tx in client.transaction.iter_feed(stream=True)
+                ]
+
+        self.assertEqual([("2", 1), ("2", 2), ("1", 3)], asyncio.run(run()))
+
+    def test_invalid_json(self):
+        handler = self.handler
+
+        def broken(request):
+            response = handler(request)
+            if request.url.path == "/creditor/transaction":
+                return httpx.Response(200, content=b'{"Entries": [<html>')
+            return response
+
+        self.handler = broken
+
+        async def run(stream):
+            async with self._client() as client:
+                return [
+                    tx
+                    async for position, tx in client.transaction.iter_feed(
+                        stream=stream
+                    )
+                ]
+
+        for stream in (False, True):
+            with self.assertRaises(twikey.TwikeyError) as error:
+                asyncio.run(run(stream))
+            self.assertEqual("DecodingError", error.exception.get_code())
+
+    def test_feed_with_coroutine_handler(self):
+        seen = []
+
+        class MyFeed(TransactionFeed):
+            async def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        async def run():
+            async with self._client() as client:
+                await client.transaction.feed(MyFeed())
+
+        asyncio.run(run())
+        self.assertEqual([1, 2, 3], seen)
+
+    def test_feed_stopped_by_handler(self):
+        seen = []
+
+        class MyFeed(TransactionFeed):
+            async def transaction(self, transaction):
+                seen.append(transaction.id)
+                return transaction.state == "ERROR"
+
+        async def run():
+            async with self._client() as client:
+                return await client.transaction.feed(MyFeed())
+
+        stats = asyncio.run(run())
+        self.assertEqual([1, 2], seen)
+        self.assertEqual(1, stats.pages)
+
+    def test_feed_with_page_hook(self):
+        pages = []
+
+        class BulkFeed(TransactionFeed):
+            async def page(self, position, transactions):
+                pages.append((position, [tx.id for tx in transactions]))
+
+        async def run():
+            async with self._client() as client:
+                await client.transaction.feed(BulkFeed())
+
+        asyncio.run(run())
+        self.assertEqual([("2", [1, 2]), ("1", [3])], pages)
+
+    def test_single_login_for_concurrent_calls(self):
+        async def run():
+            async with self._client() as client:
+                await asyncio.gather(
+                    *[client.refresh_token_if_required() for _ in range(20)]
+                )
+
+        asyncio.run(run())
+        self.assertEqual(1, self.logins)
+
+    def test_relogin_once_on_rejected_token(self):
+        async def run():
+            async with self._client() as client:
+                await client.refresh_token_if_required()
+                client.api_token = "revoked"
+                return [tx.id async for _, tx in client.transaction.iter_feed()]
+
+        self.assertEqual([1, 2, 3], asyncio.run(run()))
+        self.assertEqual(2, self.logins)
+
+    def test_iter_feed_with_prefetch(self):
+        async def run():
+            async with self._client() as client:
+                return [
+                    tx.id async for _, tx in client.transaction.iter_feed(prefetch=2)
+                ]
+
+        self.assertEqual([1, 2, 3], asyncio.run(run()))
+
+    def test_checkpoints(self):
+        store = MemoryCheckpointStore()
+
+        async def run():
+            async with self._client() as client:
+                client.checkpoint_store = store
+                async for _, tx in client.transaction.iter_feed(prefetch=1):
+                    if tx.id == 3:
+                        break  # the second page is not fully handled
+                return store.load("transaction")
+
+        self.assertEqual("2", asyncio.run(run()))
+
+    def test_rate_limited_calls(self):
+        limiter = RateLimiter(rate=1000, budgets={"transaction": (20, 1)})
+
+        async def run():
+            async with self._client(limiter) as client:
+                start = asyncio.get_running_loop().time()
+                items = [tx.id async for _, tx in client.transaction.iter_feed()]
+                return items, asyncio.get_running_loop().time() - start
+
+        items, elapsed = asyncio.run(run())
+        self.assertEqual([1, 2, 3], items)
+        self.assertGreaterEqual(elapsed, 0.09)  # 3 pages at 20/s, the first one free
+
+    def test_feed_daemon(self):
+        seen = []
+
+        class MyFeed(TransactionFeed):
+            def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        async def run():
+            async with self._client() as client:
+                daemon = AsyncFeedDaemon(client, min_interval=30, transaction=MyFeed())
+                task = asyncio.create_task(daemon.run_forever(handle_signals=False))
+                await asyncio.sleep(0.1)
+                self.pages = [[{"id": 4, "state": "PAID"}], []]
+                daemon.wake()
+                await asyncio.sleep(0.1)
+                daemon.stop()
+                await asyncio.wait_for(task, 1)
+
+        asyncio.run(run())
+        self.assertEqual([1, 2, 3, 4], seen)
+
+    def test_feed_runner(self):
+        seen = []
+
+        class MyFeed(TransactionFeed):
+            async def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        async def run():
+            async with self._client() as client:
+                return await AsyncFeedRunner(client, transaction=MyFeed()).run()
+
+        summary = asyncio.run(run())
+        self.assertEqual([1, 2, 3], seen)
+        self.assertEqual(3, summary.items)
+        self.assertEqual("1", summary.feeds["transaction"].position)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,476 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+import twikey
+from twikey.model.document_request import InviteRequest, SignMethod, SignRequest
+from twikey.invoice import batch_results
+from twikey.model.invoice_request import BulkInvoiceRequest, InvoiceRequest
+from twikey.model.invoice_response import BulkBatchDetailsResponse
+from twikey.model.refund_request import (
+    NewBeneficiaryRequest,
+    NewRefundBatchRequest,
+    NewRefundRequest,
+)
+from twikey.model.transaction_request import NewTransactionRequest
+from twikey.stub import StubTwikey
+
+try:
+    import httpx
+    from twikey.aio import AsyncTwikeyClient
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+def invoices(count, invalid=()):
+    for i in range(count):
+        yield InvoiceRequest(
+            number=None if i in invalid else "INV%d" % i, amount=10 + i, ct=1
+        )
+
+
+def transactions(count):
+    for i in range(count):
+        yield NewTransactionRequest(
+            mandate_number="MNDT%d" % i, message="Invoice %d" % i, amount=5, ref=str(i)
+        )
+
+
+IBANS = ["BE68539007547034", "NL91ABNA0417164300", "DE89370400440532013000"]
+
+
+def refunds(count):
+    for i in range(count):
+        yield NewRefundRequest(
+            customer_number="C%d" % (i % 3),
+            iban=IBANS[i % 3],
+            message="Refund %d" % i,
+            amount=2,
+        )
+
+
+def beneficiary(request):
+    return NewBeneficiaryRequest(
+        customer_number=request.customer_number, name="Customer", iban=request.iban
+    )
+
+
+def invites(count):
+    for i in range(count):
+        yield InviteRequest(
+            ct=1,
+            customer_number="C%d" % i,
+            email="customer%d@example.com" % i,
+            first_name="C%d" % i,
+        )
+
+
+class TestInvoiceCreateMany(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey(latency=0.01).start()
+        self.client = twikey.TwikeyClient("key", self.stub.base_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_ordered_with_errors(self):
+        results = list(
+            self.client.invoice.create_many(
+                invoices(20, invalid={3, 11}), concurrency=4
+            )
+        )
+        self.assertEqual(list(range(20)), [result.index for result in results])
+        self.assertEqual([3, 11], [result.index for result in results if not result.ok])
+        self.assertEqual("err_missing_params", results[3].error.get_code())
+        self.assertEqual("INV4", results[4].result.number)
+        self.assertEqual(18, len(self.stub.invoices))
+
+    def test_as_completed(self):
+        results = list(
+            self.client.invoice.create_many(invoices(10), concurrency=3, ordered=False)
+        )
+        self.assertEqual(list(range(10)), sorted(result.index for result in results))
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_input_read_lazily(self):
+        consumed = []
+
+        def requests():
+            for request in invoices(100):
+                consumed.append(request)
+                yield request
+
+        results = self.client.invoice.create_many(requests(), concurrency=2)
+        self.assertEqual(0, next(results).index)
+        self.assertLessEqual(
+            len(consumed), 5
+        )  # 2 * concurrency queued, plus the one that was read next
+        results.close()
+        self.assertLessEqual(len(self.stub.invoices), 5)
+
+    def test_concurrency(self):
+        self.stub.latency = 0.1
+        self.client.refresh_token_if_required()
+        started = time.monotonic()
+        list(self.client.invoice.create_many(invoices(8), concurrency=8))
+        self.assertLess(time.monotonic() - started, 0.5)  # 0.8s one after the other
+
+
+class TestInvoiceBulkUpload(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey(bulk_delay=0.05).start()
+        self.client = twikey.TwikeyClient("key", self.stub.base_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_chunks_polled_until_processed(self):
+        results = list(
+            self.client.invoice.bulk_upload(
+                invoices(25, invalid={12}), chunk_size=10, interval=0.01
+            )
+        )
+        self.assertEqual(list(range(25)), sorted(result.index for result in results))
+        self.assertEqual([12], [result.index for result in results if not result.ok])
+        rejected = next(result for result in results if not result.ok)
+        self.assertEqual("err_missing_params", rejected.error.get_code())
+        self.assertEqual("err_missing_params", rejected.result.status)
+        self.assertEqual(
+            {"OK"}, {result.result.status for result in results if result.ok}
+        )
+        self.assertEqual(3, self.stub.calls["POST /invoice/bulk"])
+        self.assertGreater(
+            self.stub.calls["GET /invoice/bulk"], 3
+        )  # 409 while processing
+        self.assertEqual(24, len(self.stub.invoices))
+
+    def test_failed_batch(self):
+        self.stub.fail("/invoice/bulk", status=500, method="POST")
+        results = list(
+            self.client.invoice.bulk_upload(invoices(6), 3, 1, True, interval=0.01)
+        )
+        self.assertEqual([False] * 3 + [True] * 3, [result.ok for result in results])
+        self.assertIsInstance(results[0].error, twikey.TwikeyError)
+
+    def test_results_matched_by_id(self):
+        requests = [
+            InvoiceRequest(id="id%d" % i, number="INV%d" % i, amount=10, ct=1)
+            for i in range(3)
+        ]
+        details = BulkBatchDetailsResponse(
+            [{"id": "id2", "status": "OK"}, {"id": "id0", "status": "err_invalid"}]
+        )
+        results = list(
+            batch_results(twikey.BulkResult(1, requests, details), chunk_size=3)
+        )
+        self.assertEqual([3, 4, 5], [result.index for result in results])
+        self.assertEqual("err_invalid", results[0].error.get_code())
+        self.assertEqual("missing_result", results[1].error.get_code())
+        self.assertTrue(results[2].ok)
+        self.assertEqual("id2", results[2].result.id)
+
+    def test_wait_timeout(self):
+        self.stub.bulk_delay = 10
+        batch = self.client.invoice.bulk_create(BulkInvoiceRequest(list(invoices(2))))
+        with self.assertRaises(TimeoutError):
+            self.client.invoice.bulk_wait(batch.batch_id, interval=0.01, timeout=0.1)
+
+
+class TestTransactionCreateMany(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey().start()
+        self.client = twikey.TwikeyClient("key", self.stub.base_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_create_all_then_collect(self):
+        summary = self.client.transaction.create_all(
+            transactions(30), ct=1, concurrency=4
+        )
+        self.assertTrue(summary.ok)
+        self.assertEqual(30, summary.succeeded)
+        self.assertEqual(30, summary.batch["entries"])
+        self.assertEqual(
+            {"PENDING"}, {tx["state"] for tx in self.stub.transactions.values()}
+        )
+
+    def test_no_collect_after_failures(self):
+        self.stub.fail(
+            "/transaction",
+            status=400,
+            times=2,
+            method="POST",
+            error_code="err_no_contract",
+        )
+        summary = self.client.transaction.create_all(
+            transactions(10), ct=1, concurrency=4
+        )
+        self.assertEqual(8, summary.succeeded)
+        self.assertEqual(
+            [True, True],
+            [
+                isinstance(result.error, twikey.TwikeyError)
+                for result in summary.failures
+            ],
+        )
+        self.assertIsNone(summary.batch)
+        self.assertEqual(0, self.stub.calls["POST /collect"])
+
+    def test_rate(self):
+        self.client.refresh_token_if_required()
+        started = time.monotonic()
+        results = list(
+            self.client.transaction.create_many(
+                transactions(13), concurrency=8, rate=10
+            )
+        )
+        self.assertEqual(13, len(results))
+        self.assertGreater(
+            time.monotonic() - started, 0.25
+        )  # a burst of 10, then 3 more at 10 per second
+
+
+class TestRefundCreateAll(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey(bulk_delay=0.05).start()
+        self.client = twikey.TwikeyClient("key", self.stub.base_url)
+        self.client.refund.create_beneficiary_account(
+            NewBeneficiaryRequest(name="Known", iban=IBANS[0])
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_beneficiaries_registered_once(self):
+        asked = []
+
+        def missing(request):
+            asked.append(request.iban)
+            return beneficiary(request)
+
+        summary = self.client.refund.create_all(
+            refunds(12), ct=1, beneficiary=missing, concurrency=6, interval=0.01
+        )
+        self.assertEqual(12, summary.succeeded)
+        self.assertEqual(sorted(IBANS[1:]), sorted(asked))
+        self.assertEqual(1, self.stub.calls["GET /transfers/beneficiaries"])
+        self.assertEqual(
+            3, self.stub.calls["POST /transfers/beneficiaries"]
+        )  # the known one and the 2 missing
+        self.assertEqual("DONE", summary.batch.progress)
+        self.assertEqual(12, summary.batch.entries)
+        self.assertGreater(self.stub.calls["GET /transfer/complete"], 0)
+
+    def test_no_batch_after_failures(self):
+        summary = self.client.refund.create_all(refunds(6), ct=1, interval=0.01)
+        self.assertEqual(2, summary.succeeded)
+        self.assertEqual(
+            {IBANS[1], IBANS[2]}, {result.request.iban for result in summary.failures}
+        )
+        self.assertIsNone(summary.batch)
+        self.assertEqual(0, self.stub.calls["POST /transfer/complete"])
+
+    def test_nothing_to_batch(self):
+        with self.assertRaises(twikey.TwikeyError) as error:
+            self.client.refund.create_batch(NewRefundBatchRequest(ct=1))
+        self.assertEqual("Missing batch", error.exception.get_code())
+
+
+class TestDocumentFanOut(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey().start()
+        self.client = twikey.TwikeyClient("key", self.stub.base_url)
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = twikey.FileJournal(
+            os.path.join(self.directory.name, "invites.jsonl")
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+        self.directory.cleanup()
+
+    def test_create_many(self):
+        results = list(
+            self.client.document.create_many(invites(10), concurrency=4, rate=100)
+        )
+        self.assertEqual(list(range(10)), [result.index for result in results])
+        self.assertEqual(10, len({result.result.mandate_number for result in results}))
+
+    def test_sign_many(self):
+        requests = [
+            SignRequest(ct=1, method=SignMethod.IMPORT, iban=iban, first_name="Info")
+            for iban in IBANS
+        ]
+        results = list(self.client.document.sign_many(requests, concurrency=2))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(3, len(list(self.client.document.iter_feed())))
+
+    def test_resume_from_journal(self):
+        results = self.client.document.create_many(
+            invites(20), concurrency=4, journal=self.journal
+        )
+        first = [next(results) for _ in range(5)]
+        results.close()  # the process died
+        sent = self.stub.calls["POST /invite"]
+        self.assertGreaterEqual(sent, 5)
+        self.assertLess(sent, 20)
+
+        self.stub.fail("/invite", status=400, error_code="err_invalid_email")
+        results = list(
+            self.client.document.create_many(
+                invites(20), concurrency=4, journal=self.journal
+            )
+        )
+        self.assertEqual(list(range(20)), [result.index for result in results])
+        self.assertEqual(
+            [r.result.mandate_number for r in first],
+            [r.result.mandate_number for r in results[:5]],
+        )
+        self.assertEqual(1, len([result for result in results if not result.ok]))
+        self.assertEqual(20, self.stub.calls["POST /invite"])  # every invite once
+
+        results = list(
+            self.client.document.create_many(
+                invites(20), concurrency=4, journal=self.journal
+            )
+        )
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(
+            21, self.stub.calls["POST /invite"]
+        )  # only the failed one was sent again
+
+    def test_journal_keys(self):
+        key = lambda request: request.customer_number  # noqa: E731
+        list(
+            self.client.document.create_many(invites(3), journal=self.journal, key=key)
+        )
+        self.assertEqual({"C0", "C1", "C2"}, set(self.journal.load()))
+        list(
+            self.client.document.create_many(
+                reversed(list(invites(4))), journal=self.journal, key=key
+            )
+        )
+        self.assertEqual(4, self.stub.calls["POST /invite"])
+
+    def test_incomplete_journal_line(self):
+        self.journal.record(0, {"mndtId": "M0"})
+        with open(self.journal.path, "a") as f:
+            f.write('{"key":"1","res')
+        self.assertEqual({"0": {"mndtId": "M0"}}, self.journal.load())
+        self.journal.record(1, {"mndtId": "M1"})
+        self.assertEqual(
+            {"0": {"mndtId": "M0"}, "1": {"mndtId": "M1"}}, self.journal.load()
+        )
+
+
+@unittest.skipIf(httpx is None, "httpx not installed")
+class TestAsyncBulk(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey(latency=0.01).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def test_create_many(self):
+        async def requests():
+            for request in invoices(12, invalid={5}):
+                yield request
+
+        async def run(ordered):
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                return [
+                    result
+                    async for result in client.invoice.create_many(
+                        requests(), 4, ordered
+                    )
+                ]
+
+        results = asyncio.run(run(True))
+        self.assertEqual(list(range(12)), [result.index for result in results])
+        self.assertEqual([5], [result.index for result in results if not result.ok])
+        self.assertEqual("INV6", results[6].result.number)
+
+        results = asyncio.run(run(False))
+        self.assertEqual(list(range(12)), sorted(result.index for result in results))
+
+    def test_bulk_upload(self):
+        self.stub.bulk_delay = 0.05
+
+        async def run():
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                return [
+                    result
+                    async for result in client.invoice.bulk_upload(
+                        invoices(7), 3, interval=0.01
+                    )
+                ]
+
+        results = asyncio.run(run())
+        self.assertEqual(list(range(7)), sorted(result.index for result in results))
+        self.assertEqual({"OK"}, {result.result.status for result in results})
+        self.assertEqual(3, self.stub.calls["POST /invoice/bulk"])
+
+    def test_transactions_create_all(self):
+        async def run():
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                return await client.transaction.create_all(
+                    transactions(9), ct=1, concurrency=3, rate=100
+                )
+
+        summary = asyncio.run(run())
+        self.assertEqual(9, summary.succeeded)
+        self.assertEqual(9, summary.batch["entries"])
+
+    def test_refunds_create_all(self):
+        self.stub.bulk_delay = 0.05
+
+        async def run():
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                return await client.refund.create_all(
+                    refunds(9), 1, beneficiary=beneficiary, interval=0.01
+                )
+
+        summary = asyncio.run(run())
+        self.assertEqual(9, summary.succeeded)
+        self.assertEqual(3, self.stub.calls["POST /transfers/beneficiaries"])
+        self.assertEqual("DONE", summary.batch.progress)
+
+        async def close_again():
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                await client.refund.create_batch(NewRefundBatchRequest(ct=1))
+
+        with self.assertRaises(twikey.TwikeyError):
+            asyncio.run(close_again())  # all refunds are in the first batch
+
+    def test_documents_create_many(self):
+        journal = twikey.MemoryJournal()
+
+        async def run():
+            async with AsyncTwikeyClient("key", self.stub.base_url) as client:
+                return [
+                    result
+                    async for result in client.document.create_many(
+                        invites(6), 3, journal=journal
+                    )
+                ]
+
+        first = asyncio.run(run())
+        self.assertEqual(6, len(journal.load()))
+        again = asyncio.run(run())
+        self.assertEqual(6, self.stub.calls["POST /invite"])
+        self.assertEqual(
+            [r.result.mandate_number for r in first],
+            [r.result.mandate_number for r in again],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
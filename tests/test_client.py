@@ -0,0 +1,680 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import twikey
+from twikey import codec as codec_module
+from twikey.feed import prefetch_pages
+from twikey.token import FileTokenStore, MemoryTokenStore, TOKEN_VALIDITY
+
+
+class FakeLoginServer(ThreadingHTTPServer):
+    """Minimal local api only answering logins, counting them"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeLoginHandler)
+        self.logins = 0
+        self.gets = 0
+        self.failures = (
+            []
+        )  # (status, headers) answered to the next GETs, before serving normally
+        self.pages = (
+            []
+        )  # feed pages answered to the next GETs, after that the feeds are empty
+        self.resumed = []  # X-RESUME-AFTER headers received
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d/creditor" % self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeLoginHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.logins += 1
+            token = "token-%d" % self.server.logins
+        time.sleep(0.2)  # slow login to widen the race window
+        self.send_response(200)
+        self.send_header("Authorization", token)
+        self.send_header("X-MERCHANT-ID", "1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.gets += 1
+            if "X-RESUME-AFTER" in self.headers:
+                self.server.resumed.append(self.headers["X-RESUME-AFTER"])
+            failure = self.server.failures.pop(0) if self.server.failures else None
+        if failure:
+            status, headers = failure
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        # feeds of the fake api require the latest token
+        if self.headers.get("Authorization") != "token-%d" % self.server.logins:
+            self.send_response(401)
+            self.send_header("ApiErrorCode", "err_no_login")
+            body = b'{"code": "err_no_login", "message": "Not logged in"}'
+        else:
+            with self.server.lock:
+                page = self.server.pages.pop(0) if self.server.pages else []
+            self.send_response(200)
+            self.send_header("X-LAST", str(len(self.server.pages)))
+            body = json.dumps(
+                {"Entries": page, "Messages": page, "Invoices": page, "Links": page}
+            ).encode()
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestClient(unittest.TestCase):
+    def test_shared_session(self):
+        client = twikey.TwikeyClient("key", pool_connections=2, pool_maxsize=7)
+        adapter = client.session.get_adapter("https://api.twikey.com")
+        self.assertEqual(7, adapter._pool_maxsize)
+        self.assertEqual(2, adapter._pool_connections)
+        for service in [
+            client.document,
+            client.invoice,
+            client.transaction,
+            client.paylink,
+            client.refund,
+        ]:
+            self.assertIs(client.session, service.client.session)
+        client.close()
+
+    def test_header_templates(self):
+        with twikey.TwikeyClient("key") as client:
+            client.api_token = "token-1"
+            headers = client._headers("application/json")
+            self.assertIs(headers, client._headers("application/json"))
+            self.assertEqual("token-1", headers["Authorization"])
+            with self.assertRaises(TypeError):
+                headers[
+                    "X-PARTNER"
+                ] = "partner"  # templates are shared, hence read-only
+            layered = client._headers("application/json", {"X-PARTNER": "partner"})
+            self.assertEqual("partner", layered["X-PARTNER"])
+            self.assertEqual("application/json", layered["Content-type"])
+            client.api_token = "token-2"
+            self.assertEqual(
+                "token-2", client._headers("application/json")["Authorization"]
+            )
+
+    def test_public_headers_are_a_copy(self):
+        with twikey.TwikeyClient("key") as client:
+            client.api_token = "token-1"
+            headers = client.headers("application/json")
+            headers["X-PARTNER"] = "partner"
+            self.assertIsInstance(headers, dict)
+            self.assertEqual("token-1", headers["Authorization"])
+            self.assertNotIn("X-PARTNER", client.headers("application/json"))
+
+    def test_no_keep_alive(self):
+        with twikey.TwikeyClient("key", keep_alive=False) as client:
+            self.assertEqual("close", client.session.headers["Connection"])
+
+
+class TestCodec(unittest.TestCase):
+    def test_codecs(self):
+        payload = {
+            "invoices": [
+                {"number": "Inv-1", "title": "Factûre €", "amount": 10.5, "paid": False}
+            ]
+        }
+        codecs = [twikey.JsonCodec()]
+        if codec_module.ujson is not None:
+            codecs.append(twikey.UjsonCodec())
+        if codec_module.orjson is not None:
+            codecs.append(twikey.OrjsonCodec())
+        for codec in codecs:
+            self.assertEqual(payload, codec.loads(codec.dumps(payload)), codec.name)
+        self.assertIsInstance(codec_module.default_codec(), type(codecs[-1]))
+
+    def test_client_decode(self):
+        client = twikey.TwikeyClient("key", codec=twikey.JsonCodec())
+        response = requests.models.Response()
+        response._content = b'{"Entries": [1, 2]}'
+        self.assertEqual({"Entries": [1, 2]}, client.decode(response))
+        response._content = b"<html>"
+        with self.assertRaises(
+            requests.exceptions.RequestException
+        ):  # turned into a TwikeyError by the services
+            client.decode(response)
+        client.close()
+
+
+class TestTokenRefresh(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLoginServer()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_single_flight_login(self):
+        threads_count = 64
+        client = twikey.TwikeyClient(
+            "key", self.server.base_url, pool_maxsize=threads_count
+        )
+        barrier = threading.Barrier(threads_count)
+        tokens = []
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                client.refresh_token_if_required()
+                tokens.append(client.api_token)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        client.close()
+
+        self.assertEqual([], errors)
+        self.assertEqual(1, self.server.logins)
+        self.assertEqual(["token-1"] * threads_count, tokens)
+
+    def test_relogin_once_on_rejected_token(self):
+        with twikey.TwikeyClient("key", self.server.base_url) as client:
+            client.refresh_token_if_required()
+            client.api_token = "revoked"  # eg. session ended on the server side
+            client.transaction.feed(twikey.TransactionFeed())
+            self.assertEqual(2, self.server.logins)
+            self.assertEqual("token-2", client.api_token)
+
+    def test_shared_token_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "token.json")
+            first = twikey.TwikeyClient(
+                "key", self.server.base_url, token_store=FileTokenStore(path)
+            )
+            second = twikey.TwikeyClient(
+                "key", self.server.base_url, token_store=FileTokenStore(path)
+            )
+            first.refresh_token_if_required()
+            second.refresh_token_if_required()
+            first.close()
+            second.close()
+        self.assertEqual(1, self.server.logins)
+        self.assertEqual(first.api_token, second.api_token)
+
+    def test_background_renewal(self):
+        client = twikey.TwikeyClient(
+            "key",
+            self.server.base_url,
+            token_store=MemoryTokenStore(),
+            renew_before=TOKEN_VALIDITY - 1,
+        )
+        client.refresh_token_if_required()
+        deadline = time.time() + 5
+        while client.api_token == "token-1" and time.time() < deadline:
+            time.sleep(0.05)
+        client.close()
+        self.assertNotEqual("token-1", client.api_token)
+        self.assertEqual(client.api_token, client.token_store.load().api_token)
+
+    def test_renew_before_beyond_validity(self):
+        for renew_before in [TOKEN_VALIDITY, -1]:
+            with self.assertRaises(ValueError):
+                twikey.TwikeyClient(
+                    "key", self.server.base_url, renew_before=renew_before
+                )
+
+
+class TestFeeds(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLoginServer()
+        self.client = twikey.TwikeyClient("key", self.server.base_url)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_iter_feed(self):
+        self.server.pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        items = [
+            (position, tx.id) for position, tx in self.client.transaction.iter_feed()
+        ]
+        self.assertEqual([("1", 1), ("1", 2), ("0", 3)], items)
+
+    def test_iter_feed_is_lazy(self):
+        self.server.pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        for item in self.client.refund.iter_feed():
+            break
+        self.assertEqual(1, self.server.gets)
+        self.assertEqual(1, len(self.server.pages))
+
+    def test_iter_feed_streamed(self):
+        self.server.pages = [[{"id": "inv-1"}, {"id": "inv-2"}], [{"id": "inv-3"}]]
+        items = [
+            (position, invoice.id)
+            for position, invoice in self.client.invoice.iter_feed(stream=True)
+        ]
+        self.assertEqual([("1", "inv-1"), ("1", "inv-2"), ("0", "inv-3")], items)
+        with self.assertRaises(ValueError):
+            self.client.invoice.iter_feed(stream=True, prefetch=1).__next__()
+
+    def test_feed_stops_on_error(self):
+        self.server.pages = [[{"id": "inv-1"}, {"id": "inv-2"}], [{"id": "inv-3"}]]
+        seen = []
+
+        class MyFeed(twikey.InvoiceFeed):
+            def invoice(self, invoice):
+                seen.append(invoice.id)
+                return True
+
+        self.client.invoice.feed(MyFeed())
+        self.assertEqual(["inv-1"], seen)
+        self.assertEqual(1, self.server.gets)
+
+
+class TestPageHandler(unittest.TestCase):
+    def test_page_hook(self):
+        server = FakeLoginServer()
+        server.pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        pages = []
+
+        class BulkFeed(twikey.TransactionFeed):
+            def page(self, position, transactions):
+                pages.append((position, [tx.id for tx in transactions]))
+
+        with twikey.TwikeyClient("key", server.base_url) as client:
+            client.transaction.feed(BulkFeed())
+        server.stop()
+        self.assertEqual([("1", [1, 2]), ("0", [3])], pages)
+
+    def test_item_handler_stops_feed(self):
+        server = FakeLoginServer()
+        server.pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+        seen = []
+
+        class MyFeed(twikey.TransactionFeed):
+            def transaction(self, transaction):
+                seen.append(transaction.id)
+                return transaction.id == 1
+
+        with twikey.TwikeyClient("key", server.base_url) as client:
+            stats = client.transaction.feed(MyFeed())
+        server.stop()
+        self.assertEqual([1], seen)
+        self.assertEqual(1, stats.pages)
+
+    def test_default_page_calls_item_handler(self):
+        seen = []
+
+        class MyFeed(twikey.PaylinkFeed):
+            def paylink(self, paylink):
+                seen.append(paylink)
+
+        self.assertFalse(MyFeed().page("1", ["a", "b"]))
+        self.assertEqual(["a", "b"], seen)
+
+    def test_first_stop_signal_kept(self):
+        class MyFeed(twikey.PaylinkFeed):
+            def paylink(self, paylink):
+                return paylink == "stop"
+
+        self.assertTrue(MyFeed().page("1", ["a", "stop", "b"]))
+
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLoginServer()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_stores(self):
+        for store in [
+            twikey.MemoryCheckpointStore(),
+            twikey.FileCheckpointStore(os.path.join(self.directory.name, "feeds.json")),
+            twikey.SQLiteCheckpointStore(os.path.join(self.directory.name, "feeds.db")),
+        ]:
+            self.assertIsNone(store.load("invoice"))
+            store.save("invoice", 12)
+            store.save("refund", "7")
+            store.save("invoice", 13)
+            self.assertEqual("13", store.load("invoice"))
+            self.assertEqual("7", store.load("refund"))
+
+    def test_commit_after_handled_page_and_resume(self):
+        store = twikey.SQLiteCheckpointStore(
+            os.path.join(self.directory.name, "feeds.db")
+        )
+        self.server.pages = [
+            [{"id": "inv-1"}, {"id": "inv-2"}],
+            [{"id": "inv-3"}, {"id": "inv-4"}],
+        ]
+
+        class StopAtThree(twikey.InvoiceFeed):
+            def invoice(self, invoice):
+                return invoice.id == "inv-3"  # handler fails halfway the second page
+
+        with twikey.TwikeyClient(
+            "key", self.server.base_url, checkpoint_store=store
+        ) as client:
+            client.invoice.feed(StopAtThree())
+            self.assertEqual(
+                "1", store.load("invoice")
+            )  # only the first page was fully handled
+            self.assertEqual([], self.server.resumed)
+
+            self.server.pages = [[{"id": "inv-3"}, {"id": "inv-4"}]]
+            items = [tx.id for _, tx in client.transaction.iter_feed()]
+            self.assertEqual(["inv-3", "inv-4"], items)
+            self.assertEqual("0", store.load("transaction"))
+
+            list(client.invoice.iter_feed())
+            self.assertEqual(["1"], self.server.resumed)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_bounded_read_ahead(self):
+        fetched = []
+
+        def pages():
+            for position in range(1, 6):
+                fetched.append(position)
+                yield str(position), [position]
+
+        iterator = prefetch_pages(pages(), read_ahead=2)
+        self.assertEqual(("1", [1]), next(iterator))
+        time.sleep(0.1)  # handling the first page
+        self.assertEqual([1, 2, 3], fetched)
+        iterator.close()
+        self.assertEqual([1, 2, 3], fetched)
+
+    def test_errors_are_raised_in_order(self):
+        def pages():
+            yield "1", [1]
+            raise twikey.TwikeyError("Feed", "err_call", "failed")
+
+        iterator = prefetch_pages(pages())
+        self.assertEqual(("1", [1]), next(iterator))
+        with self.assertRaises(twikey.TwikeyError):
+            next(iterator)
+
+    def test_feed_with_prefetch(self):
+        server = FakeLoginServer()
+        server.pages = [[{"id": 1}], [{"id": 2}], [{"id": 3}], [{"id": 4}]]
+        seen = []
+
+        class MyFeed(twikey.TransactionFeed):
+            def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        with twikey.TwikeyClient("key", server.base_url) as client:
+            client.transaction.feed(MyFeed(), prefetch=1)
+            self.assertEqual([1, 2, 3, 4], seen)
+
+            server.pages = [[{"id": "inv-1"}], [{"id": "inv-2"}], [{"id": "inv-3"}]]
+            gets = server.gets
+            positions = []
+            for position, invoice in client.invoice.iter_feed(prefetch=1):
+                positions.append(position)
+                break
+            self.assertEqual(["2"], positions)
+            self.assertLessEqual(
+                server.gets - gets, 2
+            )  # the handled page and at most one read ahead
+        server.stop()
+
+
+class TestFeedRunner(unittest.TestCase):
+    def test_drains_all_feeds(self):
+        server = FakeLoginServer()
+        server.pages = [[{"id": 1}, {"id": 2}], [{"id": 3}], [{"id": 4}]]
+        seen = []
+
+        class MyTransactionFeed(twikey.TransactionFeed):
+            def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        class MyRefundFeed(twikey.RefundFeed):
+            def refund(self, refund):
+                seen.append(refund.id)
+
+        store = twikey.MemoryCheckpointStore()
+        with twikey.TwikeyClient(
+            "key", server.base_url, checkpoint_store=store
+        ) as client:
+            runner = twikey.FeedRunner(
+                client, transaction=MyTransactionFeed(), refund=MyRefundFeed()
+            )
+            summary = runner.run()
+        server.stop()
+        self.assertEqual([1, 2, 3, 4], sorted(seen))
+        self.assertEqual(["transaction", "refund"], list(summary.feeds))
+        self.assertEqual(4, summary.items)
+        self.assertEqual(3, summary.pages)
+        self.assertEqual({}, summary.errors)
+        for name, stats in summary.feeds.items():
+            self.assertEqual(stats.position, store.load(name))
+
+    def test_failing_feed_does_not_stop_others(self):
+        class Service:
+            def __init__(self, name, error=None):
+                self.name = name
+                self.error = error
+
+            def feed(self, handler, prefetch=0):
+                if self.error:
+                    raise self.error
+                stats = twikey.FeedStats(self.name)
+                stats.pages, stats.items, stats.position = 2, 5, "9"
+                return stats
+
+        class Client:
+            invoice = Service(
+                "invoice", twikey.TwikeyError("Invoice feed", "err_call", "failed")
+            )
+            paylink = Service("paylink")
+
+        summary = twikey.FeedRunner(Client(), invoice=object(), paylink=object()).run()
+        self.assertEqual(["invoice"], list(summary.errors))
+        self.assertEqual(5, summary.items)
+        self.assertIn("invoice: 0 items", str(summary))
+
+
+class TestFeedDaemon(unittest.TestCase):
+    def test_adaptive_interval(self):
+        daemon = twikey.FeedDaemon(None, min_interval=1, max_interval=10)
+        busy = twikey.RunSummary({"transaction": twikey.FeedStats("transaction")}, 0)
+        busy.feeds["transaction"].items = 3
+        idle = twikey.RunSummary({"transaction": twikey.FeedStats("transaction")}, 0)
+        intervals = []
+        for summary in [idle, idle, idle, idle, idle, busy, idle]:
+            daemon.interval = daemon.next_interval(summary)
+            intervals.append(daemon.interval)
+        self.assertEqual([2, 4, 8, 10, 10, 1, 2], intervals)
+
+    def test_wake_and_stop(self):
+        server = FakeLoginServer()
+        seen = []
+
+        class MyFeed(twikey.TransactionFeed):
+            def transaction(self, transaction):
+                seen.append(transaction.id)
+
+        with twikey.TwikeyClient("key", server.base_url) as client:
+            daemon = twikey.FeedDaemon(
+                client, min_interval=30, max_interval=60, transaction=MyFeed()
+            )
+            thread = threading.Thread(target=daemon.run_forever)
+            thread.start()
+            time.sleep(0.5)
+            server.pages = [[{"id": 1}]]
+            daemon.wake()  # instead of waiting a minute
+            for _ in range(50):
+                if seen:
+                    break
+                time.sleep(0.1)
+            daemon.stop()
+            thread.join(5)
+        server.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([1], seen)
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeLoginServer()
+        self.client = twikey.TwikeyClient(
+            "key",
+            self.server.base_url,
+            retry=twikey.RetryPolicy(max_attempts=3, backoff_factor=0),
+        )
+        self.client.refresh_token_if_required()
+        self.url = self.client.instance_url("/transaction")
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_transient_errors_retried(self):
+        self.server.failures = [(503, {}), (502, {})]
+        response = self.client.session.get(self.url, headers=self.client.headers())
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, self.server.gets)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.failures = [(503, {})] * 5
+        response = self.client.session.get(self.url, headers=self.client.headers())
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(3, self.server.gets)
+
+    def test_non_idempotent_only_retried_when_rate_limited(self):
+        self.server.failures = [(503, {})]
+        response = self.client.session.request(
+            "GET", self.url, headers=self.client.headers(), idempotent=False
+        )
+        self.assertEqual(503, response.status_code)
+
+        self.server.failures = [(429, {"X-Rate-Limit-Retry-After-Seconds": "0"})]
+        self.client.transaction.feed(twikey.TransactionFeed())
+        self.assertEqual(3, self.server.gets)  # 503, 429, then the empty feed page
+
+    def test_deadline_stops_retrying(self):
+        self.client.session.retry = twikey.RetryPolicy(
+            max_attempts=10, backoff_factor=0.2, jitter=False
+        )
+        self.server.failures = [(503, {})] * 10
+        timeout = twikey.Timeout(read=5, connect=5, total=0.5)
+        start = time.monotonic()
+        response = self.client.session.get(
+            self.url, headers=self.client.headers(), timeout=timeout
+        )
+        self.assertEqual(503, response.status_code)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(
+            2, self.server.gets
+        )  # waiting 0.2 and then 0.4s would pass the deadline
+
+    def test_deadline_without_read_timeout(self):
+        timeout = twikey.Timeout(read=None, connect=None, total=5)
+        response = self.client.session.get(
+            self.url, headers=self.client.headers(), timeout=timeout
+        )
+        self.assertEqual(200, response.status_code)
+
+    def test_retry_after(self):
+        policy = twikey.RetryPolicy(max_retry_after=10)
+        response = requests.models.Response()
+        response.status_code = 429
+        response.headers["Retry-After"] = "2"
+        self.assertEqual(2.0, policy.on_response("POST", response, 1))
+        response.headers["Retry-After"] = "3600"
+        self.assertIsNone(policy.on_response("POST", response, 1))
+
+    def test_retry_after_on_unavailable(self):
+        policy = twikey.RetryPolicy()
+        response = requests.models.Response()
+        response.status_code = 503
+        response.headers["Retry-After"] = "2"
+        self.assertIsNone(
+            policy.on_response("POST", response, 1)
+        )  # the payment may have been processed
+        self.assertEqual(2.0, policy.on_response("GET", response, 1))
+        response.headers["X-Rate-Limit-Retry-After-Seconds"] = "1"
+        self.assertEqual(1.0, policy.on_response("POST", response, 1))
+
+
+class TestTimeouts(unittest.TestCase):
+    def test_overrides(self):
+        policy = twikey.TimeoutPolicy(
+            connect=3,
+            read=10,
+            overrides={
+                "invoice": twikey.Timeout(connect=1),
+                "invoice.upload_ubl": 120,
+                "document.feed": 20,
+            },
+        )
+        create = policy.get("invoice.create")
+        self.assertEqual((1, 10, None), (create.connect, create.read, create.total))
+        upload = policy.get("invoice.upload_ubl")
+        self.assertEqual((1, 120), (upload.connect, upload.read))
+        self.assertEqual(
+            10, policy.get("invoice.bulk_create").read
+        )  # the configured default read wins
+        self.assertEqual(10, policy.get("transaction.batch_send").read)
+        self.assertEqual(
+            (3, 20),
+            (policy.get("document.feed").connect, policy.get("document.feed").read),
+        )
+        self.assertIs(create, policy.get("invoice.create"))
+
+    def test_built_in_overrides_below_configured(self):
+        self.assertEqual(30, twikey.TimeoutPolicy().get("invoice.bulk_create").read)
+        self.assertEqual(15, twikey.TimeoutPolicy().get("invoice.create").read)
+        self.assertEqual(
+            90, twikey.TimeoutPolicy(read=90).get("invoice.bulk_create").read
+        )
+        policy = twikey.TimeoutPolicy(overrides={"transaction": 120})
+        self.assertEqual(120, policy.get("transaction.batch_send").read)
+        policy = twikey.TimeoutPolicy(
+            overrides={"transaction.batch_send": twikey.Timeout(connect=1)}
+        )
+        batch_send = policy.get("transaction.batch_send")
+        self.assertEqual((1, 60), (batch_send.connect, batch_send.read))
+
+    def test_client_timeouts(self):
+        with twikey.TwikeyClient(
+            "key", timeouts=twikey.TimeoutPolicy(total=60)
+        ) as client:
+            self.assertEqual(60, client.timeout("refund.create").total)
+
+
+if __name__ == "__main__":
+    unittest.main()
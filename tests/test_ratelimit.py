@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+import requests
+
+import twikey
+from twikey.ratelimit import TokenBucket
+
+
+def _response(status, **headers):
+    response = requests.models.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_endpoint_class(self):
+        self.assertEqual(
+            "invoice",
+            twikey.RateLimiter.endpoint_class(
+                "https://api.twikey.com/creditor/invoice/1"
+            ),
+        )
+        self.assertEqual(
+            "payment",
+            twikey.RateLimiter.endpoint_class(
+                "https://api.twikey.com/creditor/payment/link"
+            ),
+        )
+        self.assertEqual(
+            "login",
+            twikey.RateLimiter.endpoint_class("https://api.twikey.com/creditor"),
+        )
+
+    def test_budgets(self):
+        limiter = twikey.RateLimiter(
+            rate=5, budgets={"invoice": 2, "transaction": (3, 6)}
+        )
+        self.assertEqual(
+            2, limiter.bucket("https://api.twikey.com/creditor/invoice").max_rate
+        )
+        self.assertEqual(
+            6, limiter.bucket("https://api.twikey.com/creditor/transaction").burst
+        )
+        self.assertIs(
+            limiter.buckets["default"],
+            limiter.bucket("https://api.twikey.com/creditor/mandate"),
+        )
+
+    def test_smooths_threads_to_rate(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        start = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(21)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_adapts_to_rate_limit_headers(self):
+        limiter = twikey.RateLimiter(rate=10)
+        url = "https://api.twikey.com/creditor/invoice"
+        bucket = limiter.bucket(url)
+        limiter.update(url, _response(429, **{"X-Rate-Limit-Retry-After-Seconds": "2"}))
+        self.assertEqual(5, bucket.rate)
+        self.assertGreater(limiter.reserve(url), 1.5)  # paused as requested by the api
+        for _ in range(100):
+            limiter.update(url, _response(200))
+        self.assertEqual(10, bucket.rate)
+
+
+if __name__ == "__main__":
+    unittest.main()
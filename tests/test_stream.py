@@ -0,0 +1,47 @@
+import json
+import unittest
+
+from twikey.stream import ItemDecoder, iter_items
+
+
+class TestItemDecoder(unittest.TestCase):
+    def test_any_chunk_size(self):
+        page = {
+            "Meta": {"note": 'not the "Invoices": [ list', "ids": [1, 2]},
+            "Invoices": [
+                {"id": i, "title": "factûre €%d" % i, "amount": i * 1.25}
+                for i in range(50)
+            ]
+            + [10, "x"],
+            "Total": 52,
+        }
+        body = json.dumps(page, ensure_ascii=False).encode()
+        for size in [1, 2, 5, 64, len(body)]:
+            chunks = [body[i : i + size] for i in range(0, len(body), size)]
+            self.assertEqual(
+                page["Invoices"], list(iter_items(chunks, "Invoices")), size
+            )
+
+    def test_items_as_soon_as_complete(self):
+        decoder = ItemDecoder("Entries")
+        self.assertEqual([], decoder.feed(b'{"Entries": [{"id": 1'))
+        self.assertEqual([{"id": 1}], decoder.feed(b'}, {"id"'))
+        self.assertEqual([{"id": 2}], decoder.feed(b': 2}, {"id": 3'))
+        self.assertEqual([{"id": 3}], decoder.feed(b"}]}", final=True))
+
+    def test_number_split_between_chunks(self):
+        decoder = ItemDecoder("Entries")
+        self.assertEqual([], decoder.feed(b'{"x": 3.'))
+        self.assertEqual([1], decoder.feed(b'5, "Entries": [1, -1500.'))
+        self.assertEqual([-1500.0], decoder.feed(b"0, 2e"))
+        self.assertEqual([2000.0], decoder.feed(b"3, 7"))
+        self.assertEqual([7], decoder.feed(b"]}", final=True))
+
+    def test_empty_and_missing_list(self):
+        self.assertEqual([], list(iter_items([b'{"Links": []}'], "Links")))
+        self.assertEqual([], list(iter_items([b"{}"], "Links")))
+
+    def test_invalid(self):
+        for body in [b'{"Links": [{"id": 1}', b'{"Links": [1,}', b"[]", b"{} {}"]:
+            with self.assertRaises(ValueError):
+                list(iter_items([body], "Links"))
@@ -0,0 +1,115 @@
+import time
+import unittest
+
+import twikey
+from twikey.model.refund_request import NewBeneficiaryRequest, NewRefundRequest
+from twikey.model.transaction_request import NewTransactionRequest
+from twikey.stub import StubTwikey, UNKNOWN_BENEFICIARY
+
+
+class TestStubTwikey(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubTwikey(api_key="key", page_size=3).start()
+        self.client = twikey.TwikeyClient(
+            "key",
+            self.stub.base_url,
+            retry=twikey.RetryPolicy(max_attempts=3, backoff_factor=0),
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_feed_pages(self):
+        self.stub.add(
+            "transaction",
+            [{"id": i, "ref": "ref%d" % i, "state": "PAID"} for i in range(7)],
+        )
+        pages = list(self.client.transaction.iter_feed())
+        self.assertEqual(
+            list(range(7)), [transaction.id for position, transaction in pages]
+        )
+        self.assertEqual(
+            ["3", "3", "3", "6", "6", "6", "7"],
+            [position for position, transaction in pages],
+        )
+        self.assertEqual(7, self.stub.position("transaction"))
+        self.assertEqual(
+            4, self.stub.calls["GET /transaction"]
+        )  # 3 pages and the empty one
+
+        resumed = self.client.transaction.iter_feed(start_position=3)
+        self.assertEqual(
+            [3, 4, 5, 6], [transaction.id for position, transaction in resumed]
+        )
+
+    def test_created_items_in_feed(self):
+        transaction = self.client.transaction.create(
+            NewTransactionRequest(mandate_number="MNDT1", message="Test", amount=10.5)
+        )
+        self.assertEqual("MNDT1", transaction.mndtId)
+        self.assertEqual(
+            [transaction.id],
+            [tx.id for position, tx in self.client.transaction.iter_feed()],
+        )
+
+    def test_refund_needs_beneficiary(self):
+        request = NewRefundRequest(
+            customer_number="C1", iban="BE68539007547034", message="Refund", amount=5
+        )
+        with self.assertRaises(twikey.TwikeyError) as error:
+            self.client.refund.create(request)
+        self.assertEqual(UNKNOWN_BENEFICIARY, error.exception.get_code())
+
+        self.client.refund.create_beneficiary_account(
+            NewBeneficiaryRequest(name="Info", iban="BE68539007547034")
+        )
+        self.assertEqual("BE68539007547034", self.client.refund.create(request).iban)
+
+    def test_injected_failures(self):
+        self.stub.fail("/transaction", status=503, method="POST")
+        with self.assertRaises(twikey.TwikeyError):
+            self.client.transaction.create(
+                NewTransactionRequest(mandate_number="MNDT1", message="Test", amount=1)
+            )
+        self.assertEqual(
+            1, self.stub.calls["POST /transaction"]
+        )  # a POST is not retried on a 503
+
+        self.stub.fail("/transfer/detail", status=503)
+        self.stub.fail("/transfer/detail", disconnect=True)
+        with self.assertRaises(twikey.TwikeyError) as error:
+            self.client.refund.details("T1")
+        self.assertEqual("err_not_found", error.exception.get_code())
+        self.assertEqual(
+            3, self.stub.calls["GET /transfer/detail"]
+        )  # the 503 and the disconnect were retried
+
+    def test_rate_limited(self):
+        self.stub.fail("/transaction", status=429, retry_after=0)
+        self.client.transaction.create(
+            NewTransactionRequest(mandate_number="MNDT1", message="Test", amount=1)
+        )
+        self.assertEqual(2, self.stub.calls["POST /transaction"])
+
+    def test_relogin_on_expired_token(self):
+        self.client.transaction.create(
+            NewTransactionRequest(mandate_number="MNDT1", message="Test", amount=1)
+        )
+        self.stub.expire_tokens()
+        self.client.transaction.create(
+            NewTransactionRequest(mandate_number="MNDT1", message="Test", amount=1)
+        )
+        self.assertEqual(2, self.stub.logins)
+        self.assertEqual(3, self.stub.calls["POST /transaction"])
+
+    def test_latency(self):
+        self.client.refresh_token_if_required()
+        self.stub.latency = 0.05
+        start = time.monotonic()
+        list(self.client.transaction.iter_feed())
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,21 +8,65 @@ from .model.transaction_response import TransactionFeed
 from .paylink import PaylinkFeed
 from .model.invoice_response import InvoiceFeed
 from .refund import RefundFeed
+from .retry import RetryPolicy
+from .ratelimit import RateLimiter
+from .timeouts import Timeout, TimeoutPolicy
+from .codec import JsonCodec, OrjsonCodec, UjsonCodec
+from .feed import FeedItem, FeedStats
+from .bulk import BulkResult, BulkSummary
+from .journal import Journal, MemoryJournal, FileJournal
+from .runner import FeedRunner, FeedDaemon, RunSummary
+from .checkpoint import (
+    CheckpointStore,
+    MemoryCheckpointStore,
+    FileCheckpointStore,
+    SQLiteCheckpointStore,
+)
+from .token import (
+    Token,
+    TokenStore,
+    MemoryTokenStore,
+    FileTokenStore,
+    CallbackTokenStore,
+)
 
 __all__ = [
     "TwikeyClient",
     "Webhook",
-
     "Document",
     "DocumentFeed",
     "InviteRequest",
     "SignRequest",
-
     "Transaction",
     "TransactionFeed",
-
     "PaylinkFeed",
     "InvoiceFeed",
     "RefundFeed",
     "TwikeyError",
+    "Token",
+    "TokenStore",
+    "MemoryTokenStore",
+    "FileTokenStore",
+    "CallbackTokenStore",
+    "RetryPolicy",
+    "RateLimiter",
+    "Timeout",
+    "TimeoutPolicy",
+    "CheckpointStore",
+    "MemoryCheckpointStore",
+    "FileCheckpointStore",
+    "SQLiteCheckpointStore",
+    "FeedItem",
+    "FeedStats",
+    "FeedRunner",
+    "FeedDaemon",
+    "RunSummary",
+    "BulkResult",
+    "BulkSummary",
+    "Journal",
+    "MemoryJournal",
+    "FileJournal",
+    "JsonCodec",
+    "OrjsonCodec",
+    "UjsonCodec",
 ]
@@ -0,0 +1,13 @@
+"""
+asyncio support for the Twikey api, requires the optional httpx dependency
+
+    pip install twikey-api-python[async]
+"""
+from .client import AsyncTwikeyClient
+from .runner import AsyncFeedRunner, AsyncFeedDaemon
+
+__all__ = [
+    "AsyncTwikeyClient",
+    "AsyncFeedRunner",
+    "AsyncFeedDaemon",
+]
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from ..bulk import BulkResult
+
+logger = logging.getLogger(__name__)
+
+
+async def call(fn, index, request, semaphore=None) -> BulkResult:
+    """
+    :param semaphore: optional asyncio.Semaphore bounding the number of calls running at once
+    :return: BulkResult of awaiting fn(request), holding the error instead of raising it
+    """
+    try:
+        if semaphore is None:
+            return BulkResult(index, request, await fn(request))
+        async with semaphore:
+            return BulkResult(index, request, await fn(request))
+    except Exception as e:
+        logger.debug("Request %d failed: %s", index, e)
+        return BulkResult(index, request, error=e)
+
+
+async def run_many(fn, requests, concurrency=8, ordered=True):
+    """
+    asyncio version of twikey.bulk.run_many, running at most concurrency calls as tasks on the event loop.
+
+    Args:
+        fn: Coroutine function doing one call, eg. client.invoice.create.
+        requests: Iterable or async iterable of requests.
+        concurrency (int): Number of calls running at the same time.
+        ordered (bool): Yield the results in the order of the requests, otherwise as soon as they complete.
+
+    Yields:
+        BulkResult: for each request.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if hasattr(requests, "__aiter__"):
+        requests = requests.__aiter__()
+    else:
+        requests = iter(requests)
+    # when ordered, results after a slow call are held back, so keep more calls queued to keep the slots busy
+    window = 2 * concurrency if ordered else concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = deque() if ordered else set()
+    try:
+        index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    if hasattr(requests, "__anext__"):
+                        request = await requests.__anext__()
+                    else:
+                        request = next(requests)
+                except (StopIteration, StopAsyncIteration):
+                    exhausted = True
+                    break
+                task = asyncio.ensure_future(call(fn, index, request, semaphore))
+                if ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+                index += 1
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    pending.remove(task)
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def journaled(fn, journal, dump, load, key=None):
+    """
+    asyncio version of twikey.bulk.journaled, fn being a coroutine function.
+    """
+    done = journal.load()
+    if done:
+        logger.info("Skipping the %d requests done according to the journal", len(done))
+
+    async def call(item):
+        index, request = item
+        name = str(index if key is None else key(request))
+        if name in done:
+            return load(done[name])
+        result = await fn(request)
+        journal.record(name, dump(result))
+        return result
+
+    return call
+
+
+async def _enumerate(requests):
+    index = 0
+    if hasattr(requests, "__aiter__"):
+        async for request in requests:
+            yield index, request
+            index += 1
+    else:
+        for request in requests:
+            yield index, request
+            index += 1
+
+
+async def run_journaled(
+    fn, requests, journal, dump, load, key=None, concurrency=8, ordered=True
+):
+    """
+    asyncio version of twikey.bulk.run_journaled, requests may also be an async iterable.
+    """
+    results = run_many(
+        journaled(fn, journal, dump, load, key),
+        _enumerate(requests),
+        concurrency,
+        ordered,
+    )
+    try:
+        async for result in results:
+            yield result._replace(request=result.request[1])
+    finally:
+        await results.aclose()
+
+
+async def chunked(requests, size):
+    """
+    Split an iterable or async iterable in lists of at most size elements, see twikey.bulk.chunked.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    chunk = []
+    if hasattr(requests, "__aiter__"):
+        async for request in requests:
+            chunk.append(request)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    else:
+        for request in requests:
+            chunk.append(request)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def poll(check, interval=1.0, max_interval=30.0, backoff=2.0, timeout=None):
+    """
+    asyncio version of twikey.bulk.poll, check being a coroutine function.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        result = await check()
+        if result is not None:
+            return result
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Still not ready after %ss" % timeout)
+            interval = min(interval, remaining)
+        await asyncio.sleep(interval)
+        interval = min(max_interval, interval * backoff)
@@ -0,0 +1,321 @@
+import asyncio
+import datetime
+import logging
+import time
+from collections import ChainMap
+from types import MappingProxyType
+
+import httpx
+
+from ..client import TwikeyClient, TwikeyError
+from ..codec import default_codec
+from ..timeouts import TimeoutPolicy, Timeout
+from ..token import TOKEN_VALIDITY
+from .document import AsyncDocumentService
+from .invoice import AsyncInvoiceService
+from .transaction import AsyncTransactionService
+from .paylink import AsyncPaylinkService
+from .refund import AsyncRefundService
+from .session import AsyncTwikeySession
+
+
+class AsyncTwikeyClient(object):
+    """
+    asyncio counterpart of the TwikeyClient.
+
+    Exposes the same services (document, invoice, transaction, paylink and refund) with coroutine
+    methods that accept and return the same request and response models. All calls share a single
+    pooled httpx.AsyncClient so many requests can be in flight on one event loop.
+
+    Sample usage
+
+        async with AsyncTwikeyClient(APIKEY) as client:
+            invoice = await client.invoice.create(InvoiceRequest(...))
+            async for position, transaction in client.transaction.iter_feed():
+                ...
+    """
+
+    lastLogin = None
+    api_key = None
+    api_token = None  # Once authenticated
+    merchant_id = 0  # Once authenticated
+    private_key = None
+    vendorPrefix = b"own"
+    api_base = "https://api.twikey.com"
+
+    document = None
+    transaction = None
+    paylink = None
+    invoice = None
+    refund = None
+
+    def __init__(
+        self,
+        api_key,
+        base_url="https://api.twikey.com/creditor",
+        user_agent="twikey-python/v0.1.0",
+        private_key=None,
+        pool_maxsize=100,
+        keep_alive=True,
+        retry=None,
+        rate_limiter=None,
+        timeouts=None,
+        checkpoint_store=None,
+        codec=None,
+    ) -> None:
+        """
+        Args:
+            api_key (str): The api key as found in the Twikey merchant interface.
+            base_url (str): The base url of the api.
+            user_agent (str): User agent sent along with each request.
+            private_key (str): Optional private key used to generate a TOTP during login.
+            pool_maxsize (int): Maximum number of concurrent connections.
+            keep_alive (bool): Reuse connections between calls (default True).
+            retry (RetryPolicy): How transient failures are retried, defaults to RetryPolicy().
+            rate_limiter (RateLimiter): Optional client side limit on the outgoing calls, can be shared with
+                TwikeyClient instances in other threads.
+            timeouts (TimeoutPolicy): Connect/read timeouts and deadline per operation, defaults to TimeoutPolicy().
+            checkpoint_store (CheckpointStore): Optional store of the feed positions, see TwikeyClient.
+            codec (JsonCodec): Encoder and decoder of the json bodies, see TwikeyClient.
+        """
+        self.user_agent = user_agent
+        self.api_key = api_key
+        self.private_key = private_key
+        self.api_base = base_url
+        self.merchant_id = 0
+        self.session = AsyncTwikeySession(
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            relogin=self._relogin,
+            retry=retry,
+            rate_limiter=rate_limiter,
+        )
+        self.timeouts = timeouts if timeouts is not None else TimeoutPolicy()
+        self.checkpoint_store = checkpoint_store
+        self.codec = codec if codec is not None else default_codec()
+        self._login_lock = None
+        self._header_templates = (None, {})  # (token, {content_type: headers})
+        self._token_deadline = (
+            0.0  # time.monotonic() value until which api_token can be used
+        )
+        self.document = AsyncDocumentService(self)
+        self.invoice = AsyncInvoiceService(self)
+        self.transaction = AsyncTransactionService(self)
+        self.paylink = AsyncPaylinkService(self)
+        self.refund = AsyncRefundService(self)
+        self.logger = logging.getLogger(__name__)
+
+    def instance_url(self, url=""):
+        return "{}{}".format(self.api_base, url)
+
+    def timeout(self, operation) -> Timeout:
+        """
+        :param operation: name of the call, eg. 'invoice.create'
+        :return: the Timeout configured for it
+        """
+        return self.timeouts.get(operation)
+
+    async def ping(self) -> bool:
+        try:
+            await self.refresh_token_if_required()
+            return True
+        except Exception:
+            return False
+
+    def _token_valid(self):
+        return time.monotonic() < self._token_deadline
+
+    async def refresh_token_if_required(self):
+        if time.monotonic() < self._token_deadline:
+            return
+        await self._refresh_token()
+
+    async def _refresh_token(self, stale_token=None):
+        if not self.api_base:
+            raise TwikeyError(
+                ctx="Config",
+                error_code="Api-Url",
+                error="No base url defined - %s" % self.api_base,
+            )
+
+        if not self.api_key:
+            raise TwikeyError(
+                ctx="Config",
+                error_code="Api-Key",
+                error="No key defined - %s" % self.api_base,
+            )
+
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            # another task may have logged in while we were waiting
+            if self._token_valid() and (
+                stale_token is None or self.api_token != stale_token
+            ):
+                return
+            await self._login()
+
+    async def _relogin(self, stale_token):
+        """
+        Called by the session when the api rejected stale_token, returns the token to retry with.
+        """
+        self.logger.debug("Token rejected by the api, logging in again")
+        await self._refresh_token(stale_token)
+        return self.api_token
+
+    async def _login(self):
+        payload = {"apiToken": self.api_key}
+        if self.private_key:
+            payload["otp"] = TwikeyClient.get_totp(self.vendorPrefix, self.private_key)
+
+        self.logger.debug(
+            "Authenticating with {} using {}...".format(
+                self.api_base, self.api_key[0:10]
+            )
+        )
+        try:
+            response = await self.session.request(
+                "POST",
+                self.instance_url(),
+                data=payload,
+                headers={"User-Agent": self.user_agent},
+                timeout=self.timeout("login"),
+                idempotent=True,  # a repeated login just yields another token
+            )
+        except httpx.HTTPError as e:
+            raise self.raise_error_from_request("Authentication", e)
+
+        if "ApiErrorCode" in response.headers:
+            error_json = self.decode(response)
+            self.logger.error(error_json)
+            error_code = response.headers["ApiErrorCode"]
+            error_json_message = "Error authenticating : %s" % error_json["message"]
+            raise TwikeyError(
+                ctx="Config", error_code=error_code, error=error_json_message
+            )
+
+        if "X-Rate-Limit-Retry-After-Seconds" in response.headers:
+            retry_after_seconds = response.headers["X-Rate-Limit-Retry-After-Seconds"]
+            error_message = (
+                "Too many login's, please try again after %s sec." % retry_after_seconds
+            )
+            raise TwikeyError(
+                ctx="Config", error_code="Rate limit", error=error_message
+            )
+
+        if "Authorization" in response.headers:
+            self.api_token = response.headers["Authorization"]
+            self.merchant_id = response.headers["X-MERCHANT-ID"]
+            self.lastLogin = datetime.datetime.now()
+            self._token_deadline = time.monotonic() + TOKEN_VALIDITY
+        else:
+            error_message = "Invalid response for url=%s : %s" % (
+                self.instance_url(),
+                response,
+            )
+            raise TwikeyError(
+                ctx="Config", error_code="Authentication", error=error_message
+            )
+
+    def headers(
+        self, content_type="application/x-www-form-urlencoded", extra=None
+    ) -> dict:
+        """
+        :param content_type: Content-type of the request body
+        :param extra: optional dict of additional headers
+        :return: the headers for an api call, as a new dict the caller may change
+        """
+        return dict(self._headers(content_type, extra))
+
+    def _headers(self, content_type="application/x-www-form-urlencoded", extra=None):
+        """
+        Headers for an api call as used by the services, the base set is built once per token and content type.
+
+        :param content_type: Content-type of the request body
+        :param extra: optional dict of additional headers layered on top of the base set
+        :return: a read-only mapping of headers, shared between calls
+        """
+        api_token = self.api_token
+        cached_token, templates = self._header_templates
+        if cached_token != api_token:
+            templates = {}
+            self._header_templates = (api_token, templates)
+        template = templates.get(content_type)
+        if template is None:
+            template = MappingProxyType(
+                {
+                    "Content-type": content_type,
+                    "Authorization": api_token,
+                    "Accept": "application/json",
+                    "User-Agent": self.user_agent,
+                }
+            )
+            templates[content_type] = template
+        if extra:
+            return ChainMap(extra, template)
+        return template
+
+    def encode(self, payload) -> bytes:
+        """
+        :param payload: dict or list to send as json body
+        :return: the body encoded with the codec of the client
+        """
+        return self.codec.dumps(payload)
+
+    def decode(self, response):
+        """
+        :param response: response with a json body
+        :return: the body decoded with the codec of the client
+        :raises httpx.DecodingError: when the body is not valid json
+        """
+        try:
+            return self.codec.loads(response.content)
+        except ValueError as e:
+            raise httpx.DecodingError(str(e), request=response.request)
+
+    def raise_error(self, context, response):
+        self.logger.error("Error in '%s' response %s " % (context, response.text))
+        try:
+            error_json = self.decode(response)
+            extra = error_json["extra"] if "extra" in error_json else False
+            return TwikeyError(
+                context, error_json["code"], error_json["message"], extra
+            )
+        except httpx.DecodingError:
+            return TwikeyError(context, str(response.url), response.text)
+
+    def raise_error_from_request(self, context, request_exception):
+        self.logger.error("Error in '%s' request %s " % (context, request_exception))
+        return TwikeyError(
+            context, request_exception.__class__.__name__, request_exception
+        )
+
+    async def logout(self):
+        self.logger.info("Logging out of Twikey")
+        response = await self.session.get(
+            self.instance_url(),
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout("logout"),
+        )
+        response_text = self.decode(response)
+        if "code" in response_text:
+            if "err" in response_text["code"]:
+                raise TwikeyError(
+                    ctx="Logout", error_code="Logout", error=response_text["message"]
+                )
+
+        self._token_deadline = 0.0
+        self.api_token = None
+        self.lastLogin = None
+
+    async def close(self):
+        """
+        Release the pooled connections held by this client.
+        """
+        await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
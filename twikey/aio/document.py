@@ -0,0 +1,404 @@
+import asyncio
+import logging
+
+import httpx
+
+from ..client import TwikeyError
+from ..document import dump_invite, dump_sign
+from ..feed import FeedItem, FeedStats
+from ..model.document_request import (
+    InviteRequest,
+    SignRequest,
+    FetchMandateRequest,
+    QueryMandateRequest,
+    MandateActionRequest,
+    UpdateMandateRequest,
+    PdfUploadRequest,
+)
+from ..model.document_response import (
+    InviteResponse,
+    SignResponse,
+    Document,
+    QueryMandateResponse,
+    PdfResponse,
+    CustomerAccessResponse,
+    DocumentFeed,
+    DocumentEvent,
+)
+from ..ratelimit import TokenBucket
+from .bulk import run_journaled, run_many
+from .feed import call_handler, counted, each, feed_pages, overrides_page
+
+
+class AsyncDocumentService(object):
+    """
+    asyncio version of the DocumentService, see there for the full documentation of each call.
+    """
+
+    def __init__(self, client) -> None:
+        super().__init__()
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    async def create(self, request: InviteRequest) -> InviteResponse:
+        """
+        See https://www.twikey.com/api/#invite-a-customer
+        """
+
+        url = self.client.instance_url("/invite")
+        data = request.to_request()
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.create"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Invite", response)
+            return InviteResponse(**self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Invite", e)
+
+    async def sign(self, request: SignRequest) -> SignResponse:
+        """
+        See https://www.twikey.com/api/#sign-a-mandate
+        """
+
+        url = self.client.instance_url("/sign")
+        data = request.to_request()
+        if not request.method:
+            raise TwikeyError(
+                "Sign", "Missing method", "A sign request requires a method"
+            )
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.sign"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Sign", response)
+            json_response = self.client.decode(response)
+            self.logger.debug("Added new mandate : %s" % json_response["MndtId"])
+            return SignResponse(**json_response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Sign", e)
+
+    def create_many(
+        self, invites, concurrency=8, ordered=True, rate=None, journal=None, key=None
+    ):
+        """
+        Invite many customers concurrently as tasks, resumable from a journal.
+
+            async for result in client.document.create_many(invites, journal=FileJournal("invites.jsonl")):
+                ...
+        """
+        return self._fan_out(
+            self.create,
+            invites,
+            concurrency,
+            ordered,
+            rate,
+            journal,
+            key,
+            dump_invite,
+            lambda raw: InviteResponse(**raw),
+        )
+
+    def sign_many(
+        self,
+        sign_requests,
+        concurrency=8,
+        ordered=True,
+        rate=None,
+        journal=None,
+        key=None,
+    ):
+        """
+        Create many signed mandates concurrently as tasks, resumable from a journal.
+        """
+        return self._fan_out(
+            self.sign,
+            sign_requests,
+            concurrency,
+            ordered,
+            rate,
+            journal,
+            key,
+            dump_sign,
+            lambda raw: SignResponse(**raw),
+        )
+
+    @staticmethod
+    def _fan_out(fn, items, concurrency, ordered, rate, journal, key, dump, load):
+        limiter = TokenBucket(rate) if rate else None
+
+        async def call(request):
+            if limiter is not None:
+                await asyncio.sleep(limiter.reserve())
+            return await fn(request)
+
+        if journal is None:
+            return run_many(call, items, concurrency, ordered)
+        return run_journaled(
+            call, items, journal, dump, load, key, concurrency, ordered
+        )
+
+    async def fetch(self, request: FetchMandateRequest) -> Document:
+        """
+        See https://www.twikey.com/api/#fetch-mandate-details
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url("/mandate/detail")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.get(
+                url=url,
+                params=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.fetch"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("detail", response)
+            json_response = self.client.decode(response)
+            self.logger.debug("Mandate details : %s" % json_response)
+            return Document(mandate=json_response.get("Mndt"), headers=response.headers)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("detail", e)
+
+    async def query(self, request: QueryMandateRequest) -> QueryMandateResponse:
+        """
+        See https://www.twikey.com/api/#query-mandate
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url("/mandate/query")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.get(
+                url=url,
+                params=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.query"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("query", response)
+            json_response = self.client.decode(response)
+            self.logger.debug("Mandate query result: %s" % json_response)
+            return QueryMandateResponse(json_response.get("Contracts", []))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("query", e)
+
+    async def action(self, request: MandateActionRequest):
+        """
+        See https://www.twikey.com/api/#mandate-actions
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url(f"/mandate/{data.get('mndtId')}/action")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.action"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("action", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("action", e)
+
+    async def update(self, mandate_number: str, request: UpdateMandateRequest):
+        """
+        See https://www.twikey.com/api/#update-mandate-details
+        """
+
+        url = self.client.instance_url(f"/mandate/update?mndtId={mandate_number}")
+        data = request.to_request()
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.update"),
+            )
+            self.logger.debug("Updated mandate : {} response={}".format(data, response))
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Update", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Update", e)
+
+    async def cancel(self, mandate_number: str, reason: str):
+        """
+        See https://www.twikey.com/api/#cancel-agreements
+        """
+
+        url = self.client.instance_url(f"/mandate?mndtId={mandate_number}&rsn={reason}")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.cancel"),
+            )
+            self.logger.debug(
+                "Cancel mandate : %s status=%d" % (mandate_number, response.status_code)
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Cancel", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Cancel", e)
+
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url(
+            "/mandate?include=id&include=mandate&include=person"
+        )
+        return feed_pages(
+            self.client,
+            "document.feed",
+            "Mandate feed",
+            url,
+            "Messages",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    async def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#mandate-feed
+
+        Iterate the mandate feed, yielding a FeedItem(position, DocumentEvent) per message.
+        """
+
+        async for position, messages in self._pages(start_position, prefetch, stream):
+            async for msg in each(messages):
+                yield FeedItem(position, DocumentEvent(msg))
+
+    async def feed(self, document_feed: DocumentFeed, start_position=False, prefetch=0):
+        """
+        See https://www.twikey.com/api/#mandate-feed
+
+        Handler methods of the document_feed may be plain functions or coroutines.
+        """
+
+        stats = FeedStats("document")
+        pages = counted(self._pages(start_position, prefetch), stats)
+        try:
+            async for position, messages in pages:
+                self.logger.debug(
+                    "Feed handling : %d till %s" % (len(messages), position)
+                )
+                await call_handler(document_feed.start, position, len(messages))
+                events = [DocumentEvent(msg) for msg in messages]
+                if overrides_page(document_feed, DocumentFeed):
+                    error = await call_handler(document_feed.page, position, events)
+                else:
+                    error = False
+                    for event in events:
+                        self.logger.debug(
+                            "Feed %s : %s" % (event.kind, event.mandate_number)
+                        )
+                        error = await call_handler(event.dispatch, document_feed)
+                        if error:
+                            break
+                if error:
+                    self.logger.debug("Error while handing document, stopping")
+                    break
+        finally:
+            await pages.aclose()  # stops a prefetching task right away
+        self.logger.debug("Done handing mandate feed")
+        return stats
+
+    async def upload_pdf(self, request: PdfUploadRequest):
+        """
+        See https://www.twikey.com/api/#upload-pdf
+        """
+
+        url = self.client.instance_url(
+            f"/mandate/pdf?mndtId={request.mandate_number}&bankSignature={request.bank_signature}"
+        )
+        try:
+            await self.client.refresh_token_if_required()
+            with open(request.pdf_path, "rb") as file:
+                content = file.read()
+            response = await self.client.session.post(
+                url=url,
+                content=content,
+                headers=self.client._headers("application/pdf"),
+                timeout=self.client.timeout("document.upload_pdf"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("pdf", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("pdf", e)
+
+    async def retrieve_pdf(self, mndt_id: str) -> PdfResponse:
+        """
+        See https://www.twikey.com/api/#retrieve-pdf
+        """
+
+        url = self.client.instance_url(f"/mandate/pdf?mndtId={mndt_id}")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.get(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.retrieve_pdf"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("pdf", response)
+            filename = None
+            if "Content-Disposition" in response.headers:
+                parts = response.headers["Content-Disposition"].split("=")
+                if len(parts) == 2:
+                    filename = parts[1].strip().strip('"')
+            return PdfResponse(content=response.content, filename=filename)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("pdf", e)
+
+    async def update_customer(self, customer_id: str, data):
+        """
+        See https://www.twikey.com/api/#update-a-customer
+        """
+
+        url = self.client.instance_url("/customer/" + str(customer_id))
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.patch(
+                url=url,
+                params=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.update_customer"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Update customer", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Update customer", e)
+
+    async def customer_access(self, mndt_id: str) -> CustomerAccessResponse:
+        """
+        See https://www.twikey.com/api/#customer-access
+        """
+
+        url = self.client.instance_url("/customeraccess")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data={"mndtId": mndt_id},
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.customer_access"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("customer access", response)
+            return CustomerAccessResponse(**self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("customer access", e)
@@ -0,0 +1,212 @@
+import asyncio
+import inspect
+import logging
+
+import httpx
+
+from ..feed import STREAM_CHUNK_SIZE
+from ..stream import ItemDecoder
+
+logger = logging.getLogger(__name__)
+
+
+def overrides_page(handler, base) -> bool:
+    """
+    :return: whether the feed handler implements its own page hook, the default one of base
+        can't await coroutine item handlers so those are called one by one instead
+    """
+    return getattr(type(handler), "page", None) is not getattr(base, "page")
+
+
+async def call_handler(method, *args):
+    """
+    Invoke a feed handler method, awaiting its result when the handler is a coroutine
+    :param method: the bound handler method (eg. InvoiceFeed.invoice)
+    :return: the (awaited) return value of the handler
+    """
+    result = method(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def counted(pages, stats):
+    """
+    Pass the pages through, counting them in stats (a twikey.feed.FeedStats).
+    """
+    try:
+        async for position, items in pages:
+            stats.pages += 1
+            stats.items += len(items)
+            stats.position = position
+            yield position, items
+    finally:
+        await pages.aclose()
+
+
+async def each(items):
+    """
+    Iterate the items of a page, a list or (when streamed) an async iterator.
+    """
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def feed_pages(
+    client, operation, context, url, key, start_position=False, prefetch=0, stream=False
+):
+    """
+    asyncio version of twikey.feed.feed_pages, an async iterator of (X-LAST, raw items) per page.
+    With stream, the items of a page are an async iterator.
+    """
+    if stream and prefetch:
+        raise ValueError(
+            "Streamed pages are read while being handled, they can't be prefetched"
+        )
+    name = operation.split(".")[0]
+    store = client.checkpoint_store
+    if store is not None and not start_position:
+        start_position = store.load(name)
+    pages = _read_pages(client, operation, context, url, key, start_position, stream)
+    if prefetch:
+        pages = prefetch_pages(pages, prefetch)
+    if store is not None:
+        pages = checkpointed(pages, store, name)
+    return pages
+
+
+async def checkpointed(pages, store, feed):
+    """
+    Pass the pages through, saving the position of each page in the store when the next one is requested.
+    """
+    try:
+        async for position, items in pages:
+            yield position, items
+            store.save(feed, position)
+    finally:
+        await pages.aclose()
+
+
+async def _read_pages(
+    client, operation, context, url, key, start_position, stream=False
+):
+    try:
+        await client.refresh_token_if_required()
+        headers = client._headers()
+        if start_position:
+            headers = client._headers(extra={"X-RESUME-AFTER": str(start_position)})
+        while True:
+            response = await client.session.request(
+                "GET",
+                url=url,
+                headers=headers,
+                timeout=client.timeout(operation),
+                idempotent=False,  # every page read advances the feed
+                stream=stream,
+            )
+            if "ApiErrorCode" in response.headers or response.status_code >= 400:
+                if stream:
+                    await response.aread()
+                raise client.raise_error(context, response)
+            if stream:
+                items = _stream_items(client, context, response, key)
+                try:
+                    first = await items.__anext__()
+                except StopAsyncIteration:
+                    return
+                try:
+                    yield response.headers.get("X-LAST"), _prepend(first, items)
+                finally:
+                    await items.aclose()  # releases the connection when the page was not read until the end
+            else:
+                items = client.decode(response)[key]
+                if len(items) == 0:
+                    return
+                yield response.headers.get("X-LAST"), items
+            headers = client._headers()
+    except httpx.HTTPError as e:
+        raise client.raise_error_from_request(context, e)
+
+
+async def _stream_items(client, context, response, key):
+    decoder = ItemDecoder(key)
+    try:
+        async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+            for item in decoder.feed(chunk):
+                yield item
+        for item in decoder.feed(b"", final=True):
+            yield item
+    except ValueError as e:
+        raise client.raise_error_from_request(
+            context, httpx.DecodingError(str(e), request=response.request)
+        )
+    except httpx.HTTPError as e:
+        raise client.raise_error_from_request(context, e)
+    finally:
+        await response.aclose()
+
+
+async def _prepend(first, items):
+    yield first
+    async for item in items:
+        yield item
+
+
+async def prefetch_pages(pages, read_ahead=1):
+    """
+    Iterate pages while a background task already fetches up to read_ahead next ones,
+    see twikey.feed.prefetch_pages.
+    """
+    queue = asyncio.Queue()
+    slots = asyncio.Semaphore(read_ahead)
+    stopped = asyncio.Event()
+    done = object()
+
+    async def produce():
+        try:
+            while True:
+                await slots.acquire()
+                if stopped.is_set():
+                    return
+                try:
+                    page = await pages.__anext__()
+                except StopAsyncIteration:
+                    queue.put_nowait(done)
+                    return
+                queue.put_nowait(page)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            await pages.aclose()
+
+    task = asyncio.ensure_future(produce())
+    handled = None  # position of the last page the consumer fully handled
+    try:
+        while True:
+            page = await queue.get()
+            if page is done:
+                return
+            if isinstance(page, Exception):
+                raise page
+            slots.release()
+            yield page
+            handled = page[0]
+    finally:
+        if not task.done():
+            stopped.set()
+            slots.release()  # unblock the producer, then let a fetch in flight complete
+            await task
+        unhandled = 0
+        while not queue.empty():
+            if isinstance(queue.get_nowait(), tuple):
+                unhandled += 1
+        if unhandled:
+            logger.warning(
+                "Feed stopped with %d page(s) read ahead, resume after position %s to receive them again",
+                unhandled,
+                handled,
+            )
@@ -0,0 +1,365 @@
+import logging
+
+import httpx
+
+from ..feed import FeedItem, FeedStats
+from ..invoice import batch_results
+from ..model.invoice_request import (
+    InvoiceRequest,
+    UpdateInvoiceRequest,
+    DetailsRequest,
+    ActionRequest,
+    UblUploadRequest,
+    BulkInvoiceRequest,
+)
+from ..model.invoice_response import (
+    Invoice,
+    BulkInvoiceResponse,
+    BulkBatchDetailsResponse,
+    InvoiceFeed,
+)
+from .bulk import chunked, poll, run_many
+from .feed import call_handler, counted, each, feed_pages, overrides_page
+
+
+class AsyncInvoiceService(object):
+    """
+    asyncio version of the InvoiceService, see there for the full documentation of each call.
+    """
+
+    def __init__(self, client) -> None:
+        super().__init__()
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    async def create(
+        self, request: InvoiceRequest, origin=False, purpose=False, manual=False
+    ) -> Invoice:
+        """
+        See https://www.twikey.com/api/#create-invoice
+        """
+
+        url = self.client.instance_url("/invoice")
+        data = request.to_request()
+        try:
+            await self.client.refresh_token_if_required()
+            extra = {}
+            if origin:
+                extra["X-PARTNER"] = origin
+            if purpose:
+                extra["X-Purpose"] = purpose
+            if manual:
+                extra["X-MANUAL"] = "true"
+            headers = self.client._headers("application/json", extra)
+            response = await self.client.session.post(
+                url=url,
+                content=self.client.encode(data),
+                headers=headers,
+                timeout=self.client.timeout("invoice.create"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create invoice", response)
+            json_response = self.client.decode(response)
+            self.logger.debug("Added invoice : %s" % json_response["url"])
+            return Invoice(**json_response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create invoice", e)
+
+    def create_many(
+        self,
+        invoices,
+        concurrency=8,
+        ordered=True,
+        origin=False,
+        purpose=False,
+        manual=False,
+    ):
+        """
+        Create many invoices concurrently as tasks, invoices may also be an async iterable.
+
+            async for result in client.invoice.create_many(invoices, concurrency=16):
+                ...
+        """
+
+        async def create(request):
+            return await self.create(request, origin, purpose, manual)
+
+        return run_many(create, invoices, concurrency, ordered)
+
+    async def update(self, request: UpdateInvoiceRequest) -> Invoice:
+        """
+        See https://www.twikey.com/api/#update-invoice
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url("/invoice/" + data.get("id"))
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.put(
+                url=url,
+                content=self.client.encode(data),
+                headers=headers,
+                timeout=self.client.timeout("invoice.update"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Update invoice", response)
+            json_response = self.client.decode(response)
+            self.logger.debug("Updated invoice : %s" % json_response["url"])
+            return Invoice(**json_response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Update invoice", e)
+
+    async def details(self, request: DetailsRequest) -> Invoice:
+        """
+        See https://www.twikey.com/api/#invoice-details
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url(f"/invoice/{request.id}")
+        includes = data.get("include")
+        if includes:
+            query_string = "&".join(f"include={param}" for param in includes)
+            url += f"?{query_string}"
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.get(
+                url=url,
+                headers=headers,
+                timeout=self.client.timeout("invoice.details"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("details invoice", response)
+            self.logger.debug("details invoice: %s", response.text)
+            return Invoice(**self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("details invoice", e)
+
+    async def action(self, request: ActionRequest):
+        """
+        See https://www.twikey.com/api/#action-on-invoice
+        """
+
+        invoice_id = request.id
+        url = self.client.instance_url(f"/invoice/{invoice_id}/action")
+        payload = request.to_request()
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/x-www-form-urlencoded")
+            response = await self.client.session.post(
+                url=url,
+                data=payload,
+                headers=headers,
+                timeout=self.client.timeout("invoice.action"),
+            )
+            if response.status_code != 204:
+                raise self.client.raise_error("action invoice", response)
+            self.logger.debug("action invoice [%s]: %s", invoice_id, payload["type"])
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("action invoice", e)
+
+    async def upload_ubl(self, request: UblUploadRequest) -> Invoice:
+        """
+        See https://www.twikey.com/api/#upload-ubl
+        """
+
+        url = self.client.instance_url("/invoice/ubl")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers(
+                "application/x-www-form-urlencoded", request.to_headers()
+            )
+            with open(request.xml_path, "rb") as file:
+                content = file.read()
+            response = await self.client.session.post(
+                url=url,
+                headers=headers,
+                content=content,
+                timeout=self.client.timeout("invoice.upload_ubl"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("UBL upload", response)
+            self.logger.debug("UBL upload response: %s", response.text)
+            return Invoice(**self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("UBL upload", e)
+
+    async def delete(self, invoice_id: str):
+        """
+        See https://www.twikey.com/api/#delete-invoice
+        """
+
+        url = self.client.instance_url("/invoice/" + invoice_id)
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.delete(
+                url=url,
+                headers=headers,
+                timeout=self.client.timeout("invoice.delete"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("delete invoice", response)
+            self.logger.debug("delete invoice : %s", invoice_id)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("delete invoice", e)
+
+    async def bulk_create(self, request: BulkInvoiceRequest) -> BulkInvoiceResponse:
+        """
+        See https://www.twikey.com/api/#bulk-create-invoices
+        """
+
+        url = self.client.instance_url("/invoice/bulk")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.post(
+                url=url,
+                headers=headers,
+                content=self.client.encode(request.to_request()),
+                timeout=self.client.timeout("invoice.bulk_create"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("bulk create invoices", response)
+            self.logger.debug("bulk create invoices response: %s", response.text)
+            return BulkInvoiceResponse(**self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("bulk create invoices", e)
+
+    async def bulk_details(self, batch_id: str) -> BulkBatchDetailsResponse:
+        """
+        See https://www.twikey.com/api/#bulk-batch-details
+
+        Returns None while the batch is still being processed.
+        """
+
+        url = self.client.instance_url(f"/invoice/bulk?batchId={batch_id}")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.get(
+                url=url,
+                headers=headers,
+                timeout=self.client.timeout("invoice.bulk_details"),
+            )
+            if response.status_code == 409:
+                self.logger.debug("bulk batch still processing: %s", batch_id)
+                return None
+            elif response.status_code == 200:
+                self.logger.debug("bulk batch details response: %s", response.text)
+                return BulkBatchDetailsResponse(self.client.decode(response))
+            else:
+                raise self.client.raise_error("bulk batch details", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("bulk batch details", e)
+
+    async def bulk_wait(
+        self, batch_id: str, interval=1.0, max_interval=30.0, timeout=None
+    ) -> BulkBatchDetailsResponse:
+        """
+        Wait until a bulk invoice upload is processed, polling bulk_details with an exponential backoff.
+        """
+        return await poll(
+            lambda: self.bulk_details(batch_id), interval, max_interval, timeout=timeout
+        )
+
+    async def bulk_upload(
+        self,
+        invoices,
+        chunk_size=1000,
+        concurrency=4,
+        ordered=False,
+        interval=1.0,
+        max_interval=30.0,
+        timeout=None,
+    ):
+        """
+        Upload any number of invoices in bulk as concurrent batches, invoices may also be an async iterable.
+
+            async for result in client.invoice.bulk_upload(invoices, chunk_size=500):
+                ...
+        """
+
+        async def upload(chunk):
+            batch = await self.bulk_create(BulkInvoiceRequest(chunk))
+            self.logger.debug(
+                "Uploaded %d invoices in batch %s", len(chunk), batch.batch_id
+            )
+            return await self.bulk_wait(batch.batch_id, interval, max_interval, timeout)
+
+        batches = run_many(upload, chunked(invoices, chunk_size), concurrency, ordered)
+        try:
+            async for batch in batches:
+                for result in batch_results(batch, chunk_size):
+                    yield result
+        finally:
+            await batches.aclose()
+
+    def _pages(self, start_position=False, *includes, prefetch=0, stream=False):
+        _includes = ""
+        for include in includes:
+            _includes += "&include=" + include
+
+        url = self.client.instance_url("/invoice?include=customer" + _includes)
+        return feed_pages(
+            self.client,
+            "invoice.feed",
+            "Invoice feed",
+            url,
+            "Invoices",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    async def iter_feed(
+        self, start_position=False, *includes, prefetch=0, stream=False
+    ):
+        """
+        See https://www.twikey.com/api/#invoice-feed
+
+        Iterate the invoice feed, yielding a FeedItem(position, Invoice) per invoice.
+        """
+
+        async for position, invoices in self._pages(
+            start_position, *includes, prefetch=prefetch, stream=stream
+        ):
+            async for invoice in each(invoices):
+                yield FeedItem(position, Invoice(**invoice))
+
+    async def feed(
+        self, invoice_feed: InvoiceFeed, start_position=False, *includes, prefetch=0
+    ):
+        """
+        See https://www.twikey.com/api/#invoice-feed
+
+        Handler methods of the invoice_feed may be plain functions or coroutines.
+        """
+
+        stats = FeedStats("invoice")
+        pages = counted(
+            self._pages(start_position, *includes, prefetch=prefetch), stats
+        )
+        try:
+            async for position, invoices in pages:
+                self.logger.debug(
+                    "Feed handling : %d invoices till %s" % (len(invoices), position)
+                )
+                await call_handler(invoice_feed.start, position, len(invoices))
+                items = [Invoice(**invoice) for invoice in invoices]
+                if overrides_page(invoice_feed, InvoiceFeed):
+                    error = await call_handler(invoice_feed.page, position, items)
+                else:
+                    error = False
+                    for invoice in items:
+                        error = await call_handler(invoice_feed.invoice, invoice)
+                        if error:
+                            break
+                if error:
+                    self.logger.debug("Error while handing invoice, stopping")
+                    break
+        finally:
+            await pages.aclose()  # stops a prefetching task right away
+        self.logger.debug("Done handing invoice feed")
+        return stats
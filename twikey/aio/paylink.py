@@ -0,0 +1,156 @@
+import logging
+
+import httpx
+
+from ..client import TwikeyError
+from ..feed import FeedItem, FeedStats
+from ..model.paylink_request import (
+    PaymentLinkRequest,
+    PaymentLinkStatusRequest,
+    PaymentLinkRefundRequest,
+)
+from ..model.paylink_response import CreatedPaylinkResponse, Paylink, PaylinkFeed
+from .feed import call_handler, counted, each, feed_pages, overrides_page
+
+
+class AsyncPaylinkService(object):
+    """
+    asyncio version of the PaylinkService, see there for the full documentation of each call.
+    """
+
+    def __init__(self, client) -> None:
+        super().__init__()
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    async def create(self, request: PaymentLinkRequest) -> CreatedPaylinkResponse:
+        """
+        See https://www.twikey.com/api/#create-paymentlink
+        """
+
+        url = self.client.instance_url("/payment/link")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.create"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create paylink", response)
+            return CreatedPaylinkResponse(self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create paylink", e)
+
+    async def status_details(self, request: PaymentLinkStatusRequest) -> Paylink:
+        """
+        See https://www.twikey.com/api/#status-paymentlink
+        """
+
+        url = self.client.instance_url("/payment/link")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.get(
+                url=url,
+                params=request.to_request(),
+                headers=headers,
+                timeout=self.client.timeout("paylink.status_details"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("Paylink detail", response)
+            _links = self.client.decode(response)["Links"]
+            if len(_links) > 0:
+                return Paylink(_links[0])
+            raise TwikeyError("Paylink detail", "Missing link", "No paylink found")
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Paylink detail", e)
+
+    async def refund(self, request: PaymentLinkRefundRequest) -> Paylink:
+        """
+        See https://www.twikey.com/api/#refund-paymentlink
+        """
+
+        url = self.client.instance_url("/payment/link/refund")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.refund"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Refund paylink", response)
+            return Paylink(self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Refund paylink", e)
+
+    async def remove(self, link_id: int):
+        """
+        See https://www.twikey.com/api/#remove-paymentlink
+        """
+
+        url = self.client.instance_url(f"/payment/link?id={link_id}")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.remove"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Remove paylink", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Remove paylink", e)
+
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/payment/link/feed")
+        return feed_pages(
+            self.client,
+            "paylink.feed",
+            "Feed paylink",
+            url,
+            "Links",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    async def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#paymentlink-feed
+
+        Iterate the paylink feed, yielding a FeedItem(position, Paylink) per payment link.
+        """
+
+        async for position, links in self._pages(start_position, prefetch, stream):
+            async for msg in each(links):
+                yield FeedItem(position, Paylink(msg))
+
+    async def feed(self, paylink_feed: PaylinkFeed, start_position=False, prefetch=0):
+        """
+        See https://www.twikey.com/api/#paymentlink-feed
+
+        Handler methods of the paylink_feed may be plain functions or coroutines.
+        """
+
+        stats = FeedStats("paylink")
+        pages = counted(self._pages(start_position, prefetch), stats)
+        try:
+            async for position, links in pages:
+                paylinks = [Paylink(msg) for msg in links]
+                if overrides_page(paylink_feed, PaylinkFeed):
+                    error = await call_handler(paylink_feed.page, position, paylinks)
+                else:
+                    error = False
+                    for paylink in paylinks:
+                        error = await call_handler(paylink_feed.paylink, paylink)
+                if error:
+                    break
+        finally:
+            await pages.aclose()  # stops a prefetching task right away
+        return stats
@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from ..bulk import BulkSummary
+from ..client import TwikeyError
+from ..feed import FeedItem, FeedStats
+from ..model.refund_request import (
+    NewBeneficiaryRequest,
+    DisableBeneficiaryRequest,
+    NewRefundRequest,
+    NewRefundBatchRequest,
+    RefundBatchStatusRequest,
+)
+from ..model.refund_response import (
+    Refund,
+    RefundBatch,
+    GetbeneficiarieResponse,
+    RefundFeed,
+    Beneficiary,
+)
+from ..refund import batch_done
+from .bulk import poll, run_many
+from .feed import call_handler, counted, each, feed_pages, overrides_page
+
+
+class _Beneficiaries:
+    """
+    asyncio version of the registry of beneficiary accounts in twikey.refund.
+    """
+
+    def __init__(self, register, known):
+        self.register = register
+        self.known = set(known)
+        self._locks = {}
+
+    async def ensure(self, request: NewRefundRequest, beneficiary):
+        iban = request.iban
+        if iban in self.known:
+            return
+        async with self._locks.setdefault(iban, asyncio.Lock()):
+            if iban not in self.known:
+                await self.register(beneficiary(request))
+                self.known.add(iban)
+
+
+class AsyncRefundService(object):
+    """
+    asyncio version of the RefundService, see there for the full documentation of each call.
+    """
+
+    def __init__(self, client) -> None:
+        super().__init__()
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    async def create_beneficiary_account(
+        self, request: NewBeneficiaryRequest
+    ) -> Beneficiary:
+        """
+        See https://www.twikey.com/api/#add-a-beneficiary-account
+        """
+
+        url = self.client.instance_url("/transfers/beneficiaries")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create_beneficiary_account"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create beneficiary", response)
+            return Beneficiary(self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create beneficiary", e)
+
+    async def create(self, request: NewRefundRequest) -> Refund:
+        """
+        See https://www.twikey.com/api/#createadd-a-new-credit-transfer
+        """
+
+        url = self.client.instance_url("/transfer")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create refund", response)
+            _links = self.client.decode(response)["Entries"]
+            if _links and len(_links) > 0:
+                return Refund(_links[0])
+            raise TwikeyError(
+                "Create refund", "Missing refund", "No refund entry returned"
+            )
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create refund", e)
+
+    async def create_many(self, refunds, concurrency=8, ordered=True, beneficiary=None):
+        """
+        Create many refunds concurrently as tasks, registering missing beneficiary accounts once per iban.
+        """
+        beneficiaries = None
+        if beneficiary is not None:
+            known = [
+                account.iban
+                for account in (await self.get_beneficiary_accounts(False)).results
+            ]
+            beneficiaries = _Beneficiaries(self.create_beneficiary_account, known)
+
+        async def create(request):
+            if beneficiaries is not None:
+                await beneficiaries.ensure(request, beneficiary)
+            return await self.create(request)
+
+        results = run_many(create, refunds, concurrency, ordered)
+        try:
+            async for result in results:
+                yield result
+        finally:
+            await results.aclose()
+
+    async def create_all(
+        self,
+        refunds,
+        ct,
+        iban=None,
+        beneficiary=None,
+        concurrency=8,
+        interval=1.0,
+        max_interval=30.0,
+        timeout=None,
+    ) -> BulkSummary:
+        """
+        Create many refunds concurrently and, when all of them succeeded, close the batch and wait until
+        it is processed.
+        """
+        started = time.monotonic()
+        summary = BulkSummary()
+        async for result in self.create_many(
+            refunds, concurrency, ordered=False, beneficiary=beneficiary
+        ):
+            summary.add(result)
+        if summary.failures:
+            self.logger.warning(
+                "Not closing the batch of ct %s, %d of %d refunds failed",
+                ct,
+                len(summary.failures),
+                summary.total,
+            )
+        elif summary.total:
+            batch = await self.create_batch(NewRefundBatchRequest(ct=ct, iban=iban))
+            summary.batch = await self.batch_wait(
+                batch, interval, max_interval, timeout
+            )
+        summary.elapsed = time.monotonic() - started
+        self.logger.info("Created refunds: %s", summary)
+        return summary
+
+    async def details(self, refund_id: str) -> Refund:
+        """
+        See https://www.twikey.com/api/#details-of-a-credit-transfer
+        """
+
+        url = self.client.instance_url("/transfer/detail")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.get(
+                url=url,
+                params={"id": refund_id},
+                headers=headers,
+                timeout=self.client.timeout("refund.details"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("Transfer detail", response)
+            _links = self.client.decode(response)["Entries"]
+            if _links and len(_links) > 0:
+                return Refund(_links[0])
+            raise TwikeyError(
+                "Transfer detail", "Missing entry", "No refund entry returned"
+            )
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Transfer detail", e)
+
+    async def remove(self, refund_id: str):
+        """
+        See https://www.twikey.com/api/#remove-a-credit-transfer
+        """
+
+        url = self.client.instance_url(f"/transfer?id={refund_id}")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.remove"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Remove Refund", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Remove Refund", e)
+
+    async def create_batch(self, request: NewRefundBatchRequest) -> RefundBatch:
+        """
+        See https://www.twikey.com/api/#batch-creation
+        """
+
+        url = self.client.instance_url("/transfer/complete")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create_batch"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create batch refunds", response)
+            _links = self.client.decode(response)["CreditTransfers"]
+            if _links and len(_links) > 0:
+                return RefundBatch(_links[0])
+            raise TwikeyError(
+                "Create batch refunds", "Missing batch", "No credit transfers to batch"
+            )
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create batch refunds", e)
+
+    async def batch_detail(self, request: NewRefundBatchRequest) -> RefundBatch:
+        """
+        See https://www.twikey.com/api/#batch-details
+        """
+
+        url = self.client.instance_url("/transfer/complete")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.get(
+                url=url,
+                params=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.batch_detail"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Batch detail", response)
+            _links = self.client.decode(response)["CreditTransfers"]
+            if _links and len(_links) > 0:
+                return RefundBatch(_links[0])
+            raise TwikeyError("Batch detail", "Missing batch", "No batch returned")
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Batch detail", e)
+
+    async def batch_wait(
+        self, batch: RefundBatch, interval=1.0, max_interval=30.0, timeout=None
+    ) -> RefundBatch:
+        """
+        Wait until a batch of refunds is processed, polling batch_detail with an exponential backoff.
+        """
+        if batch_done(batch):
+            return batch
+
+        async def check():
+            details = await self.batch_detail(RefundBatchStatusRequest(id=batch.id))
+            return details if batch_done(details) else None
+
+        return await poll(check, interval, max_interval, timeout=timeout)
+
+    async def get_beneficiary_accounts(
+        self, with_address: bool
+    ) -> GetbeneficiarieResponse:
+        """
+        See https://www.twikey.com/api/#get-beneficiary-accounts
+        """
+
+        url = self.client.instance_url("/transfers/beneficiaries")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.request(
+                "GET",
+                url=url,
+                data={"withAddress": with_address},
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.get_beneficiary_accounts"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("get beneficiaries", response)
+            return GetbeneficiarieResponse(
+                self.client.decode(response)["beneficiaries"]
+            )
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("get beneficiaries", e)
+
+    async def disable_beneficiary_accounts(self, request: DisableBeneficiaryRequest):
+        """
+        See https://www.twikey.com/api/#disable-a-beneficiary-account
+        """
+
+        url = self.client.instance_url(
+            f"/transfers/beneficiaries/{request.iban}?customerNumber={request.customer_number}"
+        )
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.disable_beneficiary_accounts"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("disable beneficiaries", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("disable beneficiaries", e)
+
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/transfer")
+        return feed_pages(
+            self.client,
+            "refund.feed",
+            "Feed refunds",
+            url,
+            "Entries",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    async def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#get-credit-transfer-feed
+
+        Iterate the refund feed, yielding a FeedItem(position, Refund) per credit transfer.
+        """
+
+        async for position, entries in self._pages(start_position, prefetch, stream):
+            async for msg in each(entries):
+                yield FeedItem(position, Refund(msg))
+
+    async def feed(self, refund_feed: RefundFeed, start_position=False, prefetch=0):
+        """
+        See https://www.twikey.com/api/#get-credit-transfer-feed
+
+        Handler methods of the refund_feed may be plain functions or coroutines.
+        """
+
+        page_hook = overrides_page(refund_feed, RefundFeed)
+        stats = FeedStats("refund")
+        pages = counted(self._pages(start_position, prefetch), stats)
+        try:
+            async for position, entries in pages:
+                refunds = [Refund(msg) for msg in entries]
+                if page_hook:
+                    error = await call_handler(refund_feed.page, position, refunds)
+                else:
+                    error = False
+                    for refund in refunds:
+                        error = await call_handler(refund_feed.refund, refund)
+                        if error:
+                            break
+                if error:
+                    self.logger.debug("Error while handing refund, stopping")
+                    break
+        finally:
+            await pages.aclose()  # stops a prefetching task right away
+        return stats
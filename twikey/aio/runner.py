@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import signal
+import time
+
+from ..feed import FeedStats
+from ..runner import RunSummary
+
+
+class AsyncFeedRunner:
+    """
+    asyncio version of the FeedRunner, draining the feeds of an AsyncTwikeyClient concurrently
+    on the running event loop. Handler methods may be plain functions or coroutines.
+
+    Sample usage
+
+        summary = await AsyncFeedRunner(client, invoice=MyInvoiceFeed(), refund=MyRefundFeed()).run()
+    """
+
+    def __init__(
+        self,
+        client,
+        document=None,
+        invoice=None,
+        transaction=None,
+        paylink=None,
+        refund=None,
+        prefetch=0,
+    ):
+        self.client = client
+        self.handlers = {
+            name: handler
+            for name, handler in [
+                ("document", document),
+                ("invoice", invoice),
+                ("transaction", transaction),
+                ("paylink", paylink),
+                ("refund", refund),
+            ]
+            if handler is not None
+        }
+        self.prefetch = prefetch
+        self.logger = logging.getLogger(__name__)
+
+    async def _drain(self, name, handler) -> FeedStats:
+        started = time.monotonic()
+        try:
+            stats = await getattr(self.client, name).feed(
+                handler, prefetch=self.prefetch
+            )
+        except Exception as e:
+            self.logger.error("Feed %s failed: %s", name, e)
+            stats = FeedStats(name)
+            stats.error = e
+        stats.elapsed = time.monotonic() - started
+        return stats
+
+    async def run(self) -> RunSummary:
+        """
+        Read all feeds until they are empty (or their handler asks to stop)
+        :return: RunSummary with the FeedStats of each feed
+        """
+        started = time.monotonic()
+        names = list(self.handlers)
+        results = await asyncio.gather(
+            *[self._drain(name, self.handlers[name]) for name in names]
+        )
+        summary = RunSummary(dict(zip(names, results)), time.monotonic() - started)
+        level = logging.INFO if summary.items or summary.errors else logging.DEBUG
+        self.logger.log(level, "Feeds done: %s", summary)
+        return summary
+
+
+class AsyncFeedDaemon(AsyncFeedRunner):
+    """
+    asyncio version of the FeedDaemon, wake() and stop() are to be called from the same event loop.
+
+    Sample usage
+
+        daemon = AsyncFeedDaemon(client, transaction=MyTransactionFeed())
+        task = asyncio.create_task(daemon.run_forever())
+    """
+
+    def __init__(self, client, min_interval=1, max_interval=60, backoff=2, **kwargs):
+        super().__init__(client, **kwargs)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._wakeup = None
+        self._stopped = False
+
+    def next_interval(self, summary: RunSummary) -> float:
+        if summary.items and not summary.errors:
+            return self.min_interval
+        return min(
+            self.max_interval, max(self.interval, self.min_interval) * self.backoff
+        )
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self.wake()
+
+    async def run_forever(self, handle_signals=True):
+        """
+        Read the feeds until stop() is called.
+
+        :param handle_signals: call stop() on SIGINT and SIGTERM (where the event loop supports it)
+        """
+        self._stopped = False
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        handled = []
+        if handle_signals:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(signum, self.stop)
+                    handled.append(signum)
+                except (
+                    NotImplementedError,
+                    RuntimeError,
+                ):  # windows, or not in the main thread
+                    pass
+        try:
+            while not self._stopped:
+                self._wakeup.clear()
+                self.interval = self.next_interval(await self.run())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for signum in handled:
+                loop.remove_signal_handler(signum)
+        self.logger.info("Feed daemon stopped")
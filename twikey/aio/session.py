@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from ..retry import RetryPolicy
+from ..session import is_token_error, _before, _within
+from ..timeouts import Timeout
+
+
+class AsyncTwikeySession(httpx.AsyncClient):
+    """
+    Pooled asyncio HTTP transport shared by the AsyncTwikeyClient and all of its services.
+
+    When the api reports the session token as expired or invalid, the relogin coroutine is
+    asked for a new token and the request is retried once with it. Transient failures are
+    retried according to the retry policy and a Timeout passed as timeout is converted to an
+    httpx.Timeout with its total enforced as deadline, with the same semantics as the TwikeySession.
+
+    Args:
+        pool_maxsize (int): Maximum number of concurrent connections.
+        keep_alive (bool): Reuse connections between calls.
+        relogin: Coroutine function receiving the rejected token and returning a fresh one (or None).
+        retry (RetryPolicy): Policy for retrying transient failures (default RetryPolicy()).
+        rate_limiter (RateLimiter): Optional limiter every attempt has to pass before being sent.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize=100,
+        keep_alive=True,
+        relogin=None,
+        retry=None,
+        rate_limiter=None,
+        **kwargs
+    ) -> None:
+        super().__init__(
+            limits=httpx.Limits(
+                max_connections=pool_maxsize,
+                max_keepalive_connections=pool_maxsize if keep_alive else 0,
+            ),
+            **kwargs
+        )
+        self.relogin = relogin
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.logger = logging.getLogger(__name__)
+
+    async def request(
+        self, method, url, *args, idempotent=None, stream=False, **kwargs
+    ):
+        timeout = kwargs.get("timeout")
+        deadline = None
+        if isinstance(timeout, Timeout):
+            kwargs["timeout"] = httpx.Timeout(timeout.read, connect=timeout.connect)
+            if timeout.total is not None:
+                deadline = time.monotonic() + timeout.total
+        relogged = False
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(str(url))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise httpx.TimeoutException(
+                        "Deadline of %ss exceeded for %s %s"
+                        % (timeout.total, method, url)
+                    )
+                kwargs["timeout"] = httpx.Timeout(
+                    _within(timeout.read, remaining),
+                    connect=_within(timeout.connect, remaining),
+                )
+            try:
+                if stream:  # the body is left to be read (and closed) by the caller
+                    response = await self.send(
+                        self.build_request(method, url, *args, **kwargs), stream=True
+                    )
+                else:
+                    response = await super().request(method, url, *args, **kwargs)
+            except httpx.TransportError as e:
+                delay = self.retry.on_exception(method, attempt, idempotent)
+                if delay is None or not _before(deadline, delay):
+                    raise
+                self.logger.warning(
+                    "%s %s failed (%s), retrying in %.1fs", method, url, e, delay
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(str(url), response)
+
+            headers = kwargs.get("headers") or {}
+            stale_token = headers.get("Authorization")
+            if (
+                self.relogin is not None
+                and not relogged
+                and stale_token
+                and is_token_error(response)
+            ):
+                relogged = True
+                token = await self.relogin(stale_token)
+                if token:
+                    await response.aclose()
+                    retry_headers = dict(headers)
+                    retry_headers["Authorization"] = token
+                    kwargs["headers"] = retry_headers
+                    continue
+                return response
+
+            delay = self.retry.on_response(method, response, attempt, idempotent)
+            if delay is None or not _before(deadline, delay):
+                return response
+            self.logger.warning(
+                "%s %s returned %d, retrying in %.1fs",
+                method,
+                url,
+                response.status_code,
+                delay,
+            )
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
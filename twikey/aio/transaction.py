@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from ..bulk import BulkSummary
+from ..feed import FeedItem, FeedStats
+from ..model.transaction_request import (
+    NewTransactionRequest,
+    StatusRequest,
+    QueryTransactionsRequest,
+    ActionRequest,
+    UpdateRequest,
+    RefundRequest,
+    RemoveTransactionRequest,
+)
+from ..model.transaction_response import (
+    Transaction,
+    TransactionStatusResponse,
+    RefundResponse,
+    TransactionFeed,
+)
+from ..ratelimit import TokenBucket
+from .bulk import run_many
+from .feed import call_handler, counted, each, feed_pages, overrides_page
+
+
+class AsyncTransactionService(object):
+    """
+    asyncio version of the TransactionService, see there for the full documentation of each call.
+    """
+
+    def __init__(self, client) -> None:
+        super().__init__()
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+    async def create(self, request: NewTransactionRequest) -> Transaction:
+        """
+        See https://www.twikey.com/api/#new-transaction
+        """
+
+        url = self.client.instance_url("/transaction")
+        data = request.to_request()
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.create"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Create transaction", response)
+            json_response = self.client.decode(response)
+            entries_ = json_response["Entries"]
+            if len(entries_) > 0:
+                return Transaction(entries_[0])
+            return json_response
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Create transaction", e)
+
+    def create_many(self, transactions, concurrency=8, ordered=True, rate=None):
+        """
+        Create many transactions concurrently as tasks, transactions may also be an async iterable.
+        """
+        limiter = TokenBucket(rate) if rate else None
+
+        async def create(request):
+            if limiter is not None:
+                await asyncio.sleep(limiter.reserve())
+            return await self.create(request)
+
+        return run_many(create, transactions, concurrency, ordered)
+
+    async def create_all(
+        self, transactions, ct=None, colltndt=False, concurrency=8, rate=None
+    ) -> BulkSummary:
+        """
+        Create many transactions concurrently and, when all of them succeeded, send them with batch_send(ct).
+        """
+        started = time.monotonic()
+        summary = BulkSummary()
+        async for result in self.create_many(
+            transactions, concurrency, ordered=False, rate=rate
+        ):
+            summary.add(result)
+        if ct is not None:
+            if summary.failures:
+                self.logger.warning(
+                    "Not collecting ct %s, %d of %d transactions failed",
+                    ct,
+                    len(summary.failures),
+                    summary.total,
+                )
+            else:
+                summary.batch = await self.batch_send(ct, colltndt)
+        summary.elapsed = time.monotonic() - started
+        self.logger.info("Created transactions: %s", summary)
+        return summary
+
+    async def status_details(self, request: StatusRequest) -> TransactionStatusResponse:
+        """
+        See https://www.twikey.com/api/#transaction-status
+        """
+
+        url = self.client.instance_url("/transaction/detail")
+        try:
+            await self.client.refresh_token_if_required()
+            headers = self.client._headers("application/json")
+            response = await self.client.session.get(
+                url=url,
+                params=request.to_params(),
+                headers=headers,
+                timeout=self.client.timeout("transaction.status_details"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("Transaction detail", response)
+            return TransactionStatusResponse(self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Transaction detail", e)
+
+    async def query(
+        self, request: QueryTransactionsRequest
+    ) -> TransactionStatusResponse:
+        """
+        See https://www.twikey.com/api/#query-transactions
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url(
+            f"/transaction/query?fromId={data.get('fromId')}"
+        )
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.get(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.query"),
+            )
+            if response.status_code != 200:
+                raise self.client.raise_error("Transaction query", response)
+            return TransactionStatusResponse(self.client.decode(response))
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Transaction query", e)
+
+    async def action(self, request: ActionRequest):
+        """
+        See https://www.twikey.com/api/#action-on-transaction
+        """
+
+        url = self.client.instance_url("/transaction/action")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.action"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Action transaction", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Action transaction", e)
+
+    async def update(self, request: UpdateRequest):
+        """
+        See https://www.twikey.com/api/#update-transaction
+        """
+
+        url = self.client.instance_url("/transaction")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.put(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.update"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Update transaction", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Update transaction", e)
+
+    async def refund(self, request: RefundRequest) -> RefundResponse:
+        """
+        See https://www.twikey.com/api/#refund-a-transaction
+        """
+
+        url = self.client.instance_url("/transaction/refund")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=request.to_request(),
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.refund"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Refund transaction", response)
+            json_response = self.client.decode(response)
+            entries_ = json_response["Entries"]
+            if len(entries_) > 0:
+                return RefundResponse(entries_[0])
+            return json_response
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Refund transaction", e)
+
+    async def remove(self, request: RemoveTransactionRequest):
+        """
+        See https://www.twikey.com/api/#remove-a-transaction
+        """
+
+        data = request.to_request()
+        url = self.client.instance_url(f"/transaction?id={data.get('id')}")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.remove"),
+            )
+            response.raise_for_status()
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Remove transaction", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Remove transaction", e)
+
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/transaction")
+        return feed_pages(
+            self.client,
+            "transaction.feed",
+            "Feed transaction",
+            url,
+            "Entries",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    async def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#transaction-feed
+
+        Iterate the transaction feed, yielding a FeedItem(position, Transaction) per transaction.
+        """
+
+        async for position, entries in self._pages(start_position, prefetch, stream):
+            async for msg in each(entries):
+                yield FeedItem(position, Transaction(msg))
+
+    async def feed(
+        self, transaction_feed: TransactionFeed, start_position=False, prefetch=0
+    ):
+        """
+        See https://www.twikey.com/api/#transaction-feed
+
+        Handler methods of the transaction_feed may be plain functions or coroutines.
+        """
+
+        page_hook = overrides_page(transaction_feed, TransactionFeed)
+        stats = FeedStats("transaction")
+        pages = counted(self._pages(start_position, prefetch), stats)
+        try:
+            async for position, entries in pages:
+                transactions = [Transaction(msg) for msg in entries]
+                if page_hook:
+                    error = await call_handler(
+                        transaction_feed.page, position, transactions
+                    )
+                else:
+                    error = False
+                    for transaction in transactions:
+                        error = await call_handler(
+                            transaction_feed.transaction, transaction
+                        )
+                        if error:
+                            break
+                if error:
+                    self.logger.debug("Error while handing transaction, stopping")
+                    break
+        finally:
+            await pages.aclose()  # stops a prefetching task right away
+        return stats
+
+    async def batch_send(self, ct, colltndt=False):
+        """
+        See https://www.twikey.com/api/#execute-collection
+        """
+
+        url = self.client.instance_url("/collect")
+        data = {"ct": ct}
+        if colltndt:
+            data["colltndt"] = colltndt
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.batch_send"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Send batch", response)
+            return self.client.decode(response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Send batch", e)
+
+    async def batch_import(self, ct, pain008_xml):
+        """
+        See https://www.twikey.com/api/#import-collection
+        """
+
+        url = self.client.instance_url(f"/collect/import?ct={ct}")
+        try:
+            await self.client.refresh_token_if_required()
+            with open(pain008_xml, "rb") as file:
+                content = file.read()
+            response = await self.client.session.post(
+                url=url,
+                content=content,
+                headers=self.client._headers("text/xml"),
+                timeout=self.client.timeout("transaction.batch_import"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Import batch", response)
+            return self.client.decode(response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Import batch", e)
+
+    async def reporting_import(self, reporting_content):
+        """
+        :param reporting_content content of the coda/camt/mt940 file
+        """
+
+        url = self.client.instance_url("/reporting")
+        try:
+            await self.client.refresh_token_if_required()
+            response = await self.client.session.post(
+                url=url,
+                content=reporting_content,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.reporting_import"),
+            )
+            if "ApiErrorCode" in response.headers:
+                raise self.client.raise_error("Import reporting", response)
+        except httpx.HTTPError as e:
+            raise self.client.raise_error_from_request("Import reporting", e)
@@ -0,0 +1,229 @@
+import logging
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, NamedTuple
+
+_END = object()
+
+logger = logging.getLogger(__name__)
+
+
+class BulkResult(NamedTuple):
+    """
+    Outcome of one request of a create_many.
+
+    Attributes:
+        index (int): Position of the request in the input, starting at 0.
+        request: The request as it was passed.
+        result: The response model, None when the call failed.
+        error (Exception): The error of the call (usually a TwikeyError), None when it succeeded.
+    """
+
+    index: int
+    request: Any
+    result: Any = None
+    error: Exception = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkSummary:
+    """
+    Aggregated outcome of creating many items, eg. as returned by transaction.create_all.
+
+    Attributes:
+        total (int): Number of requests.
+        failures (list[BulkResult]): The results of the requests that failed.
+        elapsed (float): Wall clock seconds of the whole run.
+        batch: Result of the call closing the run (eg. batch_send), None when not done.
+    """
+
+    __slots__ = ["total", "failures", "elapsed", "batch"]
+
+    def __init__(self):
+        self.total = 0
+        self.failures = []
+        self.elapsed = 0.0
+        self.batch = None
+
+    def add(self, result: BulkResult):
+        self.total += 1
+        if not result.ok:
+            self.failures.append(result)
+
+    @property
+    def succeeded(self) -> int:
+        return self.total - len(self.failures)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+    def __str__(self):
+        return "%d of %d succeeded in %.1fs (%.0f/s)" % (
+            self.succeeded,
+            self.total,
+            self.elapsed,
+            self.total / self.elapsed if self.elapsed else 0,
+        )
+
+
+def call(fn, index, request) -> BulkResult:
+    """
+    :return: BulkResult of fn(request), holding the error instead of raising it
+    """
+    try:
+        return BulkResult(index, request, fn(request))
+    except Exception as e:
+        logger.debug("Request %d failed: %s", index, e)
+        return BulkResult(index, request, error=e)
+
+
+def run_many(fn, requests, concurrency=8, ordered=True):
+    """
+    Call fn for every request on a pool of concurrency threads.
+
+    The requests are read from the iterable as the calls progress, never more than a few times
+    concurrency ahead of the results, so a generator of any size can be passed. A failing call
+    does not stop the others, its error is part of its result. Stopping the iteration cancels the
+    calls that were not started yet and waits for the running ones.
+
+    Args:
+        fn: Function doing one call, eg. client.invoice.create.
+        requests: Iterable of requests.
+        concurrency (int): Number of calls running at the same time.
+        ordered (bool): Yield the results in the order of the requests, otherwise as soon as they complete.
+
+    Yields:
+        BulkResult: for each request.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    # when ordered, results after a slow call are held back, so keep more calls queued to keep all threads busy
+    window = 2 * concurrency if ordered else concurrency
+    requests = iter(requests)
+    pending = deque() if ordered else set()
+    executor = ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="twikey-bulk"
+    )
+    try:
+        index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                request = next(requests, _END)
+                if request is _END:
+                    exhausted = True
+                    break
+                future = executor.submit(call, fn, index, request)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                index += 1
+            if not pending:
+                return
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def journaled(fn, journal, dump, load, key=None):
+    """
+    Wrap fn to take (index, request) tuples, answering the requests recorded in the journal from
+    it and recording the result of the ones that succeed.
+
+    Args:
+        fn: Function doing one call.
+        journal (twikey.journal.Journal): Journal of a previous run of the same requests.
+        dump: Function turning a result into a json serializable dict.
+        load: Function turning such a dict back into a result.
+        key: Optional function returning the key of a request, by default its index.
+    """
+    done = journal.load()
+    if done:
+        logger.info("Skipping the %d requests done according to the journal", len(done))
+
+    def call(item):
+        index, request = item
+        name = str(index if key is None else key(request))
+        if name in done:
+            return load(done[name])
+        result = fn(request)
+        journal.record(name, dump(result))
+        return result
+
+    return call
+
+
+def run_journaled(
+    fn, requests, journal, dump, load, key=None, concurrency=8, ordered=True
+):
+    """
+    run_many, resuming from a journal: requests recorded in it are not sent again but yield the
+    recorded result, see journaled. When the requests are keyed by index, they must be passed in
+    the same order as in the previous run.
+
+    Yields:
+        BulkResult: for each request.
+    """
+    call = journaled(fn, journal, dump, load, key)
+    with closing(run_many(call, enumerate(requests), concurrency, ordered)) as results:
+        for result in results:
+            yield result._replace(request=result.request[1])
+
+
+def chunked(requests, size):
+    """
+    Split an iterable in lists of at most size elements, reading it as the chunks are consumed.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+    requests = iter(requests)
+    while True:
+        chunk = list(islice(requests, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def poll(check, interval=1.0, max_interval=30.0, backoff=2.0, timeout=None):
+    """
+    Call check until it returns something else than None, waiting interval seconds after the first
+    attempt and backoff times longer after each next one (up to max_interval).
+
+    Args:
+        check: Function returning None while the result is not ready, eg. a bulk_details call.
+        timeout (float): Seconds after which to give up, None to wait as long as it takes.
+
+    Returns:
+        The first result of check that is not None.
+
+    Raises:
+        TimeoutError: When the timeout passed.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        result = check()
+        if result is not None:
+            return result
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Still not ready after %ss" % timeout)
+            interval = min(interval, remaining)
+        time.sleep(interval)
+        interval = min(max_interval, interval * backoff)
@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
+
+
+class CheckpointStore:
+    """
+    Storage for the positions reached in the feeds, so a restarted worker resumes where it stopped.
+
+    Feeds are identified by name: 'document', 'invoice', 'transaction', 'paylink' and 'refund'.
+    A position is only saved once all items of its page were handled.
+    """
+
+    def load(self, feed):
+        """
+        :param feed: name of the feed
+        :return: the last saved position (X-LAST) of the feed or None
+        """
+        return None
+
+    def save(self, feed, position):
+        """
+        :param feed: name of the feed
+        :param position: X-LAST of a fully handled page
+        """
+        pass
+
+
+class MemoryCheckpointStore(CheckpointStore):
+    """
+    Keeps the positions in memory, eg. for tests or a single long running process.
+    """
+
+    def __init__(self):
+        self._positions = {}
+
+    def load(self, feed):
+        return self._positions.get(feed)
+
+    def save(self, feed, position):
+        self._positions[feed] = str(position)
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Keeps the positions of all feeds in one json file, replaced atomically on every save.
+
+    Concurrent saves from several processes are serialised using an advisory lock on '<path>.lock'
+    where the platform supports it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self, feed):
+        return self._read().get(feed)
+
+    def save(self, feed, position):
+        with self._locked():
+            positions = self._read()
+            positions[feed] = str(position)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".twikey-checkpoint")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(positions, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except Exception:
+                os.unlink(tmp)
+                raise
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    Keeps the positions in a table of a SQLite database, which can be shared by several processes.
+
+    Args:
+        path (str): Path of the database file.
+        table (str): Name of the table, created when missing.
+    """
+
+    def __init__(self, path, table="twikey_checkpoint"):
+        self.path = path
+        self.table = table
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (feed TEXT PRIMARY KEY, position TEXT NOT NULL, updated REAL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, feed):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT position FROM {self.table} WHERE feed = ?", (feed,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, feed, position):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (feed, position, updated) VALUES (?, ?, ?)",
+                (feed, str(position), time.time()),
+            )
@@ -1,14 +1,21 @@
 import datetime
-import json
 import logging
+import threading
+import time
+from collections import ChainMap
+from types import MappingProxyType
 
 import requests
 
+from .codec import default_codec
 from .document import DocumentService
 from .invoice import InvoiceService
 from .transaction import TransactionService
 from .paylink import PaylinkService
 from .refund import RefundService
+from .session import TwikeySession
+from .timeouts import TimeoutPolicy, Timeout
+from .token import Token, TokenStore, TokenRenewer, TOKEN_VALIDITY
 
 
 class TwikeyClient(object):
@@ -32,22 +39,89 @@ class TwikeyClient(object):
         base_url="https://api.twikey.com/creditor",
         user_agent="twikey-python/v0.1.0",
         private_key=None,
+        pool_connections=10,
+        pool_maxsize=10,
+        keep_alive=True,
+        token_store=None,
+        renew_before=None,
+        retry=None,
+        rate_limiter=None,
+        timeouts=None,
+        checkpoint_store=None,
+        codec=None,
     ) -> None:
+        """
+        Args:
+            api_key (str): The api key as found in the Twikey merchant interface.
+            base_url (str): The base url of the api.
+            user_agent (str): User agent sent along with each request.
+            private_key (str): Optional private key used to generate a TOTP during login.
+            pool_connections (int): Number of host connection pools to cache.
+            pool_maxsize (int): Maximum number of connections kept open per host.
+            keep_alive (bool): Reuse connections between calls (default True).
+            token_store (TokenStore): Optional store to share the session token with other clients or
+                processes (see MemoryTokenStore, FileTokenStore and CallbackTokenStore).
+            renew_before (int): When set, a background thread renews the token this many seconds
+                before it expires so no call has to wait for a login. Must be less than TOKEN_VALIDITY.
+            retry (RetryPolicy): How transient failures are retried, defaults to RetryPolicy().
+                Pass RetryPolicy(max_attempts=1) to disable retrying.
+            rate_limiter (RateLimiter): Optional client side limit on the outgoing calls, smoothing traffic
+                to a configured rate per endpoint class. Can be shared between clients.
+            timeouts (TimeoutPolicy): Connect and read timeouts and the overall deadline per operation,
+                defaults to TimeoutPolicy().
+            checkpoint_store (CheckpointStore): Optional store of the positions reached in the feeds. When set, the
+                feeds resume after the saved position and save it after each fully handled page
+                (see FileCheckpointStore and SQLiteCheckpointStore).
+            codec (JsonCodec): Encoder and decoder of the json bodies, defaults to orjson or ujson when
+                installed and the json module otherwise (see twikey.codec).
+        """
+        if renew_before is not None and not 0 <= renew_before < TOKEN_VALIDITY:
+            raise ValueError(
+                "renew_before must be between 0 and %d seconds" % TOKEN_VALIDITY
+            )
         self.user_agent = user_agent
         self.api_key = api_key
         self.private_key = private_key
         self.api_base = base_url
         self.merchant_id = 0
+        self.session = TwikeySession(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            relogin=self._relogin,
+            retry=retry,
+            rate_limiter=rate_limiter,
+        )
+        self.timeouts = timeouts if timeouts is not None else TimeoutPolicy()
+        self.checkpoint_store = checkpoint_store
+        self.codec = codec if codec is not None else default_codec()
+        self._login_lock = threading.Lock()
+        self._header_templates = (None, {})  # (token, {content_type: headers})
+        self._token_deadline = (
+            0.0  # time.monotonic() value until which api_token can be used
+        )
+        self.token_store = token_store if token_store is not None else TokenStore()
         self.document = DocumentService(self)
         self.invoice = InvoiceService(self)
         self.transaction = TransactionService(self)
         self.paylink = PaylinkService(self)
         self.refund = RefundService(self)
         self.logger = logging.getLogger(__name__)
+        self._renewer = None
+        if renew_before is not None:
+            self._renewer = TokenRenewer(self, renew_before)
+            self._renewer.start()
 
     def instance_url(self, url=""):
         return "{}{}".format(self.api_base, url)
 
+    def timeout(self, operation) -> Timeout:
+        """
+        :param operation: name of the call, eg. 'invoice.create'
+        :return: the Timeout configured for it
+        """
+        return self.timeouts.get(operation)
+
     @staticmethod
     def get_totp(vendor_prefix, secret):
         """
@@ -77,13 +151,12 @@ class TwikeyClient(object):
             return False
 
     def refresh_token_if_required(self):
-        if self.lastLogin:
-            self.logger.debug(
-                "Last authenticated with {} with {}".format(
-                    self.lastLogin, self.api_token
-                )
-            )
+        # hot path, runs before every api call: a single monotonic clock comparison
+        if time.monotonic() < self._token_deadline:
+            return
+        self._refresh_token()
 
+    def _refresh_token(self):
         if not self.api_base:
             raise TwikeyError(
                 ctx="Config",
@@ -98,74 +171,176 @@ class TwikeyClient(object):
                 error="No key defined - %s" % self.api_base,
             )
 
-        now = datetime.datetime.now()
-        if self.lastLogin is None or (now - self.lastLogin).seconds > 23 * 3600:
-            payload = {"apiToken": self.api_key}
-            if self.private_key:
-                payload["otp"] = self.get_totp(self.vendorPrefix, self.private_key)
+        # single-flight: only one thread logs in, the others wait and reuse its token
+        with self._login_lock:
+            if not self._token_valid():
+                if self.lastLogin:
+                    self.logger.debug("Token of {} expired".format(self.lastLogin))
+                self._acquire_token()
 
-            self.logger.debug(
-                "Authenticating with {} using {}...".format(
-                    self.api_base, self.api_key[0:10]
-                )
+    def _token_valid(self):
+        return time.monotonic() < self._token_deadline
+
+    def token_expires_in(self):
+        """
+        :return: seconds the current token remains valid, None when not logged in
+        """
+        if self.api_token is None:
+            return None
+        return self._token_deadline - time.monotonic()
+
+    def renew_token(self, min_validity=0):
+        """
+        Make sure the session remains valid for at least min_validity seconds, either by adopting
+        a newer token from the token store or by logging in again.
+        """
+        with self._login_lock:
+            self._acquire_token(min_validity)
+
+    def _relogin(self, stale_token):
+        """
+        Called by the session when the api rejected stale_token, returns the token to retry with.
+        """
+        with self._login_lock:
+            if self.api_token != stale_token and self._token_valid():
+                return self.api_token  # another thread already renewed it
+            self.logger.debug("Token rejected by the api, logging in again")
+            self._acquire_token(stale_token=stale_token)
+            return self.api_token
+
+    def _acquire_token(self, min_validity=0, stale_token=None):
+        # called while holding the login lock
+        with self.token_store.lock():
+            token = self.token_store.load()
+            if (
+                token is None
+                or token.expires_in() <= min_validity
+                or token.api_token == stale_token
+            ):
+                token = self._login()
+                self.token_store.save(token)
+            else:
+                self.logger.debug("Using stored token of %s" % token.merchant_id)
+            self._use_token(token)
+
+    def _use_token(self, token: Token):
+        self.api_token = token.api_token
+        self.merchant_id = token.merchant_id
+        self.lastLogin = datetime.datetime.fromtimestamp(token.issued_at)
+        # published last so other threads never see a valid deadline without its token
+        self._token_deadline = time.monotonic() + token.expires_in()
+        if self._renewer:
+            self._renewer.wake()
+
+    def _login(self) -> Token:
+        payload = {"apiToken": self.api_key}
+        if self.private_key:
+            payload["otp"] = self.get_totp(self.vendorPrefix, self.private_key)
+
+        self.logger.debug(
+            "Authenticating with {} using {}...".format(
+                self.api_base, self.api_key[0:10]
+            )
+        )
+        response = self.session.post(
+            self.instance_url(),
+            data=payload,
+            headers={"User-Agent": self.user_agent},
+            timeout=self.timeout("login"),
+            idempotent=True,  # a repeated login just yields another token
+        )
+
+        if "ApiErrorCode" in response.headers:
+            error_json = self.decode(response)
+            self.logger.error(error_json)
+            error_code = response.headers["ApiErrorCode"]
+            error_json_message = "Error authenticating : %s" % error_json["message"]
+            raise TwikeyError(
+                ctx="Config", error_code=error_code, error=error_json_message
+            )
+
+        if "X-Rate-Limit-Retry-After-Seconds" in response.headers:
+            retry_after_seconds = response.headers["X-Rate-Limit-Retry-After-Seconds"]
+            error_message = (
+                "Too many login's, please try again after %s sec." % retry_after_seconds
+            )
+            raise TwikeyError(
+                ctx="Config", error_code="Rate limit", error=error_message
+            )
+
+        if "Authorization" in response.headers:
+            return Token(
+                response.headers["Authorization"], response.headers["X-MERCHANT-ID"]
             )
-            response = requests.post(
+        else:
+            error_message = "Invalid response for url=%s : %s" % (
                 self.instance_url(),
-                data=payload,
-                headers={"User-Agent": self.user_agent},
-                timeout=15,
+                response,
+            )
+            raise TwikeyError(
+                ctx="Config", error_code="Authentication", error=error_message
             )
 
-            if "ApiErrorCode" in response.headers:
-                error_json = response.json()
-                self.logger.error(error_json)
-                error_code = response.headers["ApiErrorCode"]
-                error_json_message = "Error authenticating : %s" % error_json["message"]
-                raise TwikeyError(
-                    ctx="Config", error_code=error_code, error=error_json_message
-                )
+    def headers(
+        self, content_type="application/x-www-form-urlencoded", extra=None
+    ) -> dict:
+        """
+        :param content_type: Content-type of the request body
+        :param extra: optional dict of additional headers
+        :return: the headers for an api call, as a new dict the caller may change
+        """
+        return dict(self._headers(content_type, extra))
 
-            if "X-Rate-Limit-Retry-After-Seconds" in response.headers:
-                retry_after_seconds = response.headers[
-                    "X-Rate-Limit-Retry-After-Seconds"
-                ]
-                error_message = (
-                    "Too many login's, please try again after %s sec."
-                    % retry_after_seconds
-                )
-                raise TwikeyError(
-                    ctx="Config", error_code="Rate limit", error=error_message
-                )
+    def _headers(self, content_type="application/x-www-form-urlencoded", extra=None):
+        """
+        Headers for an api call as used by the services, the base set is built once per token and content type.
 
-            if "Authorization" in response.headers:
-                self.api_token = response.headers["Authorization"]
-                self.merchant_id = response.headers["X-MERCHANT-ID"]
-                self.lastLogin = datetime.datetime.now()
-            else:
-                error_message = "Invalid response for url=%s : %s" % (
-                    self.instance_url(),
-                    response,
-                )
-                raise TwikeyError(
-                    ctx="Config", error_code="Authentication", error=error_message
-                )
-        else:
-            self.logger.debug(
-                "Reusing token {} valid till {}".format(self.api_token, self.lastLogin)
+        :param content_type: Content-type of the request body
+        :param extra: optional dict of additional headers layered on top of the base set
+        :return: a read-only mapping of headers, shared between calls
+        """
+        api_token = self.api_token
+        cached_token, templates = self._header_templates
+        if cached_token != api_token:
+            templates = {}
+            self._header_templates = (api_token, templates)
+        template = templates.get(content_type)
+        if template is None:
+            template = MappingProxyType(
+                {
+                    "Content-type": content_type,
+                    "Authorization": api_token,
+                    "Accept": "application/json",
+                    "User-Agent": self.user_agent,
+                }
             )
+            templates[content_type] = template
+        if extra:
+            return ChainMap(extra, template)
+        return template
+
+    def encode(self, payload) -> bytes:
+        """
+        :param payload: dict or list to send as json body
+        :return: the body encoded with the codec of the client
+        """
+        return self.codec.dumps(payload)
 
-    def headers(self, content_type="application/x-www-form-urlencoded"):
-        return {
-            "Content-type": content_type,
-            "Authorization": self.api_token,
-            "Accept": "application/json",
-            "User-Agent": self.user_agent,
-        }
+    def decode(self, response):
+        """
+        :param response: response with a json body
+        :return: the body decoded with the codec of the client
+        :raises requests.exceptions.JSONDecodeError: when the body is not valid json
+        """
+        try:
+            return self.codec.loads(response.content)
+        except ValueError as e:
+            raise requests.exceptions.JSONDecodeError(str(e), response.text, 0)
 
     def raise_error(self, context, response):
         self.logger.error("Error in '%s' response %s " % (context, response.text))
         try:
-            error_json = response.json()
+            error_json = self.decode(response)
             extra = error_json["extra"] if "extra" in error_json else False
             return TwikeyError(
                 context, error_json["code"], error_json["message"], extra
@@ -181,20 +356,37 @@ class TwikeyClient(object):
 
     def logout(self):
         self.logger.info("Logging out of Twikey")
-        response = requests.get(
+        response = self.session.get(
             self.instance_url(),
             headers={"User-Agent": self.user_agent},
-            timeout=15,
+            timeout=self.timeout("logout"),
         )
-        response_text = json.loads(response.text)
+        response_text = self.decode(response)
         if "code" in response_text:
             if "err" in response_text["code"]:
                 raise TwikeyError(
                     ctx="Logout", error_code="Logout", error=response_text["message"]
                 )
 
-        self.api_token = None
-        self.lastLogin = None
+        with self._login_lock:
+            self._token_deadline = 0.0
+            self.lastLogin = None
+            self.api_token = None
+            self.token_store.clear()
+
+    def close(self):
+        """
+        Stop the background token renewal (if any) and release the pooled connections held by this client.
+        """
+        if self._renewer:
+            self._renewer.stop()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 class TwikeyError(Exception):
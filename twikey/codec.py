@@ -0,0 +1,76 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, pip install twikey-api-python[speedups]
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # optional
+    ujson = None
+
+
+class JsonCodec:
+    """
+    Encodes the json payloads sent to the api and decodes its responses, using the json module
+    of the standard library.
+    """
+
+    name = "json"
+
+    def dumps(self, obj) -> bytes:
+        """
+        :param obj: payload, eg. the result of InvoiceRequest.to_request()
+        :return: the compact utf-8 encoded json document
+        """
+        return json.dumps(
+            obj, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+        ).encode("utf-8")
+
+    def loads(self, data):
+        """
+        :param data: json document as bytes or str
+        :return: the decoded object
+        :raises ValueError: when data is not valid json
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Codec using orjson, several times faster than the standard library for both directions.
+    """
+
+    name = "orjson"
+
+    def dumps(self, obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    Codec using ujson, for platforms without orjson wheels.
+    """
+
+    name = "ujson"
+
+    def dumps(self, obj) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+def default_codec() -> JsonCodec:
+    """
+    :return: the fastest codec available, orjson or ujson when installed and the standard library otherwise
+    """
+    if orjson is not None:
+        return OrjsonCodec()
+    if ujson is not None:
+        return UjsonCodec()
+    return JsonCodec()
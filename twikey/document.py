@@ -1,13 +1,38 @@
 import logging
 
 import requests
-from datetime import datetime
 
-from .model.document_request import InviteRequest, SignRequest, FetchMandateRequest, QueryMandateRequest, \
-    MandateActionRequest, UpdateMandateRequest, PdfUploadRequest
+from .bulk import run_journaled, run_many
+from .feed import FeedItem, FeedStats, counted, feed_pages
+from .model.document_request import (
+    InviteRequest,
+    SignRequest,
+    FetchMandateRequest,
+    QueryMandateRequest,
+    MandateActionRequest,
+    UpdateMandateRequest,
+    PdfUploadRequest,
+)
 
-from .model.document_response import InviteResponse, SignResponse, Document, QueryMandateResponse, PdfResponse, \
-    CustomerAccessResponse, DocumentFeed
+from .model.document_response import (
+    InviteResponse,
+    SignResponse,
+    Document,
+    QueryMandateResponse,
+    PdfResponse,
+    CustomerAccessResponse,
+    DocumentFeed,
+    DocumentEvent,
+)
+from .ratelimit import TokenBucket
+
+
+def dump_invite(response: InviteResponse) -> dict:
+    return {"mndtId": response.mandate_number, "url": response.url, "key": response.key}
+
+
+def dump_sign(response: SignResponse) -> dict:
+    return {"MndtId": response.mandate_number, "url": response.url}
 
 
 class DocumentService(object):
@@ -41,12 +66,15 @@ class DocumentService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
-                url=url, data=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.create"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Invite", response)
-            json_response = response.json()
+            json_response = self.client.decode(response)
             # self.logger.debug("Added new mandate : %s" % json_response["mndtId"])
             return InviteResponse(**json_response)
         except requests.exceptions.RequestException as e:
@@ -73,24 +101,117 @@ class DocumentService(object):
             TwikeyAPIError: If the API returns an error or the request fails.
         """
 
-
         url = self.client.instance_url("/sign")
         data = request.to_request()
         if not request.method:
             raise self.client.raise_error("Missing method")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
-                url=url, data=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.sign"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Sign", response)
-            json_response = response.json()
+            json_response = self.client.decode(response)
             self.logger.debug("Added new mandate : %s" % json_response["MndtId"])
             return SignResponse(**json_response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Sign", e)
 
+    def create_many(
+        self, invites, concurrency=8, ordered=True, rate=None, journal=None, key=None
+    ):
+        """
+        See https://www.twikey.com/api/#invite-a-customer
+
+        Invite many customers concurrently, each one via create().
+
+        The requests are read from the iterable while the invitations are being sent, so a generator
+        can be passed without holding all of them in memory. A failing invitation does not stop the others.
+
+        With a journal, every invitation is recorded as soon as it was accepted. Running the same
+        requests again with that journal, eg. after the process died midway, skips the recorded
+        ones (yielding their recorded response) and only sends the others.
+
+        Args:
+            invites: Iterable of InviteRequest.
+            concurrency (int): Number of invitations sent at the same time.
+            ordered (bool): Yield the results in the order of the requests, otherwise as they complete.
+            rate (float): Optional maximum number of invitations sent per second by this call.
+            journal (Journal): Optional journal to resume from and record to, eg. a FileJournal.
+            key: Optional function returning a unique key of a request (eg. its customer number) to
+                identify it in the journal, by default its position in the input.
+
+        Yields:
+            BulkResult: Per request, holding either the InviteResponse or the error (usually a TwikeyError).
+        """
+        return self._fan_out(
+            self.create,
+            invites,
+            concurrency,
+            ordered,
+            rate,
+            journal,
+            key,
+            dump_invite,
+            lambda raw: InviteResponse(**raw),
+        )
+
+    def sign_many(
+        self,
+        sign_requests,
+        concurrency=8,
+        ordered=True,
+        rate=None,
+        journal=None,
+        key=None,
+    ):
+        """
+        See https://www.twikey.com/api/#sign-a-mandate
+
+        Create many signed mandates concurrently, each one via sign(). Works as create_many.
+
+        Args:
+            sign_requests: Iterable of SignRequest.
+            concurrency (int): Number of mandates created at the same time.
+            ordered (bool): Yield the results in the order of the requests, otherwise as they complete.
+            rate (float): Optional maximum number of mandates created per second by this call.
+            journal (Journal): Optional journal to resume from and record to, eg. a FileJournal.
+            key: Optional function returning a unique key of a request, by default its position in the input.
+
+        Yields:
+            BulkResult: Per request, holding either the SignResponse or the error (usually a TwikeyError).
+        """
+        return self._fan_out(
+            self.sign,
+            sign_requests,
+            concurrency,
+            ordered,
+            rate,
+            journal,
+            key,
+            dump_sign,
+            lambda raw: SignResponse(**raw),
+        )
+
+    @staticmethod
+    def _fan_out(fn, items, concurrency, ordered, rate, journal, key, dump, load):
+        limiter = TokenBucket(rate) if rate else None
+
+        def call(request):
+            if limiter is not None:
+                limiter.acquire()
+            return fn(request)
+
+        if journal is None:
+            return run_many(call, items, concurrency, ordered)
+        return run_journaled(
+            call, items, journal, dump, load, key, concurrency, ordered
+        )
+
     def fetch(self, request: FetchMandateRequest) -> Document:
         """
         See https://www.twikey.com/api/#fetch-mandate-details
@@ -114,15 +235,20 @@ class DocumentService(object):
         url = self.client.instance_url("/mandate/detail")
         try:
             self.client.refresh_token_if_required()
-            response = requests.get(
-                url=url, params=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.get(
+                url=url,
+                params=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.fetch"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("detail", response)
-            json_response = response.json()
+            json_response = self.client.decode(response)
             json_response["headers"] = response.headers
             self.logger.debug("Mandate details : %s" % json_response)
-            return Document(mandate=json_response.get("Mndt"), headers=json_response.get("headers"))
+            return Document(
+                mandate=json_response.get("Mndt"), headers=json_response.get("headers")
+            )
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("detail", e)
 
@@ -150,15 +276,15 @@ class DocumentService(object):
         url = self.client.instance_url("/mandate/query")
         try:
             self.client.refresh_token_if_required()
-            response = requests.get(
+            response = self.client.session.get(
                 url=url,
                 params=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.query"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("query", response)
-            json_response = response.json()
+            json_response = self.client.decode(response)
             contracts_data = json_response.get("Contracts", [])
             self.logger.debug("Mandate query result: %s" % json_response)
             return QueryMandateResponse(contracts_data)
@@ -192,8 +318,11 @@ class DocumentService(object):
         url = self.client.instance_url(f"/mandate/{data.get('mndtId')}/action")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
-                url=url, data=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.action"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("action", response)
@@ -224,8 +353,11 @@ class DocumentService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
-                url=url, data=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.update"),
             )
             self.logger.debug("Updated mandate : {} response={}".format(data, response))
             if "ApiErrorCode" in response.headers:
@@ -259,8 +391,10 @@ class DocumentService(object):
         url = self.client.instance_url(f"/mandate?mndtId={mandate_number}&rsn={reason}")
         try:
             self.client.refresh_token_if_required()
-            response = requests.delete(
-                url=url, headers=self.client.headers(), timeout=15
+            response = self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.cancel"),
             )
             self.logger.debug(
                 "Cancel mandate : %s status=%d" % (mandate_number, response.status_code)
@@ -270,7 +404,46 @@ class DocumentService(object):
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Cancel", e)
 
-    def feed(self, document_feed: DocumentFeed, start_position=False):
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url(
+            "/mandate?include=id&include=mandate&include=person"
+        )
+        return feed_pages(
+            self.client,
+            "document.feed",
+            "Mandate feed",
+            url,
+            "Messages",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#mandate-feed
+
+        Lazily iterate the mandate feed. A page is only fetched once the items of the previous one
+        have been consumed, so breaking out of the loop stops reading the feed.
+
+        Args:
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
+            stream (bool): Decode the items while a page is being read instead of loading the whole
+                page first, so large pages use little memory. Can't be combined with prefetch.
+
+        Yields:
+            FeedItem: The X-LAST position of the page the item belongs to and the DocumentEvent.
+
+        Raises:
+            TwikeyError: If the API returns an error or the request fails.
+        """
+
+        for position, messages in self._pages(start_position, prefetch, stream):
+            for msg in messages:
+                yield FeedItem(position, DocumentEvent(msg))
+
+    def feed(self, document_feed: DocumentFeed, start_position=False, prefetch=0):
         """
         See https://www.twikey.com/api/#mandate-feed
 
@@ -284,88 +457,28 @@ class DocumentService(object):
         Args:
             document_feed (DocumentFeed): Custom handler class with methods for processing
                 new, updated, or cancelled mandate events.
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
 
         Returns:
-            None
+            FeedStats: The number of pages and items handled and the last position read.
 
         Raises:
             Exception: If the request to the feed endpoint fails or response is invalid.
         """
 
-        url = self.client.instance_url(
-            "/mandate?include=id&include=mandate&include=person"
-        )
-        try:
-            self.client.refresh_token_if_required()
-            initheaders = self.client.headers()
-            if start_position:
-                initheaders["X-RESUME-AFTER"] = str(start_position)
-            response = requests.get(
-                url=url,
-                headers=initheaders,
-                timeout=15,
+        stats = FeedStats("document")
+        for position, messages in counted(self._pages(start_position, prefetch), stats):
+            self.logger.debug(
+                "Feed handling : %d from %s till %s"
+                % (len(messages), start_position, position)
             )
-            if "ApiErrorCode" in response.headers:
-                raise self.client.raise_error("Feed", response)
-            feed_response = response.json()
-            while len(feed_response["Messages"]) > 0:
-                self.logger.debug(
-                    "Feed handling : %d from %s till %s"
-                    % (
-                        len(feed_response["Messages"]),
-                        start_position,
-                        response.headers["X-LAST"],
-                    )
-                )
-                document_feed.start(
-                    response.headers["X-LAST"], len(feed_response["Messages"])
-                )
-                error = False
-                for msg in feed_response["Messages"]:
-                    if "AmdmntRsn" in msg:
-                        mndt_id_ = msg["OrgnlMndtId"]
-                        self.logger.debug("Feed update : %s" % mndt_id_)
-                        mndt_ = msg["Mndt"]
-                        amdmnt_rsn_ = msg["AmdmntRsn"]
-                        rsn_ = amdmnt_rsn_.get("Rsn")
-                        author_ = amdmnt_rsn_["Orgtr"]["CtctDtls"]["EmailAdr"]
-                        at_ = msg["EvtTime"]
-                        if at_.endswith("Z"):
-                            at_ = at_.replace("Z", "+00:00")
-                        error = document_feed.updated_document(mndt_id_, Document(mandate=mndt_), rsn_, author_, datetime.fromisoformat(at_))
-                    elif "CxlRsn" in msg:
-                        mndt_ = msg["OrgnlMndtId"]
-                        cxl_rsn_ = msg["CxlRsn"]
-                        rsn_ = cxl_rsn_.get("Rsn")
-                        author_ = cxl_rsn_["Orgtr"]["CtctDtls"]["EmailAdr"]
-                        at_ = msg["EvtTime"]
-                        if at_.endswith("Z"):
-                            at_ = at_.replace("Z", "+00:00")
-                        self.logger.debug("Feed cancel : %s" % mndt_)
-                        error = document_feed.cancelled_document(mndt_, rsn_, author_, datetime.fromisoformat(at_))
-                    else:
-                        mndt_ = msg["Mndt"]
-                        at_ = msg["EvtTime"]
-                        if at_.endswith("Z"):
-                            at_ = at_.replace("Z", "+00:00")
-                        self.logger.debug("Feed create : %s" % mndt_)
-                        error = document_feed.new_document(Document(mandate=mndt_), datetime.fromisoformat(at_))
-                    if error:
-                        break
-                if error:
-                    self.logger.debug("Error while handing invoice, stopping")
-                    break
-                response = requests.get(
-                    url=url,
-                    headers=self.client.headers(),
-                    timeout=15,
-                )
-                if "ApiErrorCode" in response.headers:
-                    raise self.client.raise_error("Feed", response)
-                feed_response = response.json()
-            self.logger.debug("Done handing mandate feed")
-        except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("Mandate feed", e)
+            document_feed.start(position, len(messages))
+            if document_feed.page(position, [DocumentEvent(msg) for msg in messages]):
+                self.logger.debug("Error while handing document, stopping")
+                break
+        self.logger.debug("Done handing mandate feed")
+        return stats
 
     def upload_pdf(self, request: PdfUploadRequest):
         """
@@ -384,12 +497,16 @@ class DocumentService(object):
         """
 
         url = self.client.instance_url(
-            f"/mandate/pdf?mndtId={request.mandate_number}&bankSignature={request.bank_signature}")
+            f"/mandate/pdf?mndtId={request.mandate_number}&bankSignature={request.bank_signature}"
+        )
         try:
             self.client.refresh_token_if_required()
             with open(request.pdf_path, "rb") as file:
-                response = requests.post(
-                    url=url, data=file, headers=self.client.headers('application/pdf'), timeout=15
+                response = self.client.session.post(
+                    url=url,
+                    data=file,
+                    headers=self.client._headers("application/pdf"),
+                    timeout=self.client.timeout("document.upload_pdf"),
                 )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("pdf", response)
@@ -415,8 +532,10 @@ class DocumentService(object):
         url = self.client.instance_url(f"/mandate/pdf?mndtId={mndt_id}")
         try:
             self.client.refresh_token_if_required()
-            response = requests.get(
-                url=url, headers=self.client.headers(), timeout=15
+            response = self.client.session.get(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.retrieve_pdf"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("pdf", response)
@@ -453,8 +572,11 @@ class DocumentService(object):
         url = self.client.instance_url("/customer/" + str(customer_id))
         try:
             self.client.refresh_token_if_required()
-            response = requests.patch(
-                url=url, params=data, headers=self.client.headers(), timeout=15
+            response = self.client.session.patch(
+                url=url,
+                params=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.update_customer"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Cancel", response)
@@ -480,11 +602,14 @@ class DocumentService(object):
         url = self.client.instance_url("/customeraccess")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
-                url=url, data={"mndtId": mndt_id}, headers=self.client.headers(), timeout=15
+            response = self.client.session.post(
+                url=url,
+                data={"mndtId": mndt_id},
+                headers=self.client._headers(),
+                timeout=self.client.timeout("document.customer_access"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Cancel", response)
-            return CustomerAccessResponse(**response.json())
+            return CustomerAccessResponse(**self.client.decode(response))
         except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("customer access", e)
\ No newline at end of file
+            raise self.client.raise_error_from_request("customer access", e)
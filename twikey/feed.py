@@ -0,0 +1,260 @@
+import logging
+import threading
+from collections import deque
+from itertools import chain
+from typing import Any, NamedTuple
+
+import requests
+
+from .stream import iter_items
+
+STREAM_CHUNK_SIZE = 64 * 1024
+_END = object()
+
+logger = logging.getLogger(__name__)
+
+
+class FeedItem(NamedTuple):
+    """
+    A single item read from one of the feeds.
+
+    Attributes:
+        position (str): The 'X-LAST' position of the page the item was part of,
+            usable as start_position to resume the feed after this page.
+        item: The parsed model (Invoice, Transaction, Refund, Paylink or DocumentEvent).
+    """
+
+    position: str
+    item: Any
+
+
+class FeedStats:
+    """
+    Summary of reading a feed, as returned by feed().
+
+    Attributes:
+        feed (str): Name of the feed, eg. 'invoice'.
+        pages (int): Number of pages handed to the handler.
+        items (int): Number of items on those pages.
+        position (str): The X-LAST position of the last page handed to the handler.
+        elapsed (float): Seconds spent reading and handling the feed (set by the FeedRunner).
+        error (Exception): Error that stopped the feed, if any (set by the FeedRunner).
+    """
+
+    __slots__ = ["feed", "pages", "items", "position", "elapsed", "error"]
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.pages = 0
+        self.items = 0
+        self.position = None
+        self.elapsed = 0.0
+        self.error = None
+
+    def __str__(self):
+        status = "failed: %s" % self.error if self.error else "ok"
+        return "%s: %d items in %d pages till %s (%.1fs, %s)" % (
+            self.feed,
+            self.items,
+            self.pages,
+            self.position,
+            self.elapsed,
+            status,
+        )
+
+
+def counted(pages, stats: FeedStats):
+    """
+    Pass the pages through, counting them in stats.
+    """
+    try:
+        for position, items in pages:
+            stats.pages += 1
+            stats.items += len(items)
+            stats.position = position
+            yield position, items
+    finally:
+        close = getattr(pages, "close", None)
+        if close:
+            close()
+
+
+def feed_pages(
+    client, operation, context, url, key, start_position=False, prefetch=0, stream=False
+):
+    """
+    Read a feed page by page until an empty page is returned.
+
+    Pages are only requested when the previous one has been consumed, so stopping the
+    iteration stops reading the feed. With prefetch, a background thread reads up to that
+    many pages ahead while the current one is being handled (see prefetch_pages).
+
+    When the client has a checkpoint_store, the feed resumes after the saved position unless a
+    start_position is given, and the position of a page is saved once the consumer asks for the
+    next one, ie. after all of its items were handled.
+
+    Args:
+        client (TwikeyClient): Client used for the calls.
+        operation (str): Name of the call, eg. 'invoice.feed', used for the timeouts.
+        context (str): Description used in the errors.
+        url (str): Url of the feed.
+        key (str): Name of the list holding the items in the response, eg. 'Invoices'.
+        start_position: Optional position (X-LAST) to resume after.
+        prefetch (int): Number of pages to read ahead, 0 to read on demand.
+        stream (bool): Decode the items while the body of a page is read (see twikey.stream), the
+            items of a page are then an iterator to be consumed before asking for the next page.
+
+    Yields:
+        tuple: The 'X-LAST' position of the page and the list (or iterator) of raw items.
+
+    Raises:
+        TwikeyError: If the api returns an error or the request fails.
+    """
+    if stream and prefetch:
+        raise ValueError(
+            "Streamed pages are read while being handled, they can't be prefetched"
+        )
+    name = operation.split(".")[0]
+    store = client.checkpoint_store
+    if store is not None and not start_position:
+        start_position = store.load(name)
+    pages = _read_pages(client, operation, context, url, key, start_position, stream)
+    if prefetch:
+        pages = prefetch_pages(pages, prefetch)
+    if store is not None:
+        pages = checkpointed(pages, store, name)
+    return pages
+
+
+def checkpointed(pages, store, feed):
+    """
+    Pass the pages through, saving the position of each page in the store when the next one is requested.
+    Nothing is saved for a page when the iteration is stopped while handling it.
+    """
+    try:
+        for position, items in pages:
+            yield position, items
+            store.save(feed, position)
+    finally:
+        close = getattr(pages, "close", None)
+        if close:
+            close()
+
+
+def _read_pages(client, operation, context, url, key, start_position, stream=False):
+    try:
+        client.refresh_token_if_required()
+        headers = client._headers()
+        if start_position:
+            headers = client._headers(extra={"X-RESUME-AFTER": str(start_position)})
+        while True:
+            response = client.session.get(
+                url=url,
+                headers=headers,
+                timeout=client.timeout(operation),
+                idempotent=False,  # every page read advances the feed
+                stream=stream,
+            )
+            if "ApiErrorCode" in response.headers or response.status_code >= 400:
+                raise client.raise_error(context, response)
+            if stream:
+                items = _stream_items(client, context, response, key)
+                first = next(items, _END)
+                if first is _END:
+                    return
+                try:
+                    yield response.headers.get("X-LAST"), chain((first,), items)
+                finally:
+                    items.close()  # releases the connection when the page was not read until the end
+            else:
+                items = client.decode(response)[key]
+                if len(items) == 0:
+                    return
+                yield response.headers.get("X-LAST"), items
+            headers = client._headers()
+    except requests.exceptions.RequestException as e:
+        raise client.raise_error_from_request(context, e)
+
+
+def _stream_items(client, context, response, key):
+    try:
+        yield from iter_items(response.iter_content(STREAM_CHUNK_SIZE), key)
+    except requests.exceptions.RequestException as e:
+        raise client.raise_error_from_request(context, e)
+    finally:
+        response.close()
+
+
+def prefetch_pages(pages, read_ahead=1):
+    """
+    Iterate pages while a background thread already fetches the next ones.
+
+    At most read_ahead pages are fetched before the consumer asks for them. As reading a page
+    advances the feed, pages that were read ahead but not handled because the consumer stopped
+    are only delivered again when resuming after the last fully handled position, which is logged.
+
+    Args:
+        pages: Iterator of (position, items) tuples, consumed by the background thread only.
+        read_ahead (int): Maximum number of pages fetched ahead of the consumer.
+
+    Yields:
+        tuple: The pages of the underlying iterator, in order.
+    """
+    buffer = deque()
+    slots = threading.Semaphore(read_ahead)
+    available = threading.Condition()
+    stopped = threading.Event()
+    outcome = []  # exception of the producer, or None once all pages were read
+
+    def produce():
+        try:
+            while True:
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                page = next(pages, None)
+                with available:
+                    if page is None:
+                        outcome.append(None)
+                    else:
+                        buffer.append(page)
+                    available.notify()
+                if page is None:
+                    return
+        except BaseException as e:
+            with available:
+                outcome.append(e)
+                available.notify()
+        finally:
+            close = getattr(pages, "close", None)
+            if close:
+                close()
+
+    thread = threading.Thread(target=produce, name="twikey-feed-prefetch", daemon=True)
+    thread.start()
+    handled = None  # position of the last page the consumer fully handled
+    try:
+        while True:
+            with available:
+                while not buffer and not outcome:
+                    available.wait()
+                if buffer:
+                    page = buffer.popleft()
+                else:
+                    if outcome[0] is not None:
+                        raise outcome[0]
+                    return
+            slots.release()
+            yield page
+            handled = page[0]
+    finally:
+        if thread.is_alive():
+            stopped.set()
+            slots.release()  # unblock the producer, then let a fetch in flight complete
+            thread.join()
+        if buffer:
+            logger.warning(
+                "Feed stopped with %d page(s) read ahead, resume after position %s to receive them again",
+                len(buffer),
+                handled,
+            )
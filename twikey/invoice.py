@@ -1,11 +1,69 @@
 import logging
+from contextlib import closing
 
 import requests
 
-from .model.invoice_request import InvoiceRequest, UpdateInvoiceRequest, DetailsRequest, ActionRequest, \
-    UblUploadRequest, BulkInvoiceRequest
-from .model.invoice_response import Invoice, BulkInvoiceResponse, \
-    BulkBatchDetailsResponse, InvoiceFeed
+from .bulk import BulkResult, chunked, poll, run_many
+from .feed import FeedItem, FeedStats, counted, feed_pages
+from .model.invoice_request import (
+    InvoiceRequest,
+    UpdateInvoiceRequest,
+    DetailsRequest,
+    ActionRequest,
+    UblUploadRequest,
+    BulkInvoiceRequest,
+)
+from .model.invoice_response import (
+    Invoice,
+    BulkInvoiceResponse,
+    BulkBatchDetailsResponse,
+    InvoiceFeed,
+)
+
+
+def batch_results(batch: BulkResult, chunk_size: int):
+    """
+    Match the outcome of an uploaded batch with its requests, by invoice id when the request has one and by
+    position otherwise. An invoice the api rejected or did not report on gets a TwikeyError.
+
+    Args:
+        batch (BulkResult): Result of uploading one chunk, holding the BulkBatchDetailsResponse or the error.
+        chunk_size (int): Number of invoices per chunk, to number the requests.
+
+    Yields:
+        BulkResult: Per request of the chunk, holding its BulkBatchDetailsItem.
+    """
+    from .client import TwikeyError  # the client imports this module
+
+    start = batch.index * chunk_size
+    if not batch.ok:
+        for i, request in enumerate(batch.request):
+            yield BulkResult(start + i, request, error=batch.error)
+        return
+    results = batch.result.results
+    by_id = {str(item.id): item for item in results if item.id}
+    for i, request in enumerate(batch.request):
+        if request.id:
+            item = by_id.get(str(request.id))
+        else:
+            item = results[i] if i < len(results) else None
+        if item is None:
+            error = TwikeyError(
+                "bulk batch details",
+                "missing_result",
+                "No result for invoice %s" % request.number,
+            )
+            yield BulkResult(start + i, request, error=error)
+        elif item.status != "OK":
+            error = TwikeyError(
+                "bulk batch details",
+                item.status,
+                "Invoice %s rejected" % request.number,
+            )
+            yield BulkResult(start + i, request, item, error)
+        else:
+            yield BulkResult(start + i, request, item)
+
 
 class InvoiceService(object):
     def __init__(self, client) -> None:
@@ -13,7 +71,9 @@ class InvoiceService(object):
         self.client = client
         self.logger = logging.getLogger(__name__)
 
-    def create(self, request: InvoiceRequest, origin=False, purpose=False, manual=False) -> Invoice:
+    def create(
+        self, request: InvoiceRequest, origin=False, purpose=False, manual=False
+    ) -> Invoice:
         """
         See https://www.twikey.com/api/#create-invoice
 
@@ -38,20 +98,21 @@ class InvoiceService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
+            extra = {}
             if origin:
-                headers["X-PARTNER"] = origin
+                extra["X-PARTNER"] = origin
             if purpose:
-                headers["X-Purpose"] = purpose
+                extra["X-Purpose"] = purpose
             if manual:
-                headers["X-MANUAL"] = "true"
-            response = requests.post(
+                extra["X-MANUAL"] = "true"
+            headers = self.client._headers("application/json", extra)
+            response = self.client.session.post(
                 url=url,
-                json=data,
+                data=self.client.encode(data),
                 headers=headers,
-                timeout=15,
+                timeout=self.client.timeout("invoice.create"),
             )
-            json_response = response.json()
+            json_response = self.client.decode(response)
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create invoice", response)
             self.logger.debug("Added invoice : %s" % json_response["url"])
@@ -59,6 +120,40 @@ class InvoiceService(object):
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create invoice", e)
 
+    def create_many(
+        self,
+        invoices,
+        concurrency=8,
+        ordered=True,
+        origin=False,
+        purpose=False,
+        manual=False,
+    ):
+        """
+        See https://www.twikey.com/api/#create-invoice
+
+        Create many invoices concurrently, each one via create().
+
+        The requests are read from the iterable while the invoices are being created, so a generator
+        can be passed without holding all of them in memory. The calls share the connection pool (and
+        the rate limiter) of the client, so keep pool_maxsize at least at concurrency. A failing invoice
+        does not stop the others.
+
+        Args:
+            invoices: Iterable of InvoiceRequest.
+            concurrency (int): Number of invoices created at the same time.
+            ordered (bool): Yield the results in the order of the requests, otherwise as they complete.
+            origin, purpose, manual: As for create().
+
+        Yields:
+            BulkResult: Per request, holding either the created Invoice or the error (usually a TwikeyError).
+        """
+
+        def create(request):
+            return self.create(request, origin, purpose, manual)
+
+        return run_many(create, invoices, concurrency, ordered)
+
     def update(self, request: UpdateInvoiceRequest) -> Invoice:
         """
         See https://www.twikey.com/api/#update-invoice
@@ -83,9 +178,14 @@ class InvoiceService(object):
         url = self.client.instance_url("/invoice/" + data.get("id"))
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.put(url=url, json=data, headers=headers, timeout=15)
-            json_response = response.json()
+            headers = self.client._headers("application/json")
+            response = self.client.session.put(
+                url=url,
+                data=self.client.encode(data),
+                headers=headers,
+                timeout=self.client.timeout("invoice.update"),
+            )
+            json_response = self.client.decode(response)
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update invoice", response)
             self.logger.debug("Updated invoice : %s" % json_response["url"])
@@ -121,12 +221,14 @@ class InvoiceService(object):
             url += f"?{query_string}"
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.get(url=url, headers=headers, timeout=15)
+            headers = self.client._headers("application/json")
+            response = self.client.session.get(
+                url=url, headers=headers, timeout=self.client.timeout("invoice.details")
+            )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("details invoice", response)
             self.logger.debug("details invoice: %s", response.text)
-            return Invoice(**response.json())
+            return Invoice(**self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("details invoice", e)
 
@@ -154,8 +256,13 @@ class InvoiceService(object):
         payload = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/x-www-form-urlencoded")
-            response = requests.post(url=url, data=payload, headers=headers, timeout=15)
+            headers = self.client._headers("application/x-www-form-urlencoded")
+            response = self.client.session.post(
+                url=url,
+                data=payload,
+                headers=headers,
+                timeout=self.client.timeout("invoice.action"),
+            )
             if response.status_code != 204:
                 raise self.client.raise_error("action invoice", response)
             self.logger.debug("action invoice [%s]: %s", invoice_id, payload["type"])
@@ -181,19 +288,20 @@ class InvoiceService(object):
         url = self.client.instance_url("/invoice/ubl")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/x-www-form-urlencoded")
-            headers.update(request.to_headers())
+            headers = self.client._headers(
+                "application/x-www-form-urlencoded", request.to_headers()
+            )
             with open(request.xml_path, "rb") as file:
-                response = requests.post(
+                response = self.client.session.post(
                     url=url,
                     headers=headers,
                     data=file,
-                    timeout=15
+                    timeout=self.client.timeout("invoice.upload_ubl"),
                 )
             if response.status_code != 200:
                 raise self.client.raise_error("UBL upload", response)
             self.logger.debug("UBL upload response: %s", response.text)
-            return Invoice(**response.json())
+            return Invoice(**self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("UBL upload", e)
 
@@ -220,8 +328,12 @@ class InvoiceService(object):
         url = self.client.instance_url("/invoice/" + invoice_id)
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.delete(url=url, headers=headers, timeout=15)
+            headers = self.client._headers("application/json")
+            response = self.client.session.delete(
+                url=url,
+                headers=headers,
+                timeout=self.client.timeout("invoice.delete"),
+            )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("delete invoice", response)
             self.logger.debug("delete invoice : %s")
@@ -247,18 +359,18 @@ class InvoiceService(object):
         url = self.client.instance_url("/invoice/bulk")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
+            headers = self.client._headers("application/json")
             data = request.to_request()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 headers=headers,
-                json=data,
-                timeout=30
+                data=self.client.encode(data),
+                timeout=self.client.timeout("invoice.bulk_create"),
             )
             if response.status_code != 200:
                 raise self.client.raise_error("bulk create invoices", response)
             self.logger.debug("bulk create invoices response: %s", response.text)
-            return BulkInvoiceResponse(**response.json())
+            return BulkInvoiceResponse(**self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("bulk create invoices", e)
 
@@ -280,24 +392,141 @@ class InvoiceService(object):
         url = self.client.instance_url(f"/invoice/bulk?batchId={batch_id}")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.get(
+            headers = self.client._headers("application/json")
+            response = self.client.session.get(
                 url=url,
                 headers=headers,
-                timeout=15
+                timeout=self.client.timeout("invoice.bulk_details"),
             )
             if response.status_code == 409:
                 self.logger.debug("bulk batch still processing: %s", batch_id)
                 return None
             elif response.status_code == 200:
                 self.logger.debug("bulk batch details response: %s", response.text)
-                return BulkBatchDetailsResponse(response.json())
+                return BulkBatchDetailsResponse(self.client.decode(response))
             else:
                 raise self.client.raise_error("bulk batch details", response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("bulk batch details", e)
 
-    def feed(self, invoice_feed: InvoiceFeed, start_position=False, *includes):
+    def bulk_wait(
+        self, batch_id: str, interval=1.0, max_interval=30.0, timeout=None
+    ) -> BulkBatchDetailsResponse:
+        """
+        See https://www.twikey.com/api/#bulk-batch-details
+
+        Wait until a bulk invoice upload is processed, polling bulk_details with an exponential backoff.
+
+        Args:
+            batch_id (str): The batch ID.
+            interval (float): Seconds to wait after the first poll, doubled after each next one.
+            max_interval (float): Maximum seconds between two polls.
+            timeout (float): Seconds after which to give up, None to wait as long as it takes.
+
+        Returns:
+            BulkBatchDetailsResponse: Contains a list of statuses per invoice.
+
+        Raises:
+            TwikeyError: If the request fails or returns an unexpected status.
+            TimeoutError: If the batch was not processed within the timeout.
+        """
+        return poll(
+            lambda: self.bulk_details(batch_id), interval, max_interval, timeout=timeout
+        )
+
+    def bulk_upload(
+        self,
+        invoices,
+        chunk_size=1000,
+        concurrency=4,
+        ordered=False,
+        interval=1.0,
+        max_interval=30.0,
+        timeout=None,
+    ):
+        """
+        See https://www.twikey.com/api/#bulk-create-invoices
+
+        Upload any number of invoices in bulk: the requests are split in batches of chunk_size, which
+        are uploaded with bulk_create and awaited with bulk_wait on a pool of concurrency threads.
+
+        The requests are read from the iterable as the batches are uploaded, so a generator can be
+        passed without holding all invoices in memory. The results of a batch are yielded once it is
+        processed, matched with the requests by invoice id (or by position for requests without id).
+
+        Args:
+            invoices: Iterable of InvoiceRequest.
+            chunk_size (int): Number of invoices per batch.
+            concurrency (int): Number of batches uploaded or awaited at the same time.
+            ordered (bool): Yield the batches in the order of the requests, otherwise as they complete.
+            interval, max_interval, timeout: Polling of each batch, see bulk_wait.
+
+        Yields:
+            BulkResult: Per request, holding its BulkBatchDetailsItem. The error is a TwikeyError carrying the
+            status when the api rejected the invoice or did not report on it, or the error of its batch when the
+            upload or polling failed.
+        """
+
+        def upload(chunk):
+            batch = self.bulk_create(BulkInvoiceRequest(chunk))
+            self.logger.debug(
+                "Uploaded %d invoices in batch %s", len(chunk), batch.batch_id
+            )
+            return self.bulk_wait(batch.batch_id, interval, max_interval, timeout)
+
+        with closing(
+            run_many(upload, chunked(invoices, chunk_size), concurrency, ordered)
+        ) as batches:
+            for batch in batches:
+                yield from batch_results(batch, chunk_size)
+
+    def _pages(self, start_position=False, *includes, prefetch=0, stream=False):
+        _includes = ""
+        for include in includes:
+            _includes += "&include=" + include
+
+        url = self.client.instance_url("/invoice?include=customer" + _includes)
+        return feed_pages(
+            self.client,
+            "invoice.feed",
+            "Invoice feed",
+            url,
+            "Invoices",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    def iter_feed(self, start_position=False, *includes, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#invoice-feed
+
+        Lazily iterate the invoice feed. A page is only fetched once the items of the previous one
+        have been consumed, so breaking out of the loop stops reading the feed.
+
+        Args:
+            start_position: Optional position (X-LAST) to resume after.
+            includes: Additional data to include, eg. 'meta' or 'lastpayment'.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
+            stream (bool): Decode the items while a page is being read instead of loading the whole
+                page first, so large pages use little memory. Can't be combined with prefetch.
+
+        Yields:
+            FeedItem: The X-LAST position of the page the item belongs to and the Invoice.
+
+        Raises:
+            TwikeyError: If the API returns an error or the request fails.
+        """
+
+        for position, invoices in self._pages(
+            start_position, *includes, prefetch=prefetch, stream=stream
+        ):
+            for invoice in invoices:
+                yield FeedItem(position, Invoice(**invoice))
+
+    def feed(
+        self, invoice_feed: InvoiceFeed, start_position=False, *includes, prefetch=0
+    ):
         """
         See https://www.twikey.com/api/#invoice-feed
 
@@ -311,60 +540,30 @@ class InvoiceService(object):
         Args:
             invoice_feed (InvoiceFeed): Custom handler class with methods for processing
                 new, updated, or cancelled invoice events.
+            start_position: Optional position (X-LAST) to resume after.
+            includes: Additional data to include, eg. 'meta' or 'lastpayment'.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
 
         Returns:
-            None
+            FeedStats: The number of pages and items handled and the last position read.
 
         Raises:
             Exception: If the request to the feed endpoint fails or response is invalid.
         """
 
-        _includes = ""
-        for include in includes:
-            _includes += "&include=" + include
-
-        url = self.client.instance_url("/invoice?include=customer" + _includes)
-        try:
-            self.client.refresh_token_if_required()
-            initheaders = self.client.headers()
-            if start_position:
-                initheaders["X-RESUME-AFTER"] = str(start_position)
-            response = requests.get(
-                url=url,
-                headers=initheaders,
-                timeout=15,
+        stats = FeedStats("invoice")
+        for position, invoices in counted(
+            self._pages(start_position, *includes, prefetch=prefetch), stats
+        ):
+            self.logger.debug(
+                "Feed handling : %d invoices from %s till %s"
+                % (len(invoices), start_position, position)
             )
-            if "ApiErrorCode" in response.headers:
-                raise self.client.raise_error("Feed invoice", response)
-            feed_response = response.json()
-            while len(feed_response["Invoices"]) > 0:
-                number_of_invoices = len(feed_response["Invoices"])
-                last_invoice = response.headers["X-LAST"]
-                self.logger.debug(
-                    "Feed handling : %d invoices from %s till %s"
-                    % (number_of_invoices, start_position, last_invoice)
-                )
-                invoice_feed.start(
-                    response.headers["X-LAST"], len(feed_response["Invoices"])
-                )
-                error = False
-                for invoice in feed_response["Invoices"]:
-                    self.logger.debug("Feed handling : %s" % invoice)
-                    error = invoice_feed.invoice(Invoice(**invoice))
-                    if error:
-                        break
-                if error:
-                    self.logger.debug("Error while handing invoice, stopping")
-                    break
-                response = requests.get(
-                    url=url,
-                    headers=self.client.headers(),
-                    timeout=15,
-                )
-                if "ApiErrorCode" in response.headers:
-                    raise self.client.raise_error("Feed invoice", response)
-                feed_response = response.json()
-            self.logger.debug("Done handing invoice feed")
-        except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("Invoice feed", e)
-
+            invoice_feed.start(position, len(invoices))
+            if invoice_feed.page(
+                position, [Invoice(**invoice) for invoice in invoices]
+            ):
+                self.logger.debug("Error while handing invoice, stopping")
+                break
+        self.logger.debug("Done handing invoice feed")
+        return stats
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """
+    Record of the requests of a bulk run that succeeded, so a run restarted after a crash skips
+    them instead of sending them again (eg. inviting the same customer twice).
+
+    Requests are identified by a key, by default their position in the input. The result of each
+    request is recorded as a dict right after the api accepted it.
+    """
+
+    def load(self) -> dict:
+        """
+        :return: the recorded results by key
+        """
+        return {}
+
+    def record(self, key, result: dict):
+        """
+        :param key: key of the request that succeeded
+        :param result: its result, as a json serializable dict
+        """
+        pass
+
+
+class MemoryJournal(Journal):
+    """
+    Keeps the journal in memory, eg. for tests or to retry the failures of a run within one process.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            return dict(self._results)
+
+    def record(self, key, result):
+        with self._lock:
+            self._results[str(key)] = result
+
+
+class FileJournal(Journal):
+    """
+    Appends the journal to a file, one json line per request. A last line that was only partly
+    written when the process died is ignored.
+
+    Args:
+        path (str): Path of the journal file, created when missing.
+        fsync (bool): Flush every record to disk before the next request is reported done.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    def load(self):
+        results = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning(
+                            "Skipping incomplete line in journal %s", self.path
+                        )
+                        continue
+                    results[entry["key"]] = entry["result"]
+        except FileNotFoundError:
+            pass
+        return results
+
+    def record(self, key, result):
+        line = (
+            json.dumps({"key": str(key), "result": result}, separators=(",", ":"))
+            + "\n"
+        )
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if (
+                        f.read(1) != b"\n"
+                    ):  # a partial line left by a crash, don't append to it
+                        line = "\n" + line
+                f.write(line.encode("utf-8"))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
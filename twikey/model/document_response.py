@@ -1,12 +1,28 @@
 from array import ArrayType
 from datetime import datetime
 
+
 class Document:
     __slots__ = [
-        "mandate_number", "state", "type", "sequence_type", "sign_date",
-        "debtor_name", "debtor_street", "debtor_city", "debtor_zip", "debtor_country", "btw_nummer",
-        "country_of_residence", "debtor_email", "customer_number", "iban", "bic", "debtor_bank",
-        "contract_number", "supplementary_data"
+        "mandate_number",
+        "state",
+        "type",
+        "sequence_type",
+        "sign_date",
+        "debtor_name",
+        "debtor_street",
+        "debtor_city",
+        "debtor_zip",
+        "debtor_country",
+        "btw_nummer",
+        "country_of_residence",
+        "debtor_email",
+        "customer_number",
+        "iban",
+        "bic",
+        "debtor_bank",
+        "contract_number",
+        "supplementary_data",
     ]
 
     def __init__(self, **kwargs):
@@ -45,13 +61,14 @@ class Document:
 
         # Convert SplmtryData into a dict for easier use
         self.supplementary_data = {
-            item["Key"]: item["Value"]
-            for item in mndt.get("SplmtryData", [])
+            item["Key"]: item["Value"] for item in mndt.get("SplmtryData", [])
         }
 
     def __str__(self):
         base_info = "\n".join(
-            f"{slot:<22}: {getattr(self, slot, None)}" for slot in self.__slots__ if slot != "supplementary_data"
+            f"{slot:<22}: {getattr(self, slot, None)}"
+            for slot in self.__slots__
+            if slot != "supplementary_data"
         )
 
         supp_info = "Supplimentary Data\n\n"
@@ -83,8 +100,14 @@ class DocumentFeed:
         """
         pass
 
-    def updated_document(self, original_doc_number: str, doc: Document, reason: str, author: str,
-                         evt_time: datetime) -> bool:
+    def updated_document(
+        self,
+        original_doc_number: str,
+        doc: Document,
+        reason: str,
+        author: str,
+        evt_time: datetime,
+    ) -> bool:
         """
         Handle an update of a document
         :param original_doc_number: original reference to the document
@@ -95,7 +118,9 @@ class DocumentFeed:
         """
         pass
 
-    def cancelled_document(self, doc_number: str, reason: str, author: str, evt_time: datetime) -> bool:
+    def cancelled_document(
+        self, doc_number: str, reason: str, author: str, evt_time: datetime
+    ) -> bool:
         """
         Handle an cancelled document
         :param doc_number: reference to the document
@@ -105,6 +130,91 @@ class DocumentFeed:
         """
         pass
 
+    def page(self, position: str, events: list) -> bool:
+        """
+        Handle a whole page of the feed at once (eg. for a bulk upsert), by default dispatches every event
+        to new_document, updated_document or cancelled_document
+        :param position: position (X-LAST) of the page
+        :param events: list of DocumentEvent
+        :return: True to stop processing
+        """
+        for event in events:
+            error = event.dispatch(self)
+            if error:
+                return error
+        return False
+
+
+class DocumentEvent:
+    """
+    A single message of the mandate feed, either a new, an updated or a cancelled document.
+
+    Attributes:
+        kind (str): One of DocumentEvent.NEW, DocumentEvent.UPDATED or DocumentEvent.CANCELLED.
+        mandate_number (str): Mandate number the event is about (original number for updates).
+        document (Document): The actual document (not available for cancellations).
+        reason (str): Reason of the change or cancellation.
+        author (str): Email of the author of the change or cancellation.
+        evt_time (datetime): Time of the event.
+    """
+
+    NEW = "new"
+    UPDATED = "updated"
+    CANCELLED = "cancelled"
+
+    __slots__ = ["kind", "mandate_number", "document", "reason", "author", "evt_time"]
+
+    def __init__(self, msg: dict):
+        at_ = msg["EvtTime"]
+        if at_.endswith("Z"):
+            at_ = at_.replace("Z", "+00:00")
+        self.evt_time = datetime.fromisoformat(at_)
+        self.reason = None
+        self.author = None
+        if "AmdmntRsn" in msg:
+            amdmnt_rsn_ = msg["AmdmntRsn"]
+            self.kind = DocumentEvent.UPDATED
+            self.mandate_number = msg["OrgnlMndtId"]
+            self.document = Document(mandate=msg["Mndt"])
+            self.reason = amdmnt_rsn_.get("Rsn")
+            self.author = amdmnt_rsn_["Orgtr"]["CtctDtls"]["EmailAdr"]
+        elif "CxlRsn" in msg:
+            cxl_rsn_ = msg["CxlRsn"]
+            self.kind = DocumentEvent.CANCELLED
+            self.mandate_number = msg["OrgnlMndtId"]
+            self.document = None
+            self.reason = cxl_rsn_.get("Rsn")
+            self.author = cxl_rsn_["Orgtr"]["CtctDtls"]["EmailAdr"]
+        else:
+            self.kind = DocumentEvent.NEW
+            self.document = Document(mandate=msg["Mndt"])
+            self.mandate_number = self.document.mandate_number
+
+    def dispatch(self, document_feed: DocumentFeed):
+        """
+        Hand this event to the matching method of the document feed handler
+        :param document_feed: handler receiving the event
+        :return: the return value of the handler (True to stop processing)
+        """
+        if self.kind == DocumentEvent.UPDATED:
+            return document_feed.updated_document(
+                self.mandate_number,
+                self.document,
+                self.reason,
+                self.author,
+                self.evt_time,
+            )
+        if self.kind == DocumentEvent.CANCELLED:
+            return document_feed.cancelled_document(
+                self.mandate_number, self.reason, self.author, self.evt_time
+            )
+        return document_feed.new_document(self.document, self.evt_time)
+
+    def __str__(self):
+        return (
+            f"DocumentEvent {self.kind} mndtId={self.mandate_number} at {self.evt_time}"
+        )
+
 
 class InviteResponse:
     __slots__ = ["url", "key", "mandate_number"]
@@ -132,9 +242,7 @@ class SignResponse:
 
 
 class QueryMandateResponse:
-    __slots__ = [
-        "mandates"
-    ]
+    __slots__ = ["mandates"]
 
     def __init__(self, contracts: ArrayType):
         self.mandates = []
@@ -150,11 +258,18 @@ class QueryMandateResponse:
             self.mandates.append(doc)
 
     def __str__(self):
-        return "\n".join(f"{slot:<18}: {getattr(self, slot, None)}" for slot in self.__slots__)
+        return "\n".join(
+            f"{slot:<18}: {getattr(self, slot, None)}" for slot in self.__slots__
+        )
 
 
 class PdfResponse:
-    def __init__(self, content: bytes, filename: str = None, content_type: str = "application/pdf"):
+    def __init__(
+        self,
+        content: bytes,
+        filename: str = None,
+        content_type: str = "application/pdf",
+    ):
         self.content = content
         self.content_type = content_type
         self.filename = filename or "mandate.pdf"
@@ -166,7 +281,9 @@ class PdfResponse:
         return path
 
     def __str__(self):
-        return f"PdfResponse(filename='{self.filename}', size={len(self.content)} bytes)"
+        return (
+            f"PdfResponse(filename='{self.filename}', size={len(self.content)} bytes)"
+        )
 
 
 class CustomerAccessResponse:
@@ -22,8 +22,19 @@ class PaymentEvent:
     """
 
     __slots__ = (
-        "action", "double", "id", "e2e", "pmtinf", "method", "mndtid",
-        "iban", "rc", "date", "bic", "msg", "link"
+        "action",
+        "double",
+        "id",
+        "e2e",
+        "pmtinf",
+        "method",
+        "mndtid",
+        "iban",
+        "rc",
+        "date",
+        "bic",
+        "msg",
+        "link",
     )
 
     def paid_by_link(self):
@@ -44,22 +55,24 @@ class PaymentEvent:
     def __init__(self, **kwargs):
         self.action: str = kwargs.get("action")
         # double payment
-        self.double:bool = kwargs.get("double")
-        self.method:str = kwargs.get("method") # "sdd", "rcc", "paylink", "transfer", "manual"
+        self.double: bool = kwargs.get("double")
+        self.method: str = kwargs.get(
+            "method"
+        )  # "sdd", "rcc", "paylink", "transfer", "manual"
         self.date = kwargs.get("date")
 
         # Sdd
-        self.e2e:str = kwargs.get("e2e")
-        self.id:int = kwargs.get("id")
-        self.pmtinf:str = kwargs.get("pmtinf")
-        self.mndtid:str = kwargs.get("mndtid")
-        self.rc:str = kwargs.get("rc")
+        self.e2e: str = kwargs.get("e2e")
+        self.id: int = kwargs.get("id")
+        self.pmtinf: str = kwargs.get("pmtinf")
+        self.mndtid: str = kwargs.get("mndtid")
+        self.rc: str = kwargs.get("rc")
         # Paymentlink
-        self.link:int = kwargs.get("link")
+        self.link: int = kwargs.get("link")
         # Transfer
-        self.iban:str = kwargs.get("iban")
-        self.bic:str = kwargs.get("bic")
-        self.msg:str = kwargs.get("msg")
+        self.iban: str = kwargs.get("iban")
+        self.bic: str = kwargs.get("bic")
+        self.msg: str = kwargs.get("msg")
 
 
 class Invoice:
@@ -85,9 +98,21 @@ class Invoice:
     """
 
     __slots__ = [
-        "id", "number", "title", "remittance", "ref", "state", "amount",
-        "date", "duedate", "ct", "url", "lines",
-        "payment_events", "meta", "customer"
+        "id",
+        "number",
+        "title",
+        "remittance",
+        "ref",
+        "state",
+        "amount",
+        "date",
+        "duedate",
+        "ct",
+        "url",
+        "lines",
+        "payment_events",
+        "meta",
+        "customer",
     ]
 
     def __init__(self, **kwargs):
@@ -105,14 +130,17 @@ class Invoice:
 
         # Optional includes
         self.lines = [InvoiceLineItem(**line) for line in kwargs.get("lines", [])]
-        self.payment_events = [PaymentEvent(**events) for events in kwargs.get("lastpayment", [])]
+        self.payment_events = [
+            PaymentEvent(**events) for events in kwargs.get("lastpayment", [])
+        ]
         self.meta = kwargs.get("meta", {})
         self.customer = kwargs.get("customer", {})
 
     def __str__(self):
         base_info = "\n".join(
             f"{slot:<15}: {getattr(self, slot, None)}"
-            for slot in self.__slots__ if slot not in {"lines", "last_payment", "meta", "customer"}
+            for slot in self.__slots__
+            if slot not in {"lines", "last_payment", "meta", "customer"}
         )
 
         line_info = "\n\nLine Items:\n"
@@ -125,7 +153,9 @@ class Invoice:
         payment_info = "\nLast Payments:\n"
         if self.payment_events:
             for p in self.payment_events:
-                payment_info += " - " + ", ".join(f"{k}: {v}" for k, v in p.action) + "\n"
+                payment_info += (
+                    " - " + ", ".join(f"{k}: {v}" for k, v in p.action) + "\n"
+                )
         else:
             payment_info += " - (none)\n"
 
@@ -137,10 +167,13 @@ class Invoice:
         customer_info = ""
         if self.customer:
             customer_info += "\nCustomer:\n"
-            customer_info += "\n".join(f"{k:<15}: {v}" for k, v in self.customer.items()) + "\n"
+            customer_info += (
+                "\n".join(f"{k:<15}: {v}" for k, v in self.customer.items()) + "\n"
+            )
 
         return base_info + line_info + payment_info + meta_info + customer_info
 
+
 class InvoiceFeed:
     def start(self, position: str, lenght: int):
         """
@@ -158,6 +191,20 @@ class InvoiceFeed:
         """
         pass
 
+    def page(self, position: str, invoices: list):
+        """
+        Handle a whole page of the feed at once (eg. for a bulk upsert), by default calls invoice() per item
+        :param position: position (X-LAST) of the page
+        :param invoices: the updated invoices
+        :return: error from the function or False to continue
+        """
+        for invoice in invoices:
+            error = self.invoice(invoice)
+            if error:
+                return error
+        return False
+
+
 class InvoiceLineItem:
     """
     InvoiceLineItem represents a single line item on the invoice.
@@ -172,7 +219,15 @@ class InvoiceLineItem:
         vatsum (float): VAT amount.
     """
 
-    __slots__ = ["code", "description", "quantity", "unitprice", "uom", "vatrate", "vatsum"]
+    __slots__ = [
+        "code",
+        "description",
+        "quantity",
+        "unitprice",
+        "uom",
+        "vatrate",
+        "vatsum",
+    ]
 
     def __init__(self, **kwargs):
         self.code = kwargs.get("code")
@@ -5,9 +5,7 @@ class CreatedPaylinkResponse:
     Attributes reflect the fields returned by the API.
     """
 
-    __slots__ = [
-        "id", "url", "amount", "msg"
-    ]
+    __slots__ = ["id", "url", "amount", "msg"]
 
     def __init__(self, raw: dict):
         for key in self.__slots__:
@@ -19,8 +17,17 @@ class CreatedPaylinkResponse:
 
 class CustomerInfo:
     __slots__ = [
-        "id", "email", "firstname", "lastname", "address",
-        "city", "zip", "country", "customerNumber", "l", "mobile"
+        "id",
+        "email",
+        "firstname",
+        "lastname",
+        "address",
+        "city",
+        "zip",
+        "country",
+        "customerNumber",
+        "l",
+        "mobile",
     ]
 
     def __init__(self, raw: dict):
@@ -49,7 +56,17 @@ class Paylink:
     Represents a single entry for paylink responses.
     """
 
-    __slots__ = ["id", "ct", "amount", "msg", "ref", "state", "customer", "meta", "time"]
+    __slots__ = [
+        "id",
+        "ct",
+        "amount",
+        "msg",
+        "ref",
+        "state",
+        "customer",
+        "meta",
+        "time",
+    ]
 
     def __init__(self, raw: dict):
         for key in ["id", "ct", "amount", "msg", "ref", "state"]:
@@ -61,8 +78,9 @@ class Paylink:
     def __str__(self):
         return f"Paylink ID: {self.id}, Ref: {self.ref}, Amount: {self.amount}, State: {self.state}"
 
+
 class PaylinkFeed:
-    def paylink(self, paylink:Paylink) -> bool:
+    def paylink(self, paylink: Paylink) -> bool:
         """
         Custom logic for handeling the paylinks gained from the api call
 
@@ -70,3 +88,17 @@ class PaylinkFeed:
         :return: in case of your business logic decides stop processing updates return True
         """
         pass
+
+    def page(self, position: str, paylinks: list) -> bool:
+        """
+        Handle a whole page of the feed at once (eg. for a bulk upsert), by default calls paylink() per item
+
+        :param position: position (X-LAST) of the page
+        :param paylinks: the paylinks of the page
+        :return: in case of your business logic decides stop processing updates return True
+        """
+        for paylink in paylinks:
+            error = self.paylink(paylink)
+            if error:
+                return error
+        return False
@@ -6,7 +6,16 @@ class Refund:
     """
 
     __slots__ = [
-        "id", "iban", "bic", "amount", "msg", "place", "ref", "date", "state", "bkdate"
+        "id",
+        "iban",
+        "bic",
+        "amount",
+        "msg",
+        "place",
+        "ref",
+        "date",
+        "state",
+        "bkdate",
     ]
 
     def __init__(self, raw: dict):
@@ -24,16 +33,16 @@ class RefundBatch:
     Attributes reflect the fields returned by the API.
     """
 
-    __slots__ = [
-        "id", "pmtinfid", "progress", "entries"
-    ]
+    __slots__ = ["id", "pmtinfid", "progress", "entries"]
 
     def __init__(self, raw: dict):
         for key in self.__slots__:
             setattr(self, key, raw.get(key))
 
     def __str__(self):
-        return f"Refund ID: {self.id}, pmtinfid: {self.pmtinfid}, entries: {self.entries}"
+        return (
+            f"Refund ID: {self.id}, pmtinfid: {self.pmtinfid}, entries: {self.entries}"
+        )
 
 
 class Beneficiary:
@@ -43,9 +52,7 @@ class Beneficiary:
     Attributes reflect the fields returned by the API.
     """
 
-    __slots__ = [
-        "name", "iban", "bic", "available", "address"
-    ]
+    __slots__ = ["name", "iban", "bic", "available", "address"]
 
     def __init__(self, raw: dict):
         for key in self.__slots__:
@@ -56,7 +63,6 @@ class Beneficiary:
                 if addressline is not None:
                     self.address = f"{addressline.get('country')} {addressline.get('zip')} {addressline.get('city')} {addressline.get('street')}"
 
-
     def __str__(self):
         return f"Name: {self.name}, Iban: {self.iban}, Available: {self.available}"
 
@@ -92,5 +98,19 @@ class RefundFeed:
             * date: Date when the transfer was requested
             * state: Paid
             * bkdate: Date when the transfer was done
+        :return: True to stop processing the feed
         """
         pass
+
+    def page(self, position: str, refunds: list):
+        """
+        Handle a whole page of the feed at once (eg. for a bulk upsert), by default calls refund() per item
+        :param position: position (X-LAST) of the page
+        :param refunds: the refunds of the page
+        :return: error from the function or False to continue
+        """
+        for refund in refunds:
+            error = self.refund(refund)
+            if error:
+                return error
+        return False
@@ -6,8 +6,25 @@ class Transaction:
     """
 
     __slots__ = [
-        "id", "amount", "contract", "contractId", "date", "mndtId", "msg", "place", "ref", "state",
-        "reqcolldt", "admincharge", "final", "bkerror", "bkmsg", "bkdate", "lastupdate", "collection", "link"
+        "id",
+        "amount",
+        "contract",
+        "contractId",
+        "date",
+        "mndtId",
+        "msg",
+        "place",
+        "ref",
+        "state",
+        "reqcolldt",
+        "admincharge",
+        "final",
+        "bkerror",
+        "bkmsg",
+        "bkdate",
+        "lastupdate",
+        "collection",
+        "link",
     ]
 
     def __init__(self, raw: dict):
@@ -18,14 +35,15 @@ class Transaction:
         """
         :return: whether this transaction was paid or not, note that this can change at any time
         """
-        return self.state == 'PAID'
+        return self.state == "PAID"
 
     def is_error(self):
-        return self.state == 'ERROR'
+        return self.state == "ERROR"
 
     def __str__(self):
         return f"Transaction ID: {self.id}, Amount: {self.amount}, State: {self.state}"
 
+
 class TransactionFeed:
     def transaction(self, transaction: Transaction):
         """
@@ -36,6 +54,20 @@ class TransactionFeed:
         """
         pass
 
+    def page(self, position: str, transactions: list):
+        """
+        Handle a whole page of the feed at once (eg. for a bulk upsert), by default calls transaction() per item.
+
+        :param position: position (X-LAST) of the page
+        :param transactions: The updated transactions
+        :return: error from the function or False to continue
+        """
+        for transaction in transactions:
+            error = self.transaction(transaction)
+            if error:
+                return error
+        return False
+
 
 class TransactionStatusResponse:
     """
@@ -58,13 +90,11 @@ class RefundResponse:
     Attributes reflect the fields returned by the API.
     """
 
-    __slots__ = [
-        "id", "iban", "bic", "amount", "message", "place", "ref", "date"
-    ]
+    __slots__ = ["id", "iban", "bic", "amount", "message", "place", "ref", "date"]
 
     def __init__(self, raw: dict):
         for key in self.__slots__:
             setattr(self, key, raw.get(key))
 
     def __str__(self):
-        return f"Refunded Transaction ID: {self.id}, Amount: {self.amount}, From: {self.iban}"
\ No newline at end of file
+        return f"Refunded Transaction ID: {self.id}, Amount: {self.amount}, From: {self.iban}"
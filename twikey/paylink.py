@@ -1,6 +1,11 @@
 import requests
 
-from .model.paylink_request import PaymentLinkRequest, PaymentLinkStatusRequest, PaymentLinkRefundRequest
+from .feed import FeedItem, FeedStats, counted, feed_pages
+from .model.paylink_request import (
+    PaymentLinkRequest,
+    PaymentLinkStatusRequest,
+    PaymentLinkRefundRequest,
+)
 from .model.paylink_response import CreatedPaylinkResponse, Paylink, PaylinkFeed
 
 
@@ -34,15 +39,15 @@ class PaylinkService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.create"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create paylink", response)
-            json_response = response.json()
+            json_response = self.client.decode(response)
             return CreatedPaylinkResponse(json_response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create paylink", e)
@@ -70,11 +75,16 @@ class PaylinkService(object):
         url = self.client.instance_url("/payment/link")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.get(url=url, params=params, headers=headers, timeout=15)
+            headers = self.client._headers("application/json")
+            response = self.client.session.get(
+                url=url,
+                params=params,
+                headers=headers,
+                timeout=self.client.timeout("paylink.status_details"),
+            )
             if response.status_code != 200:
                 raise self.client.raise_error("Transaction detail", response)
-            _links = response.json()["Links"]
+            _links = self.client.decode(response)["Links"]
             if len(_links) > 0:
                 return Paylink(_links[0])
             raise self.client.raise_error("Missing link")
@@ -104,11 +114,16 @@ class PaylinkService(object):
         url = self.client.instance_url("/payment/link/refund")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(url=url, data=data, headers=self.client.headers(), timeout=15)
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.refund"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update transaction", response)
-            return Paylink(response.json())
+            return Paylink(self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Update transaction", e)
 
@@ -135,14 +150,55 @@ class PaylinkService(object):
         url = self.client.instance_url(f"/payment/link?id={link_id}")
         try:
             self.client.refresh_token_if_required()
-            response = requests.delete(url=url, headers=self.client.headers(), timeout=15)
+            response = self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("paylink.remove"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update transaction", response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Update transaction", e)
 
-    def feed(self, paylink_feed: PaylinkFeed):
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/payment/link/feed")
+        return feed_pages(
+            self.client,
+            "paylink.feed",
+            "Feed paylink",
+            url,
+            "Links",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#paymentlink-feed
+
+        Lazily iterate the paylink feed. A page is only fetched once the items of the previous one
+        have been consumed, so breaking out of the loop stops reading the feed.
+
+        Args:
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
+            stream (bool): Decode the items while a page is being read instead of loading the whole
+                page first, so large pages use little memory. Can't be combined with prefetch.
+
+        Yields:
+            FeedItem: The X-LAST position of the page the item belongs to and the Paylink.
+
+        Raises:
+            TwikeyError: If the API returns an error or the request fails.
+        """
+
+        for position, links in self._pages(start_position, prefetch, stream):
+            for msg in links:
+                yield FeedItem(position, Paylink(msg))
+
+    def feed(self, paylink_feed: PaylinkFeed, start_position=False, prefetch=0):
         """
         See https://www.twikey.com/api/#paymentlink-feed
 
@@ -156,39 +212,18 @@ class PaylinkService(object):
         Args:
             paylink_feed (PaylinkFeed): Custom handler class with methods for processing
                 new, updated, or cancelled paylink events.
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
 
         Returns:
-            None
+            FeedStats: The number of pages and items handled and the last position read.
 
         Raises:
             Exception: If the request to the feed endpoint fails or response is invalid.
         """
 
-        url = self.client.instance_url("/payment/link/feed")
-        try:
-            self.client.refresh_token_if_required()
-            response = requests.get(
-                url=url,
-                headers=self.client.headers(),
-                timeout=15,
-            )
-            if "ApiErrorCode" in response.headers:
-                raise self.client.raise_error("Feed paylink", response)
-            feed_response = response.json()
-            while len(feed_response["Links"]) > 0:
-                error = False
-                for msg in feed_response["Links"]:
-                    error = paylink_feed.paylink(Paylink(msg))
-                if error:
-                    break
-                response = requests.get(
-                    url=url,
-                    headers=self.client.headers(),
-                    timeout=15,
-                )
-                if "ApiErrorCode" in response.headers:
-                    raise self.client.raise_error("Feed paylink", response)
-                feed_response = response.json()
-        except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("Feed paylink", e)
-
+        stats = FeedStats("paylink")
+        for position, links in counted(self._pages(start_position, prefetch), stats):
+            if paylink_feed.page(position, [Paylink(msg) for msg in links]):
+                break
+        return stats
@@ -0,0 +1,149 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .retry import retry_after, is_rate_limited
+
+
+class TokenBucket:
+    """
+    Token bucket allowing on average 'rate' calls per second with bursts of up to 'burst' calls.
+
+    Callers reserve a slot and are told how long to wait for it, so the same bucket can be used
+    from threads (sleeping) and from asyncio tasks (awaiting) at the same time.
+
+    The rate adapts to the api: it is halved whenever a call is rejected because of the rate limit
+    and grows back in small steps with every accepted call, up to the configured rate.
+
+    Args:
+        rate (float): Maximum number of calls per second.
+        burst (int): Number of calls that can be made at once after a quiet period (default rate).
+        min_rate (float): Lower bound for the adapted rate.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None):
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.min_rate = float(min_rate if min_rate is not None else self.max_rate / 16)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """
+        Take a slot from the bucket
+        :return: number of seconds to wait before using it
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Block the current thread until a slot is available
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Hand out no slots for the next number of seconds
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+    def rejected(self, seconds=None):
+        """
+        The api rejected a call because of its rate limit, slow down
+        :param seconds: delay requested by the api, if any
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+        if seconds:
+            self.pause(seconds)
+
+    def accepted(self):
+        """
+        The api accepted a call, speed up again towards the configured rate
+        """
+        if self.rate < self.max_rate:
+            with self._lock:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RateLimiter:
+    """
+    Client side rate limiting of the outgoing api calls, shared by all services of a client
+    (or by several clients when the same instance is passed to each of them).
+
+    Calls are grouped per endpoint class, being the first path segment after the base url
+    (eg. 'invoice', 'transaction', 'mandate', 'payment', 'transfer'). Classes with a budget of
+    their own get a dedicated bucket, all others share the default one.
+
+    Sample usage
+
+        limiter = RateLimiter(rate=20, budgets={"invoice": 10, "transaction": (5, 10)})
+        client = TwikeyClient(APIKEY, rate_limiter=limiter)
+
+    Args:
+        rate (float): Calls per second for endpoints without a budget of their own.
+        burst (int): Burst size for those endpoints (default rate).
+        budgets (dict): Endpoint class to either a rate or a (rate, burst) tuple.
+    """
+
+    DEFAULT = "default"
+
+    def __init__(self, rate=10, burst=None, budgets=None):
+        self.buckets = {self.DEFAULT: TokenBucket(rate, burst)}
+        for endpoint_class, budget in (budgets or {}).items():
+            if isinstance(budget, (tuple, list)):
+                self.buckets[endpoint_class] = TokenBucket(*budget)
+            else:
+                self.buckets[endpoint_class] = TokenBucket(budget)
+
+    @staticmethod
+    def endpoint_class(url) -> str:
+        """
+        :return: the endpoint class of an api url, eg. 'invoice' for https://api.twikey.com/creditor/invoice/123
+        """
+        parts = [part for part in urlsplit(url).path.split("/") if part]
+        if parts and parts[0] == "creditor":
+            parts = parts[1:]
+        return parts[0] if parts else "login"
+
+    def bucket(self, url) -> TokenBucket:
+        return self.buckets.get(self.endpoint_class(url)) or self.buckets[self.DEFAULT]
+
+    def reserve(self, url) -> float:
+        """
+        :return: seconds to wait before calling url
+        """
+        return self.bucket(url).reserve()
+
+    def acquire(self, url):
+        """
+        Block the current thread until url may be called
+        """
+        self.bucket(url).acquire()
+
+    def update(self, url, response):
+        """
+        Adapt the budget of url to the response the api sent
+        """
+        bucket = self.bucket(url)
+        if is_rate_limited(response):
+            bucket.rejected(retry_after(response))
+        else:
+            bucket.accepted()
@@ -1,14 +1,71 @@
+import logging
+import threading
+import time
+
 import requests
 
-from .model.refund_request import NewBeneficiaryRequest, DisableBeneficiaryRequest, NewRefundRequest, \
-    NewRefundBatchRequest
-from .model.refund_response import Refund, RefundBatch, GetbeneficiarieResponse, RefundFeed, Beneficiary
+from .bulk import BulkSummary, poll, run_many
+from .feed import FeedItem, FeedStats, counted, feed_pages
+from .model.refund_request import (
+    NewBeneficiaryRequest,
+    DisableBeneficiaryRequest,
+    NewRefundRequest,
+    NewRefundBatchRequest,
+    RefundBatchStatusRequest,
+)
+from .model.refund_response import (
+    Refund,
+    RefundBatch,
+    GetbeneficiarieResponse,
+    RefundFeed,
+    Beneficiary,
+)
+
+# progress of a batch of credit transfers that is still being prepared
+BATCH_PENDING = ("PROCESSING", "PENDING", "IN_PROGRESS")
+
+
+def batch_done(batch: RefundBatch) -> bool:
+    """
+    :return: whether a batch of refunds is no longer being processed
+    """
+    return str(batch.progress).upper() not in BATCH_PENDING
+
+
+class _Beneficiaries:
+    """
+    Registers the beneficiary accounts missing for a run of refunds, once per iban even when
+    refunds to the same iban are created concurrently.
+    """
+
+    def __init__(self, register, known):
+        self.register = register
+        self.known = set(known)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, request: NewRefundRequest, beneficiary):
+        """
+        :param request: refund about to be created
+        :param beneficiary: function returning the NewBeneficiaryRequest of the refund, only called when its
+            iban is not registered yet
+        """
+        iban = request.iban
+        if iban in self.known:
+            return
+        with self._lock:
+            lock = self._locks.setdefault(iban, threading.Lock())
+        with lock:
+            if iban not in self.known:
+                self.register(beneficiary(request))
+                self.known.add(iban)
 
 
 class RefundService(object):
     def __init__(self, client) -> None:
         super().__init__()
         self.client = client
+        self.logger = logging.getLogger(__name__)
 
     def create_beneficiary_account(self, request: NewBeneficiaryRequest) -> Beneficiary:
         """
@@ -35,15 +92,15 @@ class RefundService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create_beneficiary_account"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create beneficiary", response)
-            return Beneficiary(response.json())
+            return Beneficiary(self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create beneficiary", e)
 
@@ -72,21 +129,109 @@ class RefundService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create refund", response)
-            _links = response.json()["Entries"]
+            _links = self.client.decode(response)["Entries"]
             if _links and len(_links) > 0:
                 return Refund(_links[0])
             raise self.client.raise_error("Missing refund")
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create refund", e)
 
+    def create_many(self, refunds, concurrency=8, ordered=True, beneficiary=None):
+        """
+        See https://www.twikey.com/api/#createadd-a-new-credit-transfer
+
+        Create many refunds concurrently, each one via create().
+
+        The requests are read from the iterable while the refunds are being created, so a generator
+        can be passed without holding all of them in memory. A failing refund does not stop the others.
+
+        When a beneficiary function is given, the beneficiary accounts are listed once up front and
+        a refund to an iban that is not among them first registers its account with
+        create_beneficiary_account, only once per iban.
+
+        Args:
+            refunds: Iterable of NewRefundRequest.
+            concurrency (int): Number of refunds created at the same time.
+            ordered (bool): Yield the results in the order of the requests, otherwise as they complete.
+            beneficiary: Optional function returning the NewBeneficiaryRequest for the iban of a NewRefundRequest,
+                only called for the ibans that are not registered yet.
+
+        Yields:
+            BulkResult: Per request, holding either the created Refund or the error (usually a TwikeyError).
+        """
+        beneficiaries = None
+        if beneficiary is not None:
+            known = [
+                account.iban for account in self.get_beneficiary_accounts(False).results
+            ]
+            beneficiaries = _Beneficiaries(self.create_beneficiary_account, known)
+
+        def create(request):
+            if beneficiaries is not None:
+                beneficiaries.ensure(request, beneficiary)
+            return self.create(request)
+
+        return run_many(create, refunds, concurrency, ordered)
+
+    def create_all(
+        self,
+        refunds,
+        ct,
+        iban=None,
+        beneficiary=None,
+        concurrency=8,
+        interval=1.0,
+        max_interval=30.0,
+        timeout=None,
+    ) -> BulkSummary:
+        """
+        Create many refunds concurrently (see create_many) and, when all of them succeeded, close the
+        batch with create_batch and wait until it is processed with batch_wait.
+
+        Args:
+            refunds: Iterable of NewRefundRequest.
+            ct: Profile containing the originating account of the batch.
+            iban: Originating account, if different from the ct account.
+            beneficiary: Optional function returning the NewBeneficiaryRequest for the iban of a NewRefundRequest,
+                to register the beneficiary accounts that are missing.
+            concurrency (int): Number of refunds created at the same time.
+            interval, max_interval, timeout: Polling of the batch, see batch_wait.
+
+        Returns:
+            BulkSummary: Counts, the failed requests with their errors and the processed RefundBatch (if closed).
+
+        Raises:
+            TwikeyError: If closing or polling the batch fails.
+            TimeoutError: If the batch was not processed within the timeout.
+        """
+        started = time.monotonic()
+        summary = BulkSummary()
+        for result in self.create_many(
+            refunds, concurrency, ordered=False, beneficiary=beneficiary
+        ):
+            summary.add(result)
+        if summary.failures:
+            self.logger.warning(
+                "Not closing the batch of ct %s, %d of %d refunds failed",
+                ct,
+                len(summary.failures),
+                summary.total,
+            )
+        elif summary.total:
+            batch = self.create_batch(NewRefundBatchRequest(ct=ct, iban=iban))
+            summary.batch = self.batch_wait(batch, interval, max_interval, timeout)
+        summary.elapsed = time.monotonic() - started
+        self.logger.info("Created refunds: %s", summary)
+        return summary
+
     def details(self, refund_id: str) -> Refund:
         """
         See https://www.twikey.com/api/#details-of-a-credit-transfer
@@ -109,11 +254,16 @@ class RefundService(object):
         url = self.client.instance_url("/transfer/detail")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.get(url=url, params={"id": refund_id}, headers=headers, timeout=15)
+            headers = self.client._headers("application/json")
+            response = self.client.session.get(
+                url=url,
+                params={"id": refund_id},
+                headers=headers,
+                timeout=self.client.timeout("refund.details"),
+            )
             if response.status_code != 200:
                 raise self.client.raise_error("Transfer detail", response)
-            _links = response.json()["Entries"]
+            _links = self.client.decode(response)["Entries"]
             if _links and len(_links) > 0:
                 return Refund(_links[0])
             raise self.client.raise_error("Missing entry")
@@ -143,7 +293,11 @@ class RefundService(object):
         url = self.client.instance_url(f"/transfer?id={refund_id}")
         try:
             self.client.refresh_token_if_required()
-            response = requests.delete(url=url, headers=self.client.headers(), timeout=15)
+            response = self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.remove"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Remove Refund", response)
@@ -168,24 +322,29 @@ class RefundService(object):
             RefundBatch: A structured response object representing the server’s reply.
 
         Raises:
-            TwikeyAPIError: If the API returns an error or the request fails.
+            TwikeyAPIError: If the API returns an error, the request fails or there were no credit transfers to batch.
         """
 
         url = self.client.instance_url("/transfer/complete")
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.create_batch"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create batch refunds", response)
-            _links = response.json()["CreditTransfers"]
+            _links = self.client.decode(response)["CreditTransfers"]
             if _links and len(_links) > 0:
                 return RefundBatch(_links[0])
+            from .client import TwikeyError  # the client imports this module
+
+            raise TwikeyError(
+                "Create batch refunds", "Missing batch", "No credit transfers to batch"
+            )
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create batch refunds", e)
 
@@ -212,21 +371,54 @@ class RefundService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.get(
+            response = self.client.session.get(
                 url=url,
                 params=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.batch_detail"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Batch detail", response)
-            _links = response.json()["CreditTransfers"]
+            _links = self.client.decode(response)["CreditTransfers"]
             if _links and len(_links) > 0:
                 return RefundBatch(_links[0])
-            raise self.client.raise_error("Missing link")
+            from .client import TwikeyError  # the client imports this module
+
+            raise TwikeyError("Batch detail", "Missing batch", "No batch returned")
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Batch detail", e)
 
+    def batch_wait(
+        self, batch: RefundBatch, interval=1.0, max_interval=30.0, timeout=None
+    ) -> RefundBatch:
+        """
+        See https://www.twikey.com/api/#batch-details
+
+        Wait until a batch of refunds is processed, polling batch_detail with an exponential backoff
+        for as long as its progress is one of BATCH_PENDING.
+
+        Args:
+            batch (RefundBatch): The batch as returned by create_batch.
+            interval (float): Seconds to wait after the first poll, doubled after each next one.
+            max_interval (float): Maximum seconds between two polls.
+            timeout (float): Seconds after which to give up, None to wait as long as it takes.
+
+        Returns:
+            RefundBatch: The processed batch.
+
+        Raises:
+            TwikeyError: If the API call fails.
+            TimeoutError: If the batch was not processed within the timeout.
+        """
+        if batch_done(batch):
+            return batch
+
+        def check():
+            details = self.batch_detail(RefundBatchStatusRequest(id=batch.id))
+            return details if batch_done(details) else None
+
+        return poll(check, interval, max_interval, timeout=timeout)
+
     def get_beneficiary_accounts(self, with_address: bool) -> GetbeneficiarieResponse:
         """
         See https://www.twikey.com/api/#get-beneficiary-accounts
@@ -249,15 +441,17 @@ class RefundService(object):
         url = self.client.instance_url("/transfers/beneficiaries")
         try:
             self.client.refresh_token_if_required()
-            response = requests.get(
+            response = self.client.session.get(
                 url=url,
                 data={"withAddress": with_address},
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.get_beneficiary_accounts"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("get beneficiaries", response)
-            return GetbeneficiarieResponse(response.json()['beneficiaries'])
+            return GetbeneficiarieResponse(
+                self.client.decode(response)["beneficiaries"]
+            )
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("get beneficiaries", e)
 
@@ -281,20 +475,59 @@ class RefundService(object):
             TwikeyAPIError: If the request fails or the response contains an API error code.
         """
 
-        url = self.client.instance_url(f"/transfers/beneficiaries/{request.iban}?customerNumber={request.customer_number}")
+        url = self.client.instance_url(
+            f"/transfers/beneficiaries/{request.iban}?customerNumber={request.customer_number}"
+        )
         try:
             self.client.refresh_token_if_required()
-            response = requests.delete(
+            response = self.client.session.delete(
                 url=url,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("refund.disable_beneficiary_accounts"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("disable beneficiaries", response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("disable beneficiaries", e)
 
-    def feed(self, refund_feed: RefundFeed):
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/transfer")
+        return feed_pages(
+            self.client,
+            "refund.feed",
+            "Feed refunds",
+            url,
+            "Entries",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#get-credit-transfer-feed
+
+        Lazily iterate the refund feed. A page is only fetched once the items of the previous one
+        have been consumed, so breaking out of the loop stops reading the feed.
+
+        Args:
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
+            stream (bool): Decode the items while a page is being read instead of loading the whole
+                page first, so large pages use little memory. Can't be combined with prefetch.
+
+        Yields:
+            FeedItem: The X-LAST position of the page the item belongs to and the Refund.
+
+        Raises:
+            TwikeyError: If the API returns an error or the request fails.
+        """
+
+        for position, entries in self._pages(start_position, prefetch, stream):
+            for msg in entries:
+                yield FeedItem(position, Refund(msg))
+
+    def feed(self, refund_feed: RefundFeed, start_position=False, prefetch=0):
         """
         See https://www.twikey.com/api/#get-credit-transfer-feed
 
@@ -308,36 +541,19 @@ class RefundService(object):
         Args:
             refund_feed (RefundFeed): Custom handler class with methods for processing
                 new, updated, or cancelled refund events.
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
 
         Returns:
-            None
+            FeedStats: The number of pages and items handled and the last position read.
 
         Raises:
             Exception: If the request to the feed endpoint fails or response is invalid.
         """
 
-        url = self.client.instance_url("/transfer")
-        try:
-            self.client.refresh_token_if_required()
-            headers = self.client.headers()
-            response = requests.get(
-                url=url,
-                headers=headers,
-                timeout=15,
-            )
-            if "ApiErrorCode" in response.headers:
-                raise self.client.raise_error("Feed refunds", response)
-            feed_response = response.json()
-            while len(feed_response["Entries"]) > 0:
-                for msg in feed_response["Entries"]:
-                    refund_feed.refund(Refund(msg))
-                response = requests.get(
-                    url=url,
-                    headers=self.client.headers(),
-                    timeout=15,
-                )
-                if "ApiErrorCode" in response.headers:
-                    raise self.client.raise_error("Feed refunds", response)
-                feed_response = response.json()
-        except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("Feed refunds", e)
+        stats = FeedStats("refund")
+        for position, entries in counted(self._pages(start_position, prefetch), stats):
+            if refund_feed.page(position, [Refund(msg) for msg in entries]):
+                self.logger.debug("Error while handing refund, stopping")
+                break
+        return stats
@@ -0,0 +1,106 @@
+import random
+
+RATE_LIMIT_HEADER = "X-Rate-Limit-Retry-After-Seconds"
+RETRY_AFTER_HEADERS = (RATE_LIMIT_HEADER, "Retry-After")
+
+
+def retry_after(response):
+    """
+    :return: the delay in seconds the api asks to wait before sending the next call, or None
+    """
+    for header in RETRY_AFTER_HEADERS:
+        value = response.headers.get(header)
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+    return None
+
+
+def is_rate_limited(response) -> bool:
+    """
+    :return: whether the api rejected the call because of its rate limit, ie. without processing it. A plain
+        Retry-After (eg. on a 503 during maintenance) does not say the call was not processed.
+    """
+    return response.status_code == 429 or RATE_LIMIT_HEADER in response.headers
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed api call is retried.
+
+    Transient failures (connection errors, timeouts and the configured status codes) are retried
+    with exponential backoff and full jitter, only for idempotent methods by default. Calls rejected
+    because of the rate limit (a 429 or Twikey's 'X-Rate-Limit-Retry-After-Seconds') were not processed
+    by the api and are therefore retried for any method. Retries wait as long as the api asks through
+    'X-Rate-Limit-Retry-After-Seconds' or 'Retry-After'.
+
+    Args:
+        max_attempts (int): Total number of attempts, 1 disables retrying.
+        backoff_factor (float): Base delay in seconds, doubled on every attempt.
+        max_backoff (float): Upper bound of the computed delay.
+        max_retry_after (float): Give up when the api asks to wait longer than this.
+        jitter (bool): Randomise the delay between 0 and the computed backoff.
+        retry_statuses (tuple): Http status codes considered transient.
+        idempotent_methods (tuple): Methods that are safe to send again.
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff_factor=0.5,
+        max_backoff=30,
+        max_retry_after=60,
+        jitter=True,
+        retry_statuses=(429, 500, 502, 503, 504),
+        idempotent_methods=("GET", "HEAD", "OPTIONS", "PUT", "DELETE"),
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(m.upper() for m in idempotent_methods)
+
+    def is_idempotent(self, method, idempotent=None) -> bool:
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in self.idempotent_methods
+
+    def backoff(self, attempt) -> float:
+        """
+        :param attempt: number of the attempt that failed (starting at 1)
+        :return: delay in seconds before the next attempt
+        """
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def on_response(self, method, response, attempt, idempotent=None):
+        """
+        :return: seconds to wait before retrying the call that produced this response, or None to not retry
+        """
+        if attempt >= self.max_attempts:
+            return None
+        # a call rejected because of the rate limit was not processed so it is safe to resend
+        if is_rate_limited(response) or (
+            response.status_code in self.retry_statuses
+            and self.is_idempotent(method, idempotent)
+        ):
+            delay = retry_after(response)
+            if delay is None:
+                return self.backoff(attempt)
+            return delay if delay <= self.max_retry_after else None
+        return None
+
+    def on_exception(self, method, attempt, idempotent=None):
+        """
+        Called for transient transport errors (connection reset, timeout, ...)
+        :return: seconds to wait before retrying, or None to not retry
+        """
+        if attempt >= self.max_attempts or not self.is_idempotent(method, idempotent):
+            return None
+        return self.backoff(attempt)
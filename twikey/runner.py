@@ -0,0 +1,211 @@
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .feed import FeedStats
+
+
+class RunSummary:
+    """
+    Outcome of a FeedRunner run.
+
+    Attributes:
+        feeds (dict): FeedStats per feed name.
+        elapsed (float): Wall clock seconds of the whole run.
+    """
+
+    __slots__ = ["feeds", "elapsed"]
+
+    def __init__(self, feeds, elapsed):
+        self.feeds = feeds
+        self.elapsed = elapsed
+
+    @property
+    def pages(self) -> int:
+        return sum(stats.pages for stats in self.feeds.values())
+
+    @property
+    def items(self) -> int:
+        return sum(stats.items for stats in self.feeds.values())
+
+    @property
+    def errors(self) -> dict:
+        """
+        :return: the error per feed that failed
+        """
+        return {name: stats.error for name, stats in self.feeds.items() if stats.error}
+
+    def __str__(self):
+        lines = [
+            "%d items in %d pages from %d feeds in %.1fs"
+            % (self.items, self.pages, len(self.feeds), self.elapsed)
+        ]
+        lines.extend("  %s" % stats for stats in self.feeds.values())
+        return "\n".join(lines)
+
+
+class FeedRunner:
+    """
+    Drains several feeds of one client concurrently, so a full sync takes as long as the slowest
+    feed instead of the sum of all of them.
+
+    Every feed runs on its own worker thread and reads its pages through the pooled session of
+    the client, resuming from and saving to the client's checkpoint_store when it has one. A
+    failing feed does not stop the others, its error is reported in the summary.
+
+    Sample usage
+
+        runner = FeedRunner(client, document=MyDocumentFeed(), invoice=MyInvoiceFeed(),
+                            transaction=MyTransactionFeed())
+        summary = runner.run()
+        print(summary)
+
+    Args:
+        client (TwikeyClient): Client of which the feeds are read, its pool_maxsize should at least
+            equal the number of feeds.
+        document (DocumentFeed): Handler for the mandate feed, None to skip it.
+        invoice (InvoiceFeed): Handler for the invoice feed, None to skip it.
+        transaction (TransactionFeed): Handler for the transaction feed, None to skip it.
+        paylink (PaylinkFeed): Handler for the paylink feed, None to skip it.
+        refund (RefundFeed): Handler for the refund feed, None to skip it.
+        prefetch (int): Number of pages each feed reads ahead, see feed().
+    """
+
+    def __init__(
+        self,
+        client,
+        document=None,
+        invoice=None,
+        transaction=None,
+        paylink=None,
+        refund=None,
+        prefetch=0,
+    ):
+        self.client = client
+        self.handlers = {
+            name: handler
+            for name, handler in [
+                ("document", document),
+                ("invoice", invoice),
+                ("transaction", transaction),
+                ("paylink", paylink),
+                ("refund", refund),
+            ]
+            if handler is not None
+        }
+        self.prefetch = prefetch
+        self.logger = logging.getLogger(__name__)
+
+    def _drain(self, name, handler) -> FeedStats:
+        started = time.monotonic()
+        try:
+            stats = getattr(self.client, name).feed(handler, prefetch=self.prefetch)
+        except Exception as e:
+            self.logger.error("Feed %s failed: %s", name, e)
+            stats = FeedStats(name)
+            stats.error = e
+        stats.elapsed = time.monotonic() - started
+        return stats
+
+    def run(self) -> RunSummary:
+        """
+        Read all feeds until they are empty (or their handler asks to stop)
+        :return: RunSummary with the FeedStats of each feed
+        """
+        started = time.monotonic()
+        with ThreadPoolExecutor(
+            max_workers=max(1, len(self.handlers)), thread_name_prefix="twikey-feed"
+        ) as pool:
+            futures = {
+                name: pool.submit(self._drain, name, handler)
+                for name, handler in self.handlers.items()
+            }
+            feeds = {name: future.result() for name, future in futures.items()}
+        summary = RunSummary(feeds, time.monotonic() - started)
+        level = logging.INFO if summary.items or summary.errors else logging.DEBUG
+        self.logger.log(level, "Feeds done: %s", summary)
+        return summary
+
+
+class FeedDaemon(FeedRunner):
+    """
+    Keeps reading the feeds, for a near real-time view on the state in Twikey.
+
+    After each pass the daemon waits before polling again: the interval is reset to min_interval
+    whenever a pass handled items and doubles (up to max_interval) after every pass that found
+    nothing new or failed. A webhook handler can call wake() to poll right away, and stop() (also
+    called on SIGINT/SIGTERM when running in the main thread) ends the loop after the current pass.
+
+    Sample usage
+
+        daemon = FeedDaemon(client, document=MyDocumentFeed(), transaction=MyTransactionFeed())
+        threading.Thread(target=daemon.run_forever, daemon=True).start()
+
+        @app.route('/webhook')
+        def webhook():
+            ...
+            daemon.wake()
+
+    Args:
+        min_interval (float): Seconds to wait after a pass that handled items.
+        max_interval (float): Longest wait between two passes.
+        backoff (float): Factor by which the wait grows after a pass without items.
+        (other arguments as for the FeedRunner)
+    """
+
+    def __init__(self, client, min_interval=1, max_interval=60, backoff=2, **kwargs):
+        super().__init__(client, **kwargs)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def next_interval(self, summary: RunSummary) -> float:
+        """
+        :return: the seconds to wait after a pass with the given result
+        """
+        if summary.items and not summary.errors:
+            return self.min_interval
+        return min(
+            self.max_interval, max(self.interval, self.min_interval) * self.backoff
+        )
+
+    def wake(self):
+        """
+        Poll the feeds now instead of at the end of the current interval, eg. when a webhook arrives.
+        """
+        self._wakeup.set()
+
+    def stop(self, *args):
+        """
+        End run_forever after the current pass.
+        """
+        self._stopped = True
+        self._wakeup.set()
+
+    def run_forever(self, handle_signals=True):
+        """
+        Read the feeds until stop() is called.
+
+        :param handle_signals: call stop() on SIGINT and SIGTERM (only possible in the main thread)
+        """
+        self._stopped = False
+        previous = {}
+        if handle_signals and threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                previous[signum] = signal.signal(signum, self.stop)
+        try:
+            while not self._stopped:
+                self._wakeup.clear()
+                self.interval = self.next_interval(self.run())
+                self._wakeup.wait(
+                    self.interval
+                )  # a wake() during the pass polls again right away
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.logger.info("Feed daemon stopped")
@@ -0,0 +1,175 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .retry import RetryPolicy
+from .timeouts import Timeout
+
+# Error codes returned by the api when the session token is no longer accepted
+TOKEN_ERROR_CODES = {
+    "err_no_login",
+    "err_invalid_sessiontoken",
+    "err_invalid_token",
+    "err_expired_token",
+}
+
+
+def is_token_error(response) -> bool:
+    """
+    :return: whether the api refused the request because the session token expired or is invalid
+    """
+    return (
+        response.status_code == 401
+        or response.headers.get("ApiErrorCode") in TOKEN_ERROR_CODES
+    )
+
+
+def _before(deadline, delay) -> bool:
+    """
+    :return: whether waiting delay seconds still leaves time before the deadline (if any)
+    """
+    return deadline is None or time.monotonic() + delay < deadline
+
+
+def _within(timeout, remaining):
+    """
+    :return: the timeout cut to the remaining time until the deadline, None meaning no timeout
+    """
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class TwikeySession(requests.Session):
+    """
+    Pooled HTTP transport shared by the TwikeyClient and all of its services.
+
+    Connections to the api are kept in a urllib3 pool per host so consecutive calls
+    reuse an already established TCP+TLS connection instead of doing a new handshake.
+
+    When the api reports the session token as expired or invalid, the relogin callback is
+    asked for a new token and the request is retried once with it.
+
+    Transient failures are retried according to the retry policy. Callers can pass
+    idempotent=True/False to a request to override the policy's per-method default.
+
+    The timeout of a request may be a Timeout, its connect and read values are passed to
+    urllib3 and its total is enforced as deadline over all attempts and the waits in between.
+
+    Args:
+        pool_connections (int): Number of host pools to cache.
+        pool_maxsize (int): Maximum number of connections kept per host.
+        keep_alive (bool): When False every request asks the server to close the connection.
+        relogin: Function receiving the rejected token and returning a fresh one (or None).
+        retry (RetryPolicy): Policy for retrying transient failures (default RetryPolicy()).
+        rate_limiter (RateLimiter): Optional limiter every attempt has to pass before being sent.
+    """
+
+    def __init__(
+        self,
+        pool_connections=10,
+        pool_maxsize=10,
+        keep_alive=True,
+        relogin=None,
+        retry=None,
+        rate_limiter=None,
+    ) -> None:
+        super().__init__()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        self.relogin = relogin
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.logger = logging.getLogger(__name__)
+
+    def request(self, method, url, *args, idempotent=None, **kwargs):
+        replayable = not hasattr(
+            kwargs.get("data"), "read"
+        )  # streamed bodies can't be replayed
+        timeout = kwargs.get("timeout")
+        deadline = None
+        if isinstance(timeout, Timeout):
+            kwargs["timeout"] = (timeout.connect, timeout.read)
+            if timeout.total is not None:
+                deadline = time.monotonic() + timeout.total
+        relogged = False
+        attempt = 1
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(
+                        "Deadline of %ss exceeded for %s %s"
+                        % (timeout.total, method, url)
+                    )
+                kwargs["timeout"] = (
+                    _within(timeout.connect, remaining),
+                    _within(timeout.read, remaining),
+                )
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ) as e:
+                delay = (
+                    self.retry.on_exception(method, attempt, idempotent)
+                    if replayable
+                    else None
+                )
+                if delay is None or not _before(deadline, delay):
+                    raise
+                self.logger.warning(
+                    "%s %s failed (%s), retrying in %.1fs", method, url, e, delay
+                )
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(url, response)
+
+            headers = kwargs.get("headers") or {}
+            stale_token = headers.get("Authorization")
+            if (
+                self.relogin is not None
+                and not relogged
+                and stale_token
+                and replayable
+                and is_token_error(response)
+            ):
+                relogged = True
+                token = self.relogin(stale_token)
+                if token:
+                    response.close()
+                    retry_headers = dict(headers)
+                    retry_headers["Authorization"] = token
+                    kwargs["headers"] = retry_headers
+                    continue
+                return response
+
+            delay = (
+                self.retry.on_response(method, response, attempt, idempotent)
+                if replayable
+                else None
+            )
+            if delay is None or not _before(deadline, delay):
+                return response
+            self.logger.warning(
+                "%s %s returned %d, retrying in %.1fs",
+                method,
+                url,
+                response.status_code,
+                delay,
+            )
+            response.close()
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,169 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER = ".eE+-0123456789"
+
+
+class ItemDecoder:
+    """
+    Incremental parser for a json object holding a (large) list, returning the elements of that
+    list as soon as they are complete instead of once the whole document was read.
+
+    The body is pushed in chunks of bytes, the other members of the object are skipped. Only the
+    element being decoded is kept in memory, so the memory used does not depend on the page size.
+
+    Sample usage
+
+        decoder = ItemDecoder("Invoices")
+        for chunk in response.iter_content(65536):
+            for invoice in decoder.feed(chunk):
+                ...
+        decoder.feed(b"", final=True)
+
+    Args:
+        key (str): Name of the member holding the list, eg. 'Invoices'.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._member = None
+        self._wait = 0  # don't retry decoding an incomplete value before the buffer has this size
+
+    def feed(self, data, final=False) -> list:
+        """
+        :param data: next chunk of the body
+        :param final: whether this is the last chunk
+        :return: the elements of the list completed by this chunk
+        :raises ValueError: when the body is not valid json or ends prematurely
+        """
+        self._buffer = self._buffer[self._pos :] + self._text.decode(data, final)
+        self._pos = 0
+        items = []
+        while self._step(items, final):
+            pass
+        if final and self._state != "done":
+            raise ValueError("Incomplete json document, missing '%s'" % self.key)
+        return items
+
+    def _char(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _expect(self, char):
+        found = self._char()
+        if found is None:
+            return False
+        if found != char:
+            raise ValueError(
+                "Expected '%s' at %d but found '%s'" % (char, self._pos, found)
+            )
+        self._pos += 1
+        return True
+
+    def _value(self, final):
+        """
+        :return: a tuple holding the next value, or None while it is incomplete
+        """
+        if not final and len(self._buffer) - self._pos < self._wait:
+            return None
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            self._wait = 2 * (
+                len(self._buffer) - self._pos
+            )  # keeps retries linear for large values
+            return None
+        if (
+            not final
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+        ):
+            if end == len(self._buffer) or self._buffer[end] in _NUMBER:
+                return None  # the number continues in the next chunk, eg. '-1500.' before '0'
+        self._pos = end
+        self._wait = 0
+        return (value,)
+
+    def _step(self, items, final):
+        state = self._state
+        if state == "start":
+            if not self._expect("{"):
+                return False
+            self._state = "member"
+        elif state == "member":
+            char = self._char()
+            if char is None:
+                return False
+            if char == "}":
+                self._pos += 1
+                self._state = "done"
+            elif char == ",":
+                self._pos += 1
+            else:
+                member = self._value(final)
+                if member is None:
+                    return False
+                self._member = member[0]
+                self._state = "colon"
+        elif state == "colon":
+            if not self._expect(":"):
+                return False
+            self._state = "value"
+        elif state == "value":
+            if self._member == self.key:
+                if not self._expect("["):
+                    return False
+                self._state = "items"
+            else:
+                if self._char() is None or self._value(final) is None:
+                    return False
+                self._state = "member"
+        elif state == "items":
+            char = self._char()
+            if char is None:
+                return False
+            if char == "]":
+                self._pos += 1
+                self._state = "member"
+            elif char == ",":
+                self._pos += 1
+            else:
+                item = self._value(final)
+                if item is None:
+                    return False
+                items.append(item[0])
+        else:  # done, only whitespace may follow
+            if self._char() is not None:
+                raise ValueError(
+                    "Unexpected data after the json document at %d" % self._pos
+                )
+            return False
+        return True
+
+
+def iter_items(chunks, key):
+    """
+    Decode the elements of the list named key from a json body read in chunks, see ItemDecoder.
+
+    Args:
+        chunks: Iterable of bytes, eg. response.iter_content(65536).
+        key (str): Name of the member holding the list.
+
+    Yields:
+        The decoded elements, as soon as they are complete.
+    """
+    decoder = ItemDecoder(key)
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.feed(b"", final=True)
@@ -0,0 +1,690 @@
+"""
+In-process fake of the Twikey api, to run the client offline against a local server, eg. for load tests
+or to see how a integration behaves when the api fails or limits the rate.
+
+    with StubTwikey(latency=0.005, rate_limit=50) as stub:
+        client = twikey.TwikeyClient("key", stub.base_url)
+        stub.fail("/invoice", status=503, times=2)
+        client.invoice.create(InvoiceRequest(...))
+
+Objects created through the api (mandates, invoices, transactions, paylinks and refunds) are kept in
+memory and show up in the matching feed, which pages with X-LAST and honours X-RESUME-AFTER. Items can
+also be put in a feed directly with add(). This is not a full implementation of the api, only its
+shape: no validation is done except for what the client relies on.
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# feed name -> (path of the feed, member holding the items)
+FEEDS = {
+    "document": ("/mandate", "Messages"),
+    "invoice": ("/invoice", "Invoices"),
+    "transaction": ("/transaction", "Entries"),
+    "paylink": ("/payment/link/feed", "Links"),
+    "refund": ("/transfer", "Entries"),
+}
+
+UNKNOWN_BENEFICIARY = "err_unknown_beneficiary"  # ApiErrorCode of a refund to an iban that was not registered
+
+
+class _Failure:
+    __slots__ = [
+        "path",
+        "method",
+        "status",
+        "times",
+        "error_code",
+        "retry_after",
+        "disconnect",
+    ]
+
+    def __init__(
+        self, path, method, status, times, error_code, retry_after, disconnect
+    ):
+        self.path = path
+        self.method = method
+        self.status = status
+        self.times = times
+        self.error_code = error_code
+        self.retry_after = retry_after
+        self.disconnect = disconnect
+
+    def matches(self, method, path):
+        return path.startswith(self.path) and (
+            self.method is None or self.method == method
+        )
+
+
+class StubTwikey:
+    """
+    Local fake Twikey api listening on 127.0.0.1, its base_url can be passed to the TwikeyClient
+    and AsyncTwikeyClient.
+
+    Args:
+        api_key (str): Api key accepted for the login, None accepts any key.
+        page_size (int): Maximum number of items per feed page.
+        latency (float): Seconds every response is delayed, or a (min, max) tuple for a uniform spread.
+        rate_limit (int): Calls per second accepted before answering 429, None for no limit.
+        bulk_delay (float): Seconds before a bulk invoice upload or refund batch is processed.
+        port (int): Port to listen on, 0 picks a free one.
+
+    Attributes:
+        calls (Counter): Number of calls per 'METHOD /path' (without the /creditor prefix).
+        logins (int): Number of logins done.
+    """
+
+    def __init__(
+        self,
+        api_key=None,
+        page_size=100,
+        latency=0.0,
+        rate_limit=None,
+        bulk_delay=0.0,
+        port=0,
+    ):
+        self.api_key = api_key
+        self.page_size = page_size
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.bulk_delay = bulk_delay
+        self.calls = Counter()
+        self.logins = 0
+        self.lock = threading.RLock()
+        self._tokens = set()
+        self._failures = []
+        self._window = (
+            deque()
+        )  # times of the calls in the last second, for the rate limit
+        self._feeds = {
+            name: [] for name in FEEDS
+        }  # encoded items, the position of an item is its index + 1
+        self._cursors = {name: 0 for name in FEEDS}
+        self._sequence = 0
+        self.mandates = {}
+        self.invoices = {}
+        self.transactions = {}
+        self.paylinks = {}
+        self.refunds = {}
+        self.beneficiaries = {}
+        self._bulk = {}  # batchId -> (ready at, results)
+        self._batches = {}  # id -> (ready at, credit transfer batch)
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d/creditor" % self._server.server_address[1]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever,
+                kwargs={"poll_interval": 0.05},
+                name="twikey-stub",
+                daemon=True,
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # test controls
+
+    def add(self, feed, items):
+        """
+        Append raw items (as returned by the api) to a feed.
+
+        :param feed: 'document', 'invoice', 'transaction', 'paylink' or 'refund'
+        :param items: list of dicts
+        """
+        encoded = [json.dumps(item).encode() for item in items]
+        with self.lock:
+            self._feeds[feed].extend(encoded)
+
+    def fail(
+        self,
+        path="",
+        status=500,
+        times=1,
+        method=None,
+        error_code=None,
+        retry_after=None,
+        disconnect=False,
+    ):
+        """
+        Answer the next calls to path (a prefix without /creditor, eg. '/invoice') with an error.
+
+        :param status: http status of the error, eg. 429 or 503
+        :param times: number of calls that fail
+        :param method: only fail calls with this http method
+        :param error_code: ApiErrorCode header and code of the error body
+        :param retry_after: value of the X-Rate-Limit-Retry-After-Seconds header
+        :param disconnect: close the connection without an answer instead
+        """
+        with self.lock:
+            self._failures.append(
+                _Failure(
+                    path, method, status, times, error_code, retry_after, disconnect
+                )
+            )
+
+    def expire_tokens(self):
+        """
+        Invalidate all session tokens, the next calls are refused until the client logs in again.
+        """
+        with self.lock:
+            self._tokens.clear()
+
+    def rewind(self, feed=None):
+        """
+        Serve a feed (or all feeds) again from the start.
+        """
+        with self.lock:
+            for name in [feed] if feed else list(self._cursors):
+                self._cursors[name] = 0
+
+    def position(self, feed) -> int:
+        """
+        :return: the position (X-LAST) up to which the feed was read
+        """
+        with self.lock:
+            return self._cursors[feed]
+
+    # request handling
+
+    def _next_id(self):
+        with self.lock:
+            self._sequence += 1
+            return self._sequence
+
+    def _failure(self, method, path):
+        with self.lock:
+            for failure in self._failures:
+                if failure.matches(method, path):
+                    failure.times -= 1
+                    if failure.times <= 0:
+                        self._failures.remove(failure)
+                    return failure
+        return None
+
+    def _rate_limited(self):
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self._window and self._window[0] <= now - 1:
+                self._window.popleft()
+            if len(self._window) >= self.rate_limit:
+                return True
+            self._window.append(now)
+        return False
+
+    def handle(self, method, target, headers, body):
+        """
+        :return: (status, headers, body) answered to a call, body None to drop the connection
+        """
+        parts = urlsplit(target)
+        path = parts.path
+        if path.startswith("/creditor"):
+            path = path[len("/creditor") :]
+        query = dict(parse_qsl(parts.query))
+        with self.lock:
+            self.calls["%s %s" % (method, path or "/")] += 1
+
+        failure = self._failure(method, path)
+        if failure is not None:
+            if failure.disconnect:
+                return 0, {}, None
+            extra = {}
+            if failure.retry_after is not None:
+                extra["X-Rate-Limit-Retry-After-Seconds"] = str(failure.retry_after)
+            return self._error(
+                failure.status,
+                failure.error_code or "err_stub",
+                "Injected failure",
+                extra,
+            )
+        if self._rate_limited():
+            return self._error(
+                429,
+                "err_too_many_requests",
+                "Too many requests",
+                {"X-Rate-Limit-Retry-After-Seconds": "1"},
+            )
+
+        if path in ("", "/"):
+            return self._login(method, self._form(headers, body))
+        token = headers.get("Authorization")
+        with self.lock:
+            logged_in = token in self._tokens
+        if not logged_in:
+            return self._error(401, "err_no_login", "Not logged in")
+
+        data = self._form(headers, body)
+        data.update(query)
+        for (route_method, prefix), name in _ROUTES:
+            if method == route_method and (
+                path == prefix or (prefix.endswith("/") and path.startswith(prefix))
+            ):
+                return getattr(self, name)(path, data, headers)
+        return self._error(
+            404, "err_not_found", "No such endpoint %s %s" % (method, path)
+        )
+
+    @staticmethod
+    def _form(headers, body):
+        if not body:
+            return {}
+        if "json" in (headers.get("Content-type") or ""):
+            return {"json": json.loads(body)}
+        return dict(parse_qsl(body.decode("utf-8")))
+
+    @staticmethod
+    def _json(value, status=200, extra=None):
+        return (
+            status,
+            dict(extra or {}, **{"Content-Type": "application/json"}),
+            json.dumps(value).encode(),
+        )
+
+    def _error(self, status, code, message, extra=None):
+        headers = dict(extra or {})
+        headers["ApiErrorCode"] = code
+        return self._json({"code": code, "message": message}, status, headers)
+
+    def _login(self, method, form):
+        if method == "GET":  # logout
+            return self._json({})
+        if self.api_key is not None and form.get("apiToken") != self.api_key:
+            return self._error(400, "err_invalid_apikey", "Invalid api key")
+        with self.lock:
+            self.logins += 1
+            token = "stub-token-%d-%s" % (self.logins, uuid.uuid4().hex[:8])
+            self._tokens.add(token)
+        return (
+            200,
+            {"Authorization": token, "X-MERCHANT-ID": "1", "Content-Length": "0"},
+            b"",
+        )
+
+    def _feed(self, name, headers):
+        key = FEEDS[name][1]
+        resume_after = headers.get("X-RESUME-AFTER")
+        with self.lock:
+            items = self._feeds[name]
+            start = self._cursors[name]
+            if resume_after is not None:
+                try:
+                    start = max(0, min(int(resume_after), len(items)))
+                except ValueError:
+                    return self._error(
+                        400, "err_invalid_position", "Invalid X-RESUME-AFTER"
+                    )
+            page = items[start : start + self.page_size]
+            position = start + len(page)
+            self._cursors[name] = position
+        body = b'{"' + key.encode() + b'":[' + b",".join(page) + b"]}"
+        return 200, {"Content-Type": "application/json", "X-LAST": str(position)}, body
+
+    # documents
+
+    def _invite(self, path, data, headers):
+        number = "STUB%06d" % self._next_id()
+        mandate = {
+            "MndtId": number,
+            "LclInstrm": "CORE",
+            "state": "PREPARED",
+            "ct": data.get("ct"),
+            "Dbtr": {
+                "Nm": " ".join(
+                    filter(None, [data.get("firstname"), data.get("lastname")])
+                ),
+                "CtctDtls": {"EmailAdr": data.get("email")},
+            },
+        }
+        with self.lock:
+            self.mandates[number] = mandate
+        return self._json(
+            {
+                "mndtId": number,
+                "url": "https://stub.twikey.test/p/%s" % number,
+                "key": number,
+            }
+        )
+
+    def _sign(self, path, data, headers):
+        number = "STUB%06d" % self._next_id()
+        mandate = {
+            "MndtId": number,
+            "LclInstrm": "CORE",
+            "DbtrAcct": data.get("iban"),
+            "Dbtr": {
+                "Nm": " ".join(
+                    filter(None, [data.get("firstname"), data.get("lastname")])
+                ),
+                "CtctDtls": {"EmailAdr": data.get("email")},
+            },
+        }
+        with self.lock:
+            self.mandates[number] = mandate
+        self.add("document", [{"Mndt": mandate, "EvtTime": _now()}])
+        return self._json({"MndtId": number})
+
+    def _mandate_feed(self, path, data, headers):
+        return self._feed("document", headers)
+
+    def _cancel_mandate(self, path, data, headers):
+        number = data.get("mndtId")
+        with self.lock:
+            known = self.mandates.pop(number, None) is not None
+        if not known:
+            return self._error(400, "err_no_contract", "No such mandate")
+        origin = {"CtctDtls": {"EmailAdr": "stub@twikey.test"}}
+        self.add(
+            "document",
+            [
+                {
+                    "OrgnlMndtId": number,
+                    "CxlRsn": {"Orgtr": origin, "Rsn": data.get("rsn")},
+                    "EvtTime": _now(),
+                }
+            ],
+        )
+        return 200, {"Content-Length": "0"}, b""
+
+    # invoices
+
+    def _new_invoice(self, request):
+        invoice = dict(request)
+        invoice.setdefault("id", str(uuid.uuid4()))
+        invoice["state"] = "BOOKED"
+        invoice["url"] = "https://stub.twikey.test/invoice.html?%s" % invoice["id"]
+        with self.lock:
+            self.invoices[invoice["id"]] = invoice
+        self.add("invoice", [invoice])
+        return invoice
+
+    def _create_invoice(self, path, data, headers):
+        request = data.get("json") or {}
+        if not request.get("number") or request.get("amount") is None:
+            return self._error(400, "err_missing_params", "Missing number or amount")
+        return self._json(self._new_invoice(request))
+
+    def _invoice_feed(self, path, data, headers):
+        return self._feed("invoice", headers)
+
+    def _invoice(self, path, data, headers):
+        invoice_id = path[len("/invoice/") :]
+        with self.lock:
+            invoice = self.invoices.get(invoice_id)
+        if invoice is None:
+            return self._error(404, "err_not_found", "No such invoice")
+        return self._json(invoice)
+
+    def _bulk_invoices(self, path, data, headers):
+        requests = data.get("json") or []
+        results = []
+        for request in requests:
+            if not request.get("number") or request.get("amount") is None:
+                results.append(
+                    {"id": request.get("id"), "status": "err_missing_params"}
+                )
+            else:
+                results.append({"id": self._new_invoice(request)["id"], "status": "OK"})
+        batch_id = str(uuid.uuid4())
+        with self.lock:
+            self._bulk[batch_id] = (time.monotonic() + self.bulk_delay, results)
+        return self._json({"batchId": batch_id})
+
+    def _bulk_details(self, path, data, headers):
+        with self.lock:
+            batch = self._bulk.get(data.get("batchId"))
+        if batch is None:
+            return self._error(404, "err_not_found", "No such batch")
+        ready_at, results = batch
+        if time.monotonic() < ready_at:
+            return self._error(409, "err_processing", "Batch is still being processed")
+        return self._json(results)
+
+    # transactions
+
+    def _create_transaction(self, path, data, headers):
+        transaction = {
+            "id": self._next_id(),
+            "contractId": 1,
+            "mndtId": data.get("mndtId"),
+            "amount": float(data.get("amount") or 0),
+            "msg": data.get("message"),
+            "place": data.get("place"),
+            "ref": data.get("ref"),
+            "date": data.get("date"),
+            "reqcolldt": data.get("reqcolldt"),
+            "state": "OPEN",
+            "final": False,
+        }
+        with self.lock:
+            self.transactions[transaction["id"]] = transaction
+        self.add("transaction", [transaction])
+        return self._json({"Entries": [transaction]})
+
+    def _transaction_feed(self, path, data, headers):
+        return self._feed("transaction", headers)
+
+    def _transaction_detail(self, path, data, headers):
+        with self.lock:
+            entries = [
+                tx
+                for tx in self.transactions.values()
+                if str(tx["id"]) == data.get("id")
+                or (data.get("ref") and tx["ref"] == data.get("ref"))
+                or (data.get("mndtId") and tx["mndtId"] == data.get("mndtId"))
+            ]
+        return self._json({"Entries": entries})
+
+    def _collect(self, path, data, headers):
+        with self.lock:
+            pending = [tx for tx in self.transactions.values() if tx["state"] == "OPEN"]
+            for transaction in pending:
+                transaction["state"] = "PENDING"
+        if pending:
+            self.add("transaction", pending)
+        return self._json(
+            {"id": self._next_id(), "ct": data.get("ct"), "entries": len(pending)}
+        )
+
+    # paylinks
+
+    def _create_paylink(self, path, data, headers):
+        link_id = self._next_id()
+        paylink = {
+            "id": link_id,
+            "ct": data.get("ct"),
+            "amount": float(data.get("amount") or 0),
+            "msg": data.get("title") or data.get("message"),
+            "ref": data.get("ref"),
+            "state": "created",
+        }
+        with self.lock:
+            self.paylinks[link_id] = paylink
+        self.add("paylink", [paylink])
+        return self._json(
+            dict(paylink, url="https://stub.twikey.test/pay/%d" % link_id)
+        )
+
+    def _paylink_feed(self, path, data, headers):
+        return self._feed("paylink", headers)
+
+    # refunds
+
+    def _create_beneficiary(self, path, data, headers):
+        beneficiary = {
+            "name": data.get("name"),
+            "iban": data.get("iban"),
+            "bic": data.get("bic"),
+            "available": True,
+        }
+        with self.lock:
+            self.beneficiaries[data.get("iban")] = beneficiary
+        return self._json(beneficiary)
+
+    def _beneficiaries(self, path, data, headers):
+        with self.lock:
+            return self._json({"beneficiaries": list(self.beneficiaries.values())})
+
+    def _create_refund(self, path, data, headers):
+        with self.lock:
+            known = data.get("iban") in self.beneficiaries
+        if not known:
+            return self._error(400, UNKNOWN_BENEFICIARY, "Beneficiary account unknown")
+        refund = {
+            "id": "T%06d" % self._next_id(),
+            "iban": data.get("iban"),
+            "amount": float(data.get("amount") or 0),
+            "msg": data.get("message"),
+            "ref": data.get("ref"),
+            "place": data.get("place"),
+            "date": data.get("date"),
+            "state": "PREPARED",
+        }
+        with self.lock:
+            self.refunds[refund["id"]] = refund
+        self.add("refund", [refund])
+        return self._json({"Entries": [refund]})
+
+    def _refund_detail(self, path, data, headers):
+        with self.lock:
+            refund = self.refunds.get(data.get("id"))
+        if refund is None:
+            return self._error(404, "err_not_found", "No such refund")
+        return self._json({"Entries": [refund]})
+
+    def _refund_feed(self, path, data, headers):
+        return self._feed("refund", headers)
+
+    def _complete(self, path, data, headers):
+        with self.lock:
+            prepared = [
+                refund
+                for refund in self.refunds.values()
+                if refund["state"] == "PREPARED"
+                and data.get("iban") in (None, refund["iban"])
+            ]
+            if not prepared:
+                return self._json({"CreditTransfers": []})
+            for refund in prepared:
+                refund["state"] = "BATCHED"
+            batch = {
+                "id": self._next_id(),
+                "pmtinfid": "STUB-PMTINF-%d" % self._sequence,
+                "entries": len(prepared),
+            }
+            self._batches[str(batch["id"])] = (
+                time.monotonic() + self.bulk_delay,
+                batch,
+            )
+        return self._json(
+            {
+                "CreditTransfers": [
+                    dict(batch, progress="PROCESSING" if self.bulk_delay else "DONE")
+                ]
+            }
+        )
+
+    def _batch_detail(self, path, data, headers):
+        with self.lock:
+            batch = self._batches.get(str(data.get("id")))
+        if batch is None:
+            return self._error(404, "err_not_found", "No such batch")
+        ready_at, batch = batch
+        return self._json(
+            {
+                "CreditTransfers": [
+                    dict(
+                        batch,
+                        progress="DONE"
+                        if time.monotonic() >= ready_at
+                        else "PROCESSING",
+                    )
+                ]
+            }
+        )
+
+
+_ROUTES = [
+    (("POST", "/invite"), "_invite"),
+    (("POST", "/sign"), "_sign"),
+    (("GET", "/mandate"), "_mandate_feed"),
+    (("DELETE", "/mandate"), "_cancel_mandate"),
+    (("POST", "/invoice"), "_create_invoice"),
+    (("GET", "/invoice"), "_invoice_feed"),
+    (("POST", "/invoice/bulk"), "_bulk_invoices"),
+    (("GET", "/invoice/bulk"), "_bulk_details"),
+    (("GET", "/invoice/"), "_invoice"),
+    (("POST", "/transaction"), "_create_transaction"),
+    (("GET", "/transaction"), "_transaction_feed"),
+    (("GET", "/transaction/detail"), "_transaction_detail"),
+    (("POST", "/collect"), "_collect"),
+    (("POST", "/payment/link"), "_create_paylink"),
+    (("GET", "/payment/link/feed"), "_paylink_feed"),
+    (("POST", "/transfers/beneficiaries"), "_create_beneficiary"),
+    (("GET", "/transfers/beneficiaries"), "_beneficiaries"),
+    (("POST", "/transfer"), "_create_refund"),
+    (("GET", "/transfer"), "_refund_feed"),
+    (("GET", "/transfer/detail"), "_refund_detail"),
+    (("POST", "/transfer/complete"), "_complete"),
+    (("GET", "/transfer/complete"), "_batch_detail"),
+]
+
+
+def _now():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real api
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def _answer(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status, headers, content = stub.handle(
+            self.command, self.path, self.headers, body
+        )
+        latency = stub.latency
+        if isinstance(latency, tuple):
+            latency = random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+        if content is None:
+            self.close_connection = True
+            return
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "Content-Length" not in headers:
+            self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _answer
+
+    def log_message(self, format, *args):
+        pass
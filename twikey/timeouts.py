@@ -0,0 +1,97 @@
+class Timeout:
+    """
+    Timeouts of a single api call, all in seconds.
+
+    Attributes:
+        connect (float): Maximum time to establish the connection.
+        read (float): Maximum time to wait for (the next chunk of) the response.
+        total (float): Overall deadline of the call including retries and their backoff, None for no deadline.
+    """
+
+    __slots__ = ["connect", "read", "total"]
+
+    def __init__(self, read=None, connect=None, total=None):
+        self.connect = connect
+        self.read = read
+        self.total = total
+
+    def __repr__(self):
+        return f"Timeout(connect={self.connect}, read={self.read}, total={self.total})"
+
+
+class TimeoutPolicy:
+    """
+    Timeouts of the api calls, configured once on the client.
+
+    Calls are identified by '<service>.<method>' (eg. 'invoice.bulk_create' or 'document.feed').
+    An override for an operation takes precedence over one for its service ('invoice'), which in
+    turn takes precedence over the defaults. Overrides are either a Timeout, in which the fields that
+    are left None fall back to the next level, or a number which is used as read timeout.
+
+    A few calls handling large payloads get a longer read timeout (DEFAULT_OVERRIDES), unless a read
+    timeout is set for them, for their service or as default.
+
+    Sample usage
+
+        TimeoutPolicy(connect=3, read=10, overrides={
+            "invoice.upload_ubl": Timeout(read=120),
+            "transaction": 20,
+        })
+
+    Args:
+        connect (float): Default connect timeout.
+        read (float): Default read timeout, 15 when not set.
+        total (float): Default overall deadline per call, None for no deadline.
+        overrides (dict): Operation or service name to Timeout or read timeout.
+    """
+
+    # calls handling large payloads
+    DEFAULT_OVERRIDES = {
+        "invoice.bulk_create": Timeout(read=30),
+        "transaction.batch_send": Timeout(read=60),
+        "transaction.batch_import": Timeout(read=60),
+        "transaction.reporting_import": Timeout(read=60),
+    }
+
+    def __init__(self, connect=5, read=None, total=None, overrides=None):
+        self.default = Timeout(read if read is not None else 15, connect, total)
+        self._default_read = read
+        self.overrides = {}
+        for name, override in (overrides or {}).items():
+            self.overrides[name] = (
+                override if isinstance(override, Timeout) else Timeout(read=override)
+            )
+        self._resolved = {}
+
+    def get(self, operation) -> Timeout:
+        """
+        :param operation: name of the call, eg. 'invoice.create'
+        :return: the Timeout to use for it
+        """
+        timeout = self._resolved.get(operation)
+        if timeout is None:
+            levels = [
+                self.overrides.get(operation),
+                self.overrides.get(operation.split(".")[0]),
+                Timeout(read=self._default_read),
+                self.DEFAULT_OVERRIDES.get(
+                    operation
+                ),  # below anything that was configured
+                self.default,
+            ]
+            levels = [level for level in levels if level is not None]
+            timeout = Timeout(
+                read=_first(levels, "read"),
+                connect=_first(levels, "connect"),
+                total=_first(levels, "total"),
+            )
+            self._resolved[operation] = timeout
+        return timeout
+
+
+def _first(levels, field):
+    for level in levels:
+        value = getattr(level, field)
+        if value is not None:
+            return value
+    return None
@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on windows
+    fcntl = None
+
+# Twikey sessions are valid for 24h, renew an hour before to be on the safe side
+TOKEN_VALIDITY = 23 * 3600
+
+
+class Token:
+    """
+    An authenticated api session as returned by the login call.
+
+    Attributes:
+        api_token (str): The value to send as Authorization header.
+        merchant_id (str): The merchant the session belongs to.
+        issued_at (float): Wall-clock time (epoch seconds) of the login, comparable across processes.
+    """
+
+    __slots__ = ["api_token", "merchant_id", "issued_at"]
+
+    def __init__(self, api_token, merchant_id, issued_at=None):
+        self.api_token = api_token
+        self.merchant_id = merchant_id
+        self.issued_at = time.time() if issued_at is None else issued_at
+
+    def expires_in(self) -> float:
+        """
+        :return: number of seconds this token can still be used
+        """
+        return self.issued_at + TOKEN_VALIDITY - time.time()
+
+    def is_valid(self) -> bool:
+        return self.expires_in() > 0
+
+    def to_dict(self):
+        return {
+            "api_token": self.api_token,
+            "merchant_id": self.merchant_id,
+            "issued_at": self.issued_at,
+        }
+
+    def __str__(self):
+        return f"Token merchant={self.merchant_id} issued_at={self.issued_at}"
+
+
+class TokenStore:
+    """
+    Storage for the session token, allowing it to be shared between clients.
+
+    The default implementation does not store anything, subclasses override load and save.
+    """
+
+    def load(self):
+        """
+        :return: the stored Token or None
+        """
+        return None
+
+    def save(self, token: Token):
+        """
+        Store a freshly obtained token
+        :param token: the new session
+        """
+        pass
+
+    def clear(self):
+        """
+        Forget the stored token (eg. after a logout)
+        """
+        pass
+
+    @contextmanager
+    def lock(self):
+        """
+        Held while checking and renewing the token, so only one client logs in at a time.
+        """
+        yield
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    Keeps the token in memory, can be shared by several clients within the same process.
+    """
+
+    def __init__(self):
+        self._token = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        return self._token
+
+    def save(self, token: Token):
+        self._token = token
+
+    def clear(self):
+        self._token = None
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            yield
+
+
+class FileTokenStore(TokenStore):
+    """
+    Keeps the token in a json file, allowing worker processes on the same host to share one session.
+
+    Renewals are serialised using an advisory lock on '<path>.lock' where the platform supports it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            return Token(raw["api_token"], raw["merchant_id"], raw["issued_at"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, token: Token):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".twikey-token")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(token.to_dict(), f)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def clear(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class CallbackTokenStore(TokenStore):
+    """
+    Delegates storage to user supplied functions (eg. to keep the token in redis or a database).
+
+    Args:
+        load: function without arguments returning a Token or None.
+        save: function receiving the new Token.
+        clear: optional function called on logout.
+    """
+
+    def __init__(self, load, save, clear=None):
+        self._load = load
+        self._save = save
+        self._clear = clear
+
+    def load(self):
+        return self._load()
+
+    def save(self, token: Token):
+        self._save(token)
+
+    def clear(self):
+        if self._clear:
+            self._clear()
+
+
+class TokenRenewer(threading.Thread):
+    """
+    Daemon thread renewing the session of a client shortly before it expires,
+    so no api call has to wait for a login.
+
+    Args:
+        client (TwikeyClient): client whose session is kept alive.
+        renew_before (int): number of seconds before expiry to renew.
+    """
+
+    # seconds to wait after a renewal, so a renew_before close to the validity can't cause a login storm
+    min_interval = 1.0
+
+    def __init__(self, client, renew_before=300):
+        super().__init__(name="twikey-token-renewer", daemon=True)
+        self.client = client
+        self.renew_before = renew_before
+        self._stopped = False
+        self._wakeup = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def run(self):
+        while not self._stopped:
+            expires_in = self.client.token_expires_in()
+            if expires_in is None:
+                wait = None  # not logged in yet, woken up on login
+            elif expires_in <= self.renew_before:
+                try:
+                    self.client.renew_token(min_validity=self.renew_before)
+                    self._wakeup.clear()  # set by the renewal itself
+                    wait = self.min_interval
+                except Exception as e:
+                    self.logger.warning("Unable to renew the Twikey token: %s", e)
+                    wait = 10
+            else:
+                wait = min(60, expires_in - self.renew_before)
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def wake(self):
+        """
+        Re-evaluate the expiry, called when the client obtained a new token
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
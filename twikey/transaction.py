@@ -1,14 +1,33 @@
+import logging
+import time
+
 import requests
 
-from .model.transaction_request import NewTransactionRequest, StatusRequest, QueryTransactionsRequest, ActionRequest, \
-    UpdateRequest, RefundRequest, RemoveTransactionRequest
-from .model.transaction_response import Transaction, TransactionStatusResponse, RefundResponse, TransactionFeed
+from .bulk import BulkSummary, run_many
+from .feed import FeedItem, FeedStats, counted, feed_pages
+from .model.transaction_request import (
+    NewTransactionRequest,
+    StatusRequest,
+    QueryTransactionsRequest,
+    ActionRequest,
+    UpdateRequest,
+    RefundRequest,
+    RemoveTransactionRequest,
+)
+from .model.transaction_response import (
+    Transaction,
+    TransactionStatusResponse,
+    RefundResponse,
+    TransactionFeed,
+)
+from .ratelimit import TokenBucket
 
 
 class TransactionService(object):
     def __init__(self, client) -> None:
         super().__init__()
         self.client = client
+        self.logger = logging.getLogger(__name__)
 
     def create(self, request: NewTransactionRequest) -> Transaction:
         """
@@ -35,23 +54,92 @@ class TransactionService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.create"),
             )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Create transaction", response)
-            entries_ = response.json()["Entries"]
+            entries_ = self.client.decode(response)["Entries"]
             if len(entries_) > 0:
                 first_transaction = entries_[0]
                 return Transaction(first_transaction)
-            return response.json()
+            return self.client.decode(response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Create transaction", e)
 
+    def create_many(self, transactions, concurrency=8, ordered=True, rate=None):
+        """
+        See https://www.twikey.com/api/#new-transaction
+
+        Create many transactions concurrently, each one via create().
+
+        The requests are read from the iterable while the transactions are being created, so a
+        generator can be passed without holding all of them in memory. The calls share the connection
+        pool (and the rate limiter) of the client, so keep pool_maxsize at least at concurrency. A
+        failing transaction does not stop the others.
+
+        Args:
+            transactions: Iterable of NewTransactionRequest.
+            concurrency (int): Number of transactions created at the same time.
+            ordered (bool): Yield the results in the order of the requests, otherwise as they complete.
+            rate (float): Optional maximum number of transactions created per second by this call.
+
+        Yields:
+            BulkResult: Per request, holding either the created Transaction or the error (usually a TwikeyError).
+        """
+        limiter = TokenBucket(rate) if rate else None
+
+        def create(request):
+            if limiter is not None:
+                limiter.acquire()
+            return self.create(request)
+
+        return run_many(create, transactions, concurrency, ordered)
+
+    def create_all(
+        self, transactions, ct=None, colltndt=False, concurrency=8, rate=None
+    ) -> BulkSummary:
+        """
+        Create many transactions concurrently (see create_many) and, when all of them succeeded,
+        send them to the bank with batch_send(ct).
+
+        Args:
+            transactions: Iterable of NewTransactionRequest.
+            ct: Contract template to collect once all transactions are created, None to not send a batch.
+            colltndt: Collection date of the batch, see batch_send.
+            concurrency (int): Number of transactions created at the same time.
+            rate (float): Optional maximum number of transactions created per second.
+
+        Returns:
+            BulkSummary: Counts, the failed requests with their errors and the result of batch_send (if done).
+
+        Raises:
+            TwikeyError: If sending the batch fails.
+        """
+        started = time.monotonic()
+        summary = BulkSummary()
+        for result in self.create_many(
+            transactions, concurrency, ordered=False, rate=rate
+        ):
+            summary.add(result)
+        if ct is not None:
+            if summary.failures:
+                self.logger.warning(
+                    "Not collecting ct %s, %d of %d transactions failed",
+                    ct,
+                    len(summary.failures),
+                    summary.total,
+                )
+            else:
+                summary.batch = self.batch_send(ct, colltndt)
+        summary.elapsed = time.monotonic() - started
+        self.logger.info("Created transactions: %s", summary)
+        return summary
+
     def status_details(self, request: StatusRequest) -> TransactionStatusResponse:
         """
         See https://www.twikey.com/api/#transaction-status
@@ -75,11 +163,16 @@ class TransactionService(object):
         url = self.client.instance_url("/transaction/detail")
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers("application/json")
-            response = requests.get(url=url, params=params, headers=headers, timeout=15)
+            headers = self.client._headers("application/json")
+            response = self.client.session.get(
+                url=url,
+                params=params,
+                headers=headers,
+                timeout=self.client.timeout("transaction.status_details"),
+            )
             if response.status_code != 200:
                 raise self.client.raise_error("Transaction detail", response)
-            return TransactionStatusResponse(response.json())
+            return TransactionStatusResponse(self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Transaction detail", e)
 
@@ -103,14 +196,20 @@ class TransactionService(object):
         """
 
         data = request.to_request()
-        url = self.client.instance_url(f"/transaction/query?fromId={data.get('fromId')}")
+        url = self.client.instance_url(
+            f"/transaction/query?fromId={data.get('fromId')}"
+        )
         try:
             self.client.refresh_token_if_required()
-            headers = self.client.headers()
-            response = requests.get(url=url, headers=headers, timeout=15,)
+            headers = self.client._headers()
+            response = self.client.session.get(
+                url=url,
+                headers=headers,
+                timeout=self.client.timeout("transaction.query"),
+            )
             if response.status_code != 200:
                 raise self.client.raise_error("Transaction detail", response)
-            return TransactionStatusResponse(response.json())
+            return TransactionStatusResponse(self.client.decode(response))
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Transaction detail", e)
 
@@ -137,11 +236,11 @@ class TransactionService(object):
         data = request.to_request()
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=15,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.action"),
             )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
@@ -173,7 +272,12 @@ class TransactionService(object):
         url = self.client.instance_url("/transaction")
         try:
             self.client.refresh_token_if_required()
-            response = requests.put(url=url, data=data, headers=self.client.headers(), timeout=15)
+            response = self.client.session.put(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.update"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update transaction", response)
@@ -204,15 +308,20 @@ class TransactionService(object):
         url = self.client.instance_url("/transaction/refund")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(url=url, data=data, headers=self.client.headers(), timeout=15)
+            response = self.client.session.post(
+                url=url,
+                data=data,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.refund"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update transaction", response)
-            entries_ = response.json()["Entries"]
+            entries_ = self.client.decode(response)["Entries"]
             if len(entries_) > 0:
                 first_transaction = entries_[0]
                 return RefundResponse(first_transaction)
-            return response.json()
+            return self.client.decode(response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Update transaction", e)
 
@@ -240,14 +349,55 @@ class TransactionService(object):
         url = self.client.instance_url(f"/transaction?id={data.get('id')}")
         try:
             self.client.refresh_token_if_required()
-            response = requests.delete(url=url, headers=self.client.headers(), timeout=15)
+            response = self.client.session.delete(
+                url=url,
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.remove"),
+            )
             response.raise_for_status()
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Update transaction", response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Update transaction", e)
 
-    def feed(self, transaction_feed: TransactionFeed):
+    def _pages(self, start_position=False, prefetch=0, stream=False):
+        url = self.client.instance_url("/transaction")
+        return feed_pages(
+            self.client,
+            "transaction.feed",
+            "Feed transaction",
+            url,
+            "Entries",
+            start_position,
+            prefetch,
+            stream,
+        )
+
+    def iter_feed(self, start_position=False, prefetch=0, stream=False):
+        """
+        See https://www.twikey.com/api/#transaction-feed
+
+        Lazily iterate the transaction feed. A page is only fetched once the items of the previous one
+        have been consumed, so breaking out of the loop stops reading the feed.
+
+        Args:
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
+            stream (bool): Decode the items while a page is being read instead of loading the whole
+                page first, so large pages use little memory. Can't be combined with prefetch.
+
+        Yields:
+            FeedItem: The X-LAST position of the page the item belongs to and the Transaction.
+
+        Raises:
+            TwikeyError: If the API returns an error or the request fails.
+        """
+
+        for position, entries in self._pages(start_position, prefetch, stream):
+            for msg in entries:
+                yield FeedItem(position, Transaction(msg))
+
+    def feed(self, transaction_feed: TransactionFeed, start_position=False, prefetch=0):
         """
         See https://www.twikey.com/api/#transaction-feed
 
@@ -261,39 +411,22 @@ class TransactionService(object):
         Args:
             transaction_feed (TransactionFeed): Custom handler class with methods for processing
                 new, updated, or cancelled transaction events.
+            start_position: Optional position (X-LAST) to resume after.
+            prefetch (int): Number of pages to read ahead in the background, 0 (default) reads on demand.
 
         Returns:
-            None
+            FeedStats: The number of pages and items handled and the last position read.
 
         Raises:
             Exception: If the request to the feed endpoint fails or response is invalid.
         """
 
-        url = self.client.instance_url("/transaction")
-        try:
-            self.client.refresh_token_if_required()
-            response = requests.get(
-                url=url,
-                headers=self.client.headers(),
-                timeout=15,
-            )
-            response.raise_for_status()
-            if "ApiErrorCode" in response.headers:
-                raise self.client.raise_error("Feed transaction", response)
-            feed_response = response.json()
-            while len(feed_response["Entries"]) > 0:
-                for msg in feed_response["Entries"]:
-                    transaction_feed.transaction(Transaction(msg))
-                response = requests.get(
-                    url=url,
-                    headers=self.client.headers(),
-                    timeout=15,
-                )
-                if "ApiErrorCode" in response.headers:
-                    raise self.client.raise_error("Feed transaction", response)
-                feed_response = response.json()
-        except requests.exceptions.RequestException as e:
-            raise self.client.raise_error_from_request("Feed transaction", e)
+        stats = FeedStats("transaction")
+        for position, entries in counted(self._pages(start_position, prefetch), stats):
+            if transaction_feed.page(position, [Transaction(msg) for msg in entries]):
+                self.logger.debug("Error while handing transaction, stopping")
+                break
+        return stats
 
     def batch_send(self, ct, colltndt=False):
         """
@@ -308,15 +441,15 @@ class TransactionService(object):
             data["colltndt"] = colltndt
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=data,
-                headers=self.client.headers(),
-                timeout=60,  # might be large batches
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.batch_send"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Send batch", response)
-            return response.json()
+            return self.client.decode(response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Send batch", e)
 
@@ -329,15 +462,15 @@ class TransactionService(object):
         try:
             self.client.refresh_token_if_required()
             with open(pain008_xml, "rb") as file:
-                response = requests.post(
+                response = self.client.session.post(
                     url=url,
                     data=file,
-                    headers=self.client.headers("text/xml"),
-                    timeout=60,  # might be large batches
+                    headers=self.client._headers("text/xml"),
+                    timeout=self.client.timeout("transaction.batch_import"),
                 )
                 if "ApiErrorCode" in response.headers:
                     raise self.client.raise_error("Import batch", response)
-                return response.json()
+                return self.client.decode(response)
         except requests.exceptions.RequestException as e:
             raise self.client.raise_error_from_request("Import batch", e)
 
@@ -348,11 +481,11 @@ class TransactionService(object):
         url = self.client.instance_url("/reporting")
         try:
             self.client.refresh_token_if_required()
-            response = requests.post(
+            response = self.client.session.post(
                 url=url,
                 data=reporting_content,
-                headers=self.client.headers(),
-                timeout=60,  # might be large batches
+                headers=self.client._headers(),
+                timeout=self.client.timeout("transaction.reporting_import"),
             )
             if "ApiErrorCode" in response.headers:
                 raise self.client.raise_error("Import reporting", response)